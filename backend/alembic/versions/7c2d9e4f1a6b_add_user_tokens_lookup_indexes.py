@@ -0,0 +1,32 @@
+"""Add user_tokens lookup indexes
+
+Revision ID: 7c2d9e4f1a6b
+Revises: 5b1f0e7a2c3d
+Create Date: 2026-10-18 14:03:27.618204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d9e4f1a6b'
+down_revision: Union[str, None] = '5b1f0e7a2c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 建立唯一索引前先移除重複的 token_key，只保留最新的一筆
+    op.execute(
+        'DELETE t1 FROM user_tokens t1 '
+        'JOIN user_tokens t2 ON t1.token_key = t2.token_key AND t1.id < t2.id'
+    )
+    op.drop_index('ix_user_tokens_token_key', table_name='user_tokens')
+    op.create_index('ix_user_tokens_token_key', 'user_tokens', ['token_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_tokens_token_key', table_name='user_tokens')
+    op.create_index('ix_user_tokens_token_key', 'user_tokens', ['token_key'], unique=False)
@@ -0,0 +1,69 @@
+"""Hash user_tokens token_key into token_hash
+
+Revision ID: a3f81c5d2e97
+Revises: 7c2d9e4f1a6b
+Create Date: 2026-10-18 15:21:09.480316
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f81c5d2e97'
+down_revision: Union[str, None] = '7c2d9e4f1a6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column(
+        'user_tokens',
+        sa.Column(
+            'token_hash', sa.BINARY(length=32), nullable=True, comment='token key 的 SHA-256 digest'
+        ),
+    )
+
+    # 分批回填，每批各自 commit，避免一次鎖住整個資料表
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+
+        while True:
+            result = connection.execute(
+                sa.text(
+                    'UPDATE user_tokens SET token_hash = UNHEX(SHA2(token_key, 256)) '
+                    'WHERE token_hash IS NULL AND token_key IS NOT NULL LIMIT :limit'
+                ),
+                {'limit': BACKFILL_BATCH_SIZE},
+            )
+
+            if result.rowcount < BACKFILL_BATCH_SIZE:
+                break
+
+    # 沒有 token_key 的資料無法使用，直接刪除
+    op.execute('DELETE FROM user_tokens WHERE token_hash IS NULL')
+
+    op.alter_column(
+        'user_tokens',
+        'token_hash',
+        existing_type=sa.BINARY(length=32),
+        nullable=False,
+        existing_comment='token key 的 SHA-256 digest',
+    )
+    op.create_index('ix_user_tokens_token_hash', 'user_tokens', ['token_hash'], unique=True)
+    op.drop_index('ix_user_tokens_token_key', table_name='user_tokens')
+    op.drop_column('user_tokens', 'token_key')
+
+
+def downgrade() -> None:
+    # 無法從 digest 還原 token_key，降版後所有 refresh token 都需要重新登入取得
+    op.add_column('user_tokens', sa.Column('token_key', sa.String(length=255), nullable=True))
+    op.create_index('ix_user_tokens_token_key', 'user_tokens', ['token_key'], unique=True)
+    op.drop_index('ix_user_tokens_token_hash', table_name='user_tokens')
+    op.drop_column('user_tokens', 'token_hash')
+    op.execute('DELETE FROM user_tokens')
@@ -0,0 +1,43 @@
+"""在 app 的 event loop 中持續執行的背景 task
+
+`TokenReaper`、`OutboxSender`、`RevocationList` 都在 lifespan 中以 `start()` 啟動、`stop()` 結束
+"""
+
+import asyncio
+from typing import Optional
+
+
+class BackgroundTask:
+    """以 `start()`/`stop()` 控制，在背景執行 `run()` 的 task，子類別實作 `run()`"""
+
+    _task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+
+        raise NotImplementedError
+
+    @property
+    def running(self) -> bool:
+
+        return self._task is not None
+
+    def start(self) -> None:
+
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """取消 task 並等待結束"""
+
+        if self._task is None:
+            return
+
+        self._task.cancel()
+
+        try:
+            await self._task
+
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app import metrics
+from app.config.settings import get_settings
+from app.models.user import User
+
+settings = get_settings()
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """已認證使用者的輕量資料，不綁定任何 db session"""
+
+    id: int
+    email: str
+    name: str
+    is_active: bool
+    verified_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            is_active=user.is_active,
+            verified_at=user.verified_at,
+        )
+
+
+class TTLCache:
+    """有容量上限 (LRU) 與存活時間 (TTL) 的 in-process 快取
+
+    每個 worker process 各自持有一份，所以 TTL 也是跨 process 資料不一致時間的上限
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+
+        with self._lock:
+            item = self._data.get(key)
+
+            if item is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = item
+
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """取得快取的統計資訊"""
+
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = TTLCache(max_size=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+metrics.Counter("user_cache_hits_total", "User cache hits.").set_function(lambda: user_cache.hits)
+metrics.Counter("user_cache_misses_total", "User cache misses.").set_function(
+    lambda: user_cache.misses
+)
+
+
+def invalidate_user(user_id: Any) -> None:
+    """使用者資料變更時，將該使用者從快取中移除"""
+
+    if user_id is not None:
+        user_cache.invalidate(user_id)
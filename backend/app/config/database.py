@@ -1,13 +1,145 @@
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
+from app import metrics
+from app.config.replica import ReplicaSet, RoutingSession
 from app.config.settings import get_settings
 
 settings = get_settings()
 
+
+# 所有 engine 共用的 pool 設定
+POOL_SIZE = 20
+MAX_OVERFLOW = 0
+
+
+class _InstrumentedPoolMixin:
+    """記錄從 pool 取得連線所花的時間
+
+    pool 的 `checkout` event 在取得連線之後才會觸發，無法得知等待的時間，
+    所以覆寫公開的 `Pool.connect()` (engine 取得連線時呼叫的方法)，時間包含 `pool_pre_ping`
+    """
+
+    metrics_label = "sync"
+
+    def connect(self):
+
+        with metrics.DB_POOL_CHECKOUT_SECONDS.labels(self.metrics_label).time():
+            return super().connect()
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+
+    metrics_label = "async"
+
+
+def register_pool_metrics(pool: QueuePool, label: str, max_overflow: int = MAX_OVERFLOW) -> None:
+    """輸出 pool 的容量、已借出連線數與使用率，只使用 pool 的公開方法"""
+
+    capacity = pool.size() + max(max_overflow, 0)
+
+    metrics.DB_POOL_SIZE.labels(label).set_function(lambda: capacity)
+    metrics.DB_POOL_CHECKED_OUT.labels(label).set_function(pool.checkedout)
+    metrics.DB_POOL_UTILIZATION.labels(label).set_function(
+        lambda: pool.checkedout() / capacity if capacity else 0.0
+    )
+
+
 engine = create_engine(
-    url=settings.DATABASE_URI, pool_pre_ping=True, pool_recycle=3600, pool_size=20, max_overflow=0
+    url=settings.DATABASE_URI,
+    poolclass=InstrumentedQueuePool,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
 )
+register_pool_metrics(engine.pool, InstrumentedQueuePool.metrics_label)
+
+replica_engines = []
+
+for i, uri in enumerate(settings.REPLICA_DATABASE_URIS):
+    replica_engine = create_engine(
+        url=uri,
+        poolclass=InstrumentedQueuePool,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+    )
+    register_pool_metrics(replica_engine.pool, f"sync_replica_{i}")
+    replica_engines.append(replica_engine)
+
+replicas: Optional[ReplicaSet] = None
+
+if replica_engines:
+    replicas = ReplicaSet(
+        replica_engines,
+        max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.DB_REPLICA_CHECK_INTERVAL_SECONDS,
+    )
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+SessionLocal = sessionmaker(
+    bind=engine, class_=RoutingSession, autocommit=False, autoflush=False, replicas=replicas
+)
 Base = declarative_base()
+
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+
+if settings.DB_ASYNC:
+    async_engine = create_async_engine(
+        url=settings.ASYNC_DATABASE_URI,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+    )
+    register_pool_metrics(async_engine.pool, InstrumentedAsyncQueuePool.metrics_label)
+
+    async_replica_engines = []
+
+    for i, uri in enumerate(settings.ASYNC_REPLICA_DATABASE_URIS):
+        async_replica_engine = create_async_engine(
+            url=uri,
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+        )
+        register_pool_metrics(async_replica_engine.pool, f"async_replica_{i}")
+        async_replica_engines.append(async_replica_engine)
+
+    # `AsyncSession` 內部的查詢都在 greenlet 中執行，可以直接使用 async engine 的 `sync_engine`
+    async_replicas = None
+
+    if async_replica_engines:
+        async_replicas = ReplicaSet(
+            [async_replica_engine.sync_engine for async_replica_engine in async_replica_engines],
+            max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+            check_interval=settings.DB_REPLICA_CHECK_INTERVAL_SECONDS,
+        )
+
+    # commit 之後不讓物件過期，避免在 event loop 中存取屬性時觸發隱含的 IO
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        sync_session_class=RoutingSession,
+        autoflush=False,
+        expire_on_commit=False,
+        replicas=async_replicas,
+    )
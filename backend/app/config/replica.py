@@ -0,0 +1,180 @@
+"""讀寫分離
+
+`RoutingSession` 會把唯讀的 `SELECT` 送到 replica，其餘的查詢 (寫入、`FOR UPDATE`、flush) 都送到 primary。
+session 寫入過資料後，之後的查詢都會使用 primary，確保能讀到自己寫入的資料 (read-your-writes)。
+
+replica 的延遲超過 `max_lag` 或無法連線時，查詢會改送到 primary
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import Connection, Engine, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+DB_ROUTED_QUERIES_TOTAL = metrics.Counter(
+    "db_routed_queries_total", "Queries routed by the routing session.", labelnames=("target",)
+)
+
+# 在 `session.info` 中標記 session 之後都使用 primary
+_USE_PRIMARY = "routing_use_primary"
+
+LagProbe = Callable[[Connection], Optional[float]]
+
+
+def mysql_replica_lag(connection: Connection) -> Optional[float]:
+    """取得 MySQL replica 落後 primary 的秒數，複寫停止時回傳 `None`"""
+
+    row = connection.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+
+    if row is None:
+        return None
+
+    lag = row.get("Seconds_Behind_Source")
+
+    return None if lag is None else float(lag)
+
+
+class ReplicaSet:
+
+    def __init__(
+        self,
+        engines: Sequence[Engine],
+        max_lag: float,
+        check_interval: float,
+        lag_probe: LagProbe = mysql_replica_lag,
+    ) -> None:
+        """
+        Args:
+            * `engines`: replica 的 engine
+            * `max_lag`: 可以接受的最大延遲秒數，超過時不使用該 replica
+            * `check_interval`: 重新檢查延遲的間隔秒數
+            * `lag_probe`: 取得 replica 延遲秒數的函數，無法取得時回傳 `None`
+        """
+
+        self.engines = list(engines)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+
+        self._lock = threading.Lock()
+        self._lags: Dict[int, Tuple[float, Optional[float]]] = {}
+        self._counter = itertools.count()
+
+    def _probe(self, engine: Engine) -> Optional[float]:
+
+        try:
+            with engine.connect() as connection:
+                return self.lag_probe(connection)
+
+        except Exception as probe_exec:
+            logger.warning("Failed to check replica %s: %r", engine.url, probe_exec)
+            return None
+
+    def lag(self, index: int) -> Optional[float]:
+        """取得第 `index` 個 replica 的延遲秒數，每 `check_interval` 秒才會重新檢查一次
+
+        同一時間只有一個呼叫端檢查，其他呼叫端不等待，直接使用上次的結果 (尚未檢查過時為 `None`)。
+        async engine 的檢查會在 greenlet 中把控制權交回 event loop，等待 lock 會卡住整個 event loop
+        """
+
+        now = time.monotonic()
+        checked = self._lags.get(index)
+
+        if checked is not None and now - checked[0] < self.check_interval:
+            return checked[1]
+
+        if not self._lock.acquire(blocking=False):
+            return None if checked is None else checked[1]
+
+        try:
+            checked = self._lags.get(index)
+
+            if checked is None or now - checked[0] >= self.check_interval:
+                checked = self._lags[index] = (now, self._probe(self.engines[index]))
+
+        finally:
+            self._lock.release()
+
+        return checked[1]
+
+    def healthy(self, index: int) -> bool:
+
+        lag = self.lag(index)
+
+        return lag is not None and lag <= self.max_lag
+
+    def choose(self) -> Optional[Engine]:
+        """輪流選擇延遲在 `max_lag` 以內的 replica，沒有可用的 replica 時回傳 `None`"""
+
+        if not self.engines:
+            return None
+
+        start = next(self._counter)
+
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+
+            if self.healthy(index):
+                return self.engines[index]
+
+        return None
+
+    def status(self) -> List[Dict[str, Any]]:
+
+        return [
+            {"url": str(engine.url), "lag": self._lags.get(index, (None, None))[1]}
+            for index, engine in enumerate(self.engines)
+        ]
+
+
+def use_primary(session: Union[Session, AsyncSession]) -> None:
+    """讓 `session` 之後的查詢都使用 primary，例如讀取後馬上要更新的資料
+
+    replica 可能落後，讀取後依讀到的資料寫入 (例如 refresh token 的輪替、驗證連結) 都必須使用 primary
+    """
+
+    session.info[_USE_PRIMARY] = True
+
+
+class RoutingSession(Session):
+    """依照查詢種類選擇 primary 或 replica 的 session，`replicas` 為 `None` 時與 `Session` 相同"""
+
+    def __init__(self, *args: Any, replicas: Optional[ReplicaSet] = None, **kwargs: Any) -> None:
+
+        super().__init__(*args, **kwargs)
+
+        self.replicas = replicas
+
+    def _use_primary(self, clause: Any) -> bool:
+
+        if self.info.get(_USE_PRIMARY):
+            return True
+
+        if self._flushing or not isinstance(clause, Select) or clause._for_update_arg is not None:
+            # 寫入之後都使用 primary
+            self.info[_USE_PRIMARY] = True
+            return True
+
+        return False
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, **kwargs: Any):
+
+        if self.replicas is not None and not self._use_primary(clause):
+            replica = self.replicas.choose()
+
+            if replica is not None:
+                DB_ROUTED_QUERIES_TOTAL.labels("replica").inc()
+                return replica
+
+        DB_ROUTED_QUERIES_TOTAL.labels("primary").inc()
+
+        return super().get_bind(mapper, clause=clause, **kwargs)
@@ -11,6 +11,16 @@ env_path = Path(".") / ".env"
 load_dotenv(dotenv_path=env_path)
 
 
+def _replica_uris(driver: str, user: str, password: str, hosts: str, db: str) -> List[str]:
+    """以 primary 的帳號密碼與資料庫組合每個 replica (`host:port`) 的連線字串"""
+
+    return [
+        f"mysql+{driver}://{user}:{quote_plus(password)}@{host}/{db}"
+        for host in hosts.strip().replace(" ", "").split(",")
+        if host
+    ]
+
+
 class Settings(BaseSettings):
 
     # APP
@@ -21,6 +31,18 @@ class Settings(BaseSettings):
     ALLOW_ORIGINS: str = os.environ.get("ALLOW_ORIGINS", "")
     ALLOW_ORIGINS_LIST: List[str] = ALLOW_ORIGINS.strip().replace(" ", "").split(",")
 
+    # Admin
+    # 以逗號分隔的 email，這些使用者可以使用管理功能 (例如列出所有使用者)
+    ADMIN_EMAILS: str = os.environ.get("ADMIN_EMAILS", "")
+    ADMIN_EMAILS_LIST: List[str] = [
+        email for email in ADMIN_EMAILS.strip().replace(" ", "").lower().split(",") if email
+    ]
+
+    # Metrics
+    # 預設不開放 `/metrics`；設定 `METRICS_TOKEN` 後需帶 `Authorization: Bearer <token>` 才能讀取
+    METRICS_ENABLED: bool = os.environ.get("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_TOKEN: str = os.environ.get("METRICS_TOKEN", "")
+
     # Frontend
     FRONTEND_HOST: str = os.environ.get("FRONTEND_HOST", "http://127.0.0.1:5500")
     FRONTEND_ACTIVE_ACCOUNT_URL: str = os.environ.get(
@@ -42,6 +64,28 @@ class Settings(BaseSettings):
         % quote_plus(MYSQL_PASSWORD)
     )
 
+    # 開啟 `DB_ASYNC` 後，request 會使用 `ASYNC_DATABASE_URI` 的 async engine
+    DB_ASYNC: bool = os.environ.get("DB_ASYNC", "false").lower() == "true"
+    ASYNC_DATABASE_URI: str = (
+        f"mysql+aiomysql://{MYSQL_USER}:%s@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+        % quote_plus(MYSQL_PASSWORD)
+    )
+
+    # Read replicas
+    # 以逗號分隔的 replica `host:port`，唯讀的查詢會送到延遲在 `DB_REPLICA_MAX_LAG_SECONDS` 以內的 replica，
+    # 未設定時所有查詢都使用 primary
+    DB_REPLICA_HOSTS: str = os.environ.get("DB_REPLICA_HOSTS", "")
+    REPLICA_DATABASE_URIS: List[str] = _replica_uris(
+        "pymysql", MYSQL_USER, MYSQL_PASSWORD, DB_REPLICA_HOSTS, MYSQL_DB
+    )
+    ASYNC_REPLICA_DATABASE_URIS: List[str] = _replica_uris(
+        "aiomysql", MYSQL_USER, MYSQL_PASSWORD, DB_REPLICA_HOSTS, MYSQL_DB
+    )
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.environ.get("DB_REPLICA_MAX_LAG_SECONDS", 1))
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = float(
+        os.environ.get("DB_REPLICA_CHECK_INTERVAL_SECONDS", 5)
+    )
+
     # Testing config
     TEST_DB_URI: str = "sqlite://"
 
@@ -54,15 +98,117 @@ class Settings(BaseSettings):
         "USER_FORGOT_PASSWORD_EMAIL_CONTEXT", "password-reset"
     )
 
+    # Email dispatcher config
+    # 關閉 `EMAIL_DISPATCHER_ENABLED` 時，email 會改用 `BackgroundTasks` 寄送
+    EMAIL_DISPATCHER_ENABLED: bool = (
+        os.environ.get("EMAIL_DISPATCHER_ENABLED", "true").lower() == "true"
+    )
+    EMAIL_DISPATCHER_CONNECTIONS: int = int(os.environ.get("EMAIL_DISPATCHER_CONNECTIONS", 2))
+    EMAIL_DISPATCHER_BATCH_SIZE: int = int(os.environ.get("EMAIL_DISPATCHER_BATCH_SIZE", 20))
+    EMAIL_DISPATCHER_MAX_RETRIES: int = int(os.environ.get("EMAIL_DISPATCHER_MAX_RETRIES", 3))
+    EMAIL_DISPATCHER_RETRY_BACKOFF_SECONDS: float = float(
+        os.environ.get("EMAIL_DISPATCHER_RETRY_BACKOFF_SECONDS", 1)
+    )
+    EMAIL_DISPATCHER_QUEUE_SIZE: int = int(os.environ.get("EMAIL_DISPATCHER_QUEUE_SIZE", 10000))
+
+    # Email outbox config
+    # 開啟 `EMAIL_OUTBOX_ENABLED` 後，帳號認證信會與使用者資料在同一個 transaction 中寫入 outbox，
+    # 再由 `python -m app.outbox_sender` 寄送，使用獨立的 sender 時可以關閉 `EMAIL_OUTBOX_SENDER_IN_APP`
+    EMAIL_OUTBOX_ENABLED: bool = os.environ.get("EMAIL_OUTBOX_ENABLED", "true").lower() == "true"
+    EMAIL_OUTBOX_SENDER_IN_APP: bool = (
+        os.environ.get("EMAIL_OUTBOX_SENDER_IN_APP", "true").lower() == "true"
+    )
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", 50))
+    EMAIL_OUTBOX_POLL_SECONDS: float = float(os.environ.get("EMAIL_OUTBOX_POLL_SECONDS", 2))
+    EMAIL_OUTBOX_LEASE_SECONDS: float = float(os.environ.get("EMAIL_OUTBOX_LEASE_SECONDS", 60))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+    EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS: float = float(
+        os.environ.get("EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS", 30)
+    )
+
+    # Email link token config
+    # 沒有設定 `LINK_TOKEN_SECRET` 時，會從 `JWT_SECRET` 衍生出專用的 key
+    LINK_TOKEN_SECRET: str = os.environ.get("LINK_TOKEN_SECRET", "")
+    LINK_TOKEN_EXPIRE_MINUTES: int = int(os.environ.get("LINK_TOKEN_EXPIRE_MINUTES", 60 * 24))
+    # 過渡期間仍接受舊的 bcrypt 連結，開啟時必須設定結束時間 `LINK_TOKEN_LEGACY_UNTIL` (ISO 格式的 UTC 時間)，
+    # 只需要涵蓋部署前寄出的連結，也就是部署時間加上 `LINK_TOKEN_EXPIRE_MINUTES`
+    LINK_TOKEN_ACCEPT_LEGACY: bool = (
+        os.environ.get("LINK_TOKEN_ACCEPT_LEGACY", "false").lower() == "true"
+    )
+    LINK_TOKEN_LEGACY_UNTIL: str = os.environ.get("LINK_TOKEN_LEGACY_UNTIL", "")
+
     # JWT config
     JWT_SECRET: str = os.environ.get(
         "JWT_SECRET", "ae0359c0c2eb9ced85498375ef480cbd5b0eb30f0579c17443866b72f762b873"
     )
+    # `HS256` 使用 `JWT_SECRET`；`EdDSA` 或 `ES256` 使用 `JWT_PRIVATE_KEYS`，
+    # 其他服務可以從 `/.well-known/jwks.json` 取得公鑰，在本地驗證 token
     JWT_ALGORITHM: str = os.environ.get("JWT_ALGORITHM", "HS256")
+    # 以逗號分隔的 PEM 檔案路徑，第一把 key 用來簽署，其餘只用來驗證 (輪替中的 key)
+    JWT_PRIVATE_KEYS: str = os.environ.get("JWT_PRIVATE_KEYS", "")
+    JWT_PRIVATE_KEYS_LIST: List[str] = [
+        path for path in JWT_PRIVATE_KEYS.strip().replace(" ", "").split(",") if path
+    ]
+    JWT_JWKS_MAX_AGE_SECONDS: int = int(os.environ.get("JWT_JWKS_MAX_AGE_SECONDS", 300))
+    # 是否接受以 base85 編碼 `sub`、`p` 的舊格式 token，舊的 refresh token 都過期後可以關閉
+    JWT_ACCEPT_LEGACY_CLAIMS: bool = (
+        os.environ.get("JWT_ACCEPT_LEGACY_CLAIMS", "true").lower() == "true"
+    )
+    # 驗證 `exp` 時容許的時間誤差秒數
+    JWT_LEEWAY_SECONDS: int = int(os.environ.get("JWT_LEEWAY_SECONDS", 0))
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.environ.get("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 3))
     JWT_REFRESH_TOKEN_EXPIRE_MINUTES: int = int(
         os.environ.get("JWT_REFRESH_TOKEN_EXPIRE_MINUTES", 15)
     )
+    # 開啟後 access token 會帶有 `email` 和 `name`，`/users/me` 可以不查詢資料庫直接回應
+    JWT_PROFILE_CLAIMS: bool = os.environ.get("JWT_PROFILE_CLAIMS", "false").lower() == "true"
+
+    # Authenticated user cache config
+    USER_CACHE_MAX_SIZE: int = int(os.environ.get("USER_CACHE_MAX_SIZE", 10000))
+    USER_CACHE_TTL_SECONDS: int = int(os.environ.get("USER_CACHE_TTL_SECONDS", 30))
+
+    # Password hashing config
+    # `PASSWORD_HASH_EXECUTOR` 可以是 `thread` 或 `process`
+    PASSWORD_HASH_EXECUTOR: str = os.environ.get("PASSWORD_HASH_EXECUTOR", "process")
+    # 與 uvicorn 相同，`WEB_CONCURRENCY` 為 worker process 的數量
+    WEB_CONCURRENCY: int = max(int(os.environ.get("WEB_CONCURRENCY", 1)), 1)
+    # 每個 uvicorn worker 各自建立一個 pool，預設讓所有 worker 的 pool 加起來不超過 CPU 核心數
+    PASSWORD_HASH_MAX_WORKERS: int = int(
+        os.environ.get(
+            "PASSWORD_HASH_MAX_WORKERS", max((os.cpu_count() or 1) // WEB_CONCURRENCY, 1)
+        )
+    )
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", 64))
+
+    # Refresh token store config
+    # `sql`、`redis` 或 `memory`，`redis` 與 `memory` 以 TTL 讓 token 過期，token reaper 不會清理 `user_tokens`
+    TOKEN_STORE: str = os.environ.get("TOKEN_STORE", "sql")
+    TOKEN_STORE_REDIS_URL: str = os.environ.get("TOKEN_STORE_REDIS_URL", "redis://localhost:6379/0")
+
+    # Expired token reaper config
+    # 建議以 `python -m app.reaper` 執行單一個 reaper process (或以排程執行 `--once`)；
+    # 開啟 `TOKEN_REAPER_ENABLED` 時每個 worker 都會執行一個 reaper，只適合單一 worker 的部署
+    TOKEN_REAPER_ENABLED: bool = os.environ.get("TOKEN_REAPER_ENABLED", "false").lower() == "true"
+    TOKEN_REAPER_INTERVAL_SECONDS: int = int(os.environ.get("TOKEN_REAPER_INTERVAL_SECONDS", 300))
+    TOKEN_REAPER_BATCH_SIZE: int = int(os.environ.get("TOKEN_REAPER_BATCH_SIZE", 1000))
+
+    # Revoked access token config
+    # 每個 worker 的 Bloom filter 容量與誤判率，誤判時會多一次資料庫查詢
+    REVOKED_TOKEN_FILTER_CAPACITY: int = int(
+        os.environ.get("REVOKED_TOKEN_FILTER_CAPACITY", 100000)
+    )
+    REVOKED_TOKEN_FILTER_ERROR_RATE: float = float(
+        os.environ.get("REVOKED_TOKEN_FILTER_ERROR_RATE", 0.001)
+    )
+    # 其他 worker 撤銷的 token 最多延遲 `REVOKED_TOKEN_REFRESH_SECONDS` 秒生效
+    REVOKED_TOKEN_REFRESH_SECONDS: float = float(os.environ.get("REVOKED_TOKEN_REFRESH_SECONDS", 1))
+    REVOKED_TOKEN_REBUILD_SECONDS: float = float(
+        os.environ.get("REVOKED_TOKEN_REBUILD_SECONDS", 300)
+    )
+    # 同步時重新讀取最近 `REVOKED_TOKEN_SYNC_MARGIN_SECONDS` 秒新增的資料，需大於撤銷的 transaction 時間
+    REVOKED_TOKEN_SYNC_MARGIN_SECONDS: float = float(
+        os.environ.get("REVOKED_TOKEN_SYNC_MARGIN_SECONDS", 60)
+    )
 
 
 @lru_cache
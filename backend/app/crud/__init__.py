@@ -1 +1,8 @@
-from . import crud_user
+from . import (
+    async_crud_email_outbox,
+    async_crud_revoked_token,
+    async_crud_user,
+    crud_email_outbox,
+    crud_revoked_token,
+    crud_user,
+)
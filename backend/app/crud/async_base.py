@@ -0,0 +1,167 @@
+import logging
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, TypeVar, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import ColumnElement
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import database
+from app.config.settings import get_settings
+from app.crud import base
+from app.crud.base import CreateSchemaType, CRUDBase, ModelType, Page, UpdateSchemaType
+
+SessionType = Union[Session, AsyncSession]
+ReturnType = TypeVar("ReturnType")
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+async def run_sync(
+    db: SessionType, fn: Callable[..., ReturnType], *args: Any, **kwargs: Any
+) -> ReturnType:
+    """在不阻塞 event loop 的情況下執行同步的 db 操作 `fn(session, *args, **kwargs)`
+
+    * `AsyncSession`：透過 `run_sync` 執行，底層使用 async driver
+    * `Session`：丟到 threadpool 中執行
+    """
+
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def new_session(**kwargs: Any) -> SessionType:
+    """依照 `DB_ASYNC` 建立背景 task 使用的 session，`kwargs` 會傳給 sessionmaker"""
+
+    if settings.DB_ASYNC:
+        return database.AsyncSessionLocal(**kwargs)
+
+    return database.SessionLocal(**kwargs)
+
+
+async def close_session(db: SessionType) -> None:
+    """關閉 session
+
+    在背景 task 被取消時，`Session` 可能仍在 threadpool 中執行，此時關閉失敗只記錄錯誤，
+    避免取代原本的 `CancelledError`
+    """
+
+    try:
+        if isinstance(db, AsyncSession):
+            await db.close()
+
+        else:
+            db.close()
+
+    except Exception as close_exec:
+        logger.warning("Failed to close session: %r", close_exec)
+
+
+async def commit(db: SessionType) -> None:
+    """commit `commit=False` 累積的變更"""
+
+    await run_sync(db, base.commit)
+
+
+async def refresh(db: SessionType, obj: Any) -> None:
+    """flush 並重新讀取 `obj`"""
+
+    await run_sync(db, base.refresh, obj)
+
+
+async def rollback(db: SessionType) -> None:
+
+    await run_sync(db, base.rollback)
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+
+    def __init__(self, crud: CRUDBase[ModelType, CreateSchemaType, UpdateSchemaType]):
+        """
+        `CRUDBase` 的 async 版本，同時支援 `Session` 和 `AsyncSession`
+
+        Args:
+            * `crud`: 實際執行查詢的 `CRUDBase` 物件
+        """
+
+        self.crud = crud
+
+    async def get(self, db: SessionType, id: Any) -> Optional[ModelType]:
+
+        return await run_sync(db, self.crud.get, id)
+
+    async def get_multi(
+        self, db: SessionType, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+
+        return await run_sync(db, self.crud.get_multi, skip=skip, limit=limit)
+
+    async def get_page(
+        self,
+        db: SessionType,
+        *,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        order_by: Sequence[str] = ("id",),
+    ) -> Page[ModelType]:
+
+        return await run_sync(db, self.crud.get_page, limit=limit, cursor=cursor, order_by=order_by)
+
+    async def create(
+        self, db: SessionType, *, obj_in: CreateSchemaType, commit: bool = True
+    ) -> ModelType:
+
+        return await run_sync(db, self.crud.create, obj_in=obj_in, commit=commit)
+
+    async def update(
+        self,
+        db: SessionType,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        commit: bool = True,
+    ) -> ModelType:
+
+        return await run_sync(db, self.crud.update, db_obj=db_obj, obj_in=obj_in, commit=commit)
+
+    async def remove(self, db: SessionType, *, id: Any, commit: bool = True) -> None:
+
+        return await run_sync(db, self.crud.remove, id=id, commit=commit)
+
+    async def create_many(
+        self,
+        db: SessionType,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        commit: bool = True,
+    ) -> List[ModelType]:
+
+        return await run_sync(db, self.crud.create_many, objs_in=objs_in, commit=commit)
+
+    async def update_many(
+        self,
+        db: SessionType,
+        *,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        ids: Optional[Sequence[Any]] = None,
+        where: Optional[Sequence[ColumnElement[bool]]] = None,
+        commit: bool = True,
+    ) -> int:
+
+        return await run_sync(
+            db, self.crud.update_many, obj_in=obj_in, ids=ids, where=where, commit=commit
+        )
+
+    async def remove_many(
+        self,
+        db: SessionType,
+        *,
+        ids: Optional[Sequence[Any]] = None,
+        where: Optional[Sequence[ColumnElement[bool]]] = None,
+        commit: bool = True,
+    ) -> int:
+
+        return await run_sync(db, self.crud.remove_many, ids=ids, where=where, commit=commit)
@@ -0,0 +1,51 @@
+from typing import List
+
+from app.crud.async_base import AsyncCRUDBase, SessionType, run_sync
+from app.crud.crud_email_outbox import email_outbox_crud
+from app.models.email_outbox import EmailOutbox
+from app.schemas import db_schemas
+
+
+class AsyncEmailOutboxCRUD(
+    AsyncCRUDBase[
+        EmailOutbox,
+        db_schemas.email_outbox.EmailOutboxDBCreate,
+        db_schemas.email_outbox.EmailOutboxDBUpdate,
+    ]
+):
+
+    async def claim_batch(
+        self, db: SessionType, *, batch_size: int, lease_seconds: float
+    ) -> List[EmailOutbox]:
+
+        return await run_sync(
+            db, self.crud.claim_batch, batch_size=batch_size, lease_seconds=lease_seconds
+        )
+
+    async def mark_sent(self, db: SessionType, *, job: EmailOutbox, commit: bool = True) -> None:
+
+        return await run_sync(db, self.crud.mark_sent, job=job, commit=commit)
+
+    async def mark_failed(
+        self,
+        db: SessionType,
+        *,
+        job: EmailOutbox,
+        error: str,
+        max_attempts: int,
+        retry_backoff: float,
+        commit: bool = True,
+    ) -> None:
+
+        return await run_sync(
+            db,
+            self.crud.mark_failed,
+            job=job,
+            error=error,
+            max_attempts=max_attempts,
+            retry_backoff=retry_backoff,
+            commit=commit,
+        )
+
+
+async_email_outbox_crud = AsyncEmailOutboxCRUD(email_outbox_crud)
@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from app.crud.async_base import AsyncCRUDBase, SessionType, run_sync
+from app.crud.crud_revoked_token import revoked_token_crud
+from app.models.revoked_token import RevokedToken
+from app.schemas import db_schemas
+
+
+class AsyncRevokedTokenCRUD(
+    AsyncCRUDBase[
+        RevokedToken,
+        db_schemas.revoked_token.RevokedTokenDBCreate,
+        db_schemas.revoked_token.RevokedTokenDBUpdate,
+    ]
+):
+
+    async def get_by_hash(self, db: SessionType, *, token_hash: bytes) -> Optional[RevokedToken]:
+
+        return await run_sync(db, self.crud.get_by_hash, token_hash=token_hash)
+
+    async def revoke(
+        self, db: SessionType, *, token_hash: bytes, expires_at: datetime, commit: bool = True
+    ) -> None:
+
+        return await run_sync(
+            db, self.crud.revoke, token_hash=token_hash, expires_at=expires_at, commit=commit
+        )
+
+    async def get_created_since(
+        self, db: SessionType, *, since: Optional[datetime], last_id: int = 0, limit: int
+    ) -> List[Tuple[int, bytes, datetime]]:
+
+        return await run_sync(
+            db, self.crud.get_created_since, since=since, last_id=last_id, limit=limit
+        )
+
+    async def get_active(self, db: SessionType) -> List[Tuple[int, bytes, datetime]]:
+
+        return await run_sync(db, self.crud.get_active)
+
+    async def delete_expired_batch(self, db: SessionType, *, batch_size: int) -> int:
+        """依照 `expires_at` 順序刪除一批過期的資料"""
+
+        return await run_sync(db, self.crud.delete_expired_batch, batch_size=batch_size)
+
+
+async_revoked_token_crud = AsyncRevokedTokenCRUD(revoked_token_crud)
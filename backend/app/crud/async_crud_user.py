@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Optional
+
+from app.crud.async_base import AsyncCRUDBase, SessionType, run_sync
+from app.crud.crud_user import user_crud, user_token_crud
+from app.models.user import User, UserToken
+from app.schemas import db_schemas
+
+
+class AsyncUserCRUD(
+    AsyncCRUDBase[User, db_schemas.user.UserDBCreate, db_schemas.user.UserDBUpdate]
+):
+
+    async def get_by_email(self, db: SessionType, *, email: str) -> Optional[User]:
+
+        return await run_sync(db, self.crud.get_by_email, email=email)
+
+
+class AsyncUserTokenCRUD(
+    AsyncCRUDBase[UserToken, db_schemas.user.UserTokenDBCreate, db_schemas.user.UserTokenDBUpdate]
+):
+
+    async def get_by_key(self, db: SessionType, *, token_key: str) -> Optional[UserToken]:
+
+        return await run_sync(db, self.crud.get_by_key, token_key=token_key)
+
+    async def replace_key(
+        self,
+        db: SessionType,
+        *,
+        id: int,
+        token_hash: bytes,
+        new_token_hash: bytes,
+        expires_at: datetime
+    ) -> bool:
+
+        return await run_sync(
+            db,
+            self.crud.replace_key,
+            id=id,
+            token_hash=token_hash,
+            new_token_hash=new_token_hash,
+            expires_at=expires_at,
+        )
+
+    async def delete_expired_batch(self, db: SessionType, *, batch_size: int) -> int:
+        """依照 `expires_at` 順序刪除一批過期的 token"""
+
+        return await run_sync(db, self.crud.delete_expired_batch, batch_size=batch_size)
+
+
+async_user_crud = AsyncUserCRUD(user_crud)
+async_user_token_crud = AsyncUserTokenCRUD(user_token_crud)
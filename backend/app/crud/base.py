@@ -1,6 +1,12 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Type, TypeVar, Union
 
 from pydantic import BaseModel
+from sqlalchemy import ColumnElement, and_, delete, insert, or_, select, text, update
 from sqlalchemy.orm import Session
 
 from app.config.database import Base
@@ -9,19 +15,104 @@ ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# 尚未 commit 的變更，commit 後才呼叫 `on_change`
+_PENDING_CHANGES = "crud_pending_changes"
+
+
+def commit(db: Session) -> None:
+    """commit `commit=False` 累積的變更，並在 commit 成功後通知 `on_change`"""
+
+    db.commit()
+
+    for callback, id in db.info.pop(_PENDING_CHANGES, []):
+        callback(id)
+
+
+# `create_many` 等方法的 `commit` 參數會遮蔽 `commit()`
+_commit_changes = commit
+
+
+def refresh(db: Session, obj: Any) -> None:
+    """flush 尚未 commit 的變更並重新讀取 `obj`，用來在 commit 之前取得 id 等資料庫產生的欄位"""
+
+    db.flush()
+    db.refresh(obj)
+
+
+def _supports_returning(db: Session, statement: str) -> bool:
+    """資料庫是否支援 `statement` (`insert_executemany`、`update`、`delete`) 的 RETURNING"""
+
+    return getattr(db.get_bind().dialect, f"{statement}_returning")
+
+
+def rollback(db: Session) -> None:
+
+    db.rollback()
+    db.info.pop(_PENDING_CHANGES, None)
+
+
+@dataclass
+class Page(Generic[ModelType]):
+    """keyset 分頁的結果，`next_cursor` 為 `None` 代表已經是最後一頁"""
+
+    items: List[ModelType]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(order_by: Sequence[str], values: Sequence[Any]) -> str:
+    """將排序欄位與最後一筆資料的值編碼成不透明的 cursor"""
+
+    keys = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    data = json.dumps([list(order_by), keys], separators=(",", ":"))
+
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: Sequence[str]) -> List[Any]:
+    """解碼 cursor，格式錯誤或排序欄位不同時拋出 `ValueError`"""
+
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order_by, keys = json.loads(data)
+
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor.")
+
+    if cursor_order_by != list(order_by) or len(keys) != len(order_by):
+        raise ValueError("Invalid cursor.")
+
+    try:
+        return [datetime.fromisoformat(key["dt"]) if isinstance(key, dict) else key for key in keys]
+
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Invalid cursor.")
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
-    def __init__(self, model: Type[ModelType]):
+    def __init__(self, model: Type[ModelType], on_change: Optional[Callable[[Any], None]] = None):
         """
         擁有 Create, Read, Update, Delete (CRUD) 的物件
 
         Args:
             * `model`: A SQLAlchemy model class
             * `schema`: A Pydantic model class
+            * `on_change`: 資料更新或刪除後會以該筆資料的 id 呼叫，用來清除快取
         """
 
         self.model = model
+        self.on_change = on_change
+
+    def _notify_change(self, db: Session, id: Any, commit: bool = True) -> None:
+
+        if self.on_change is None:
+            return
+
+        if commit:
+            self.on_change(id)
+
+        else:
+            db.info.setdefault(_PENDING_CHANGES, []).append((self.on_change, id))
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
 
@@ -31,22 +122,74 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         return db.query(self.model).offset(skip).limit(limit).all()
 
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
+    def get_page(
+        self,
+        db: Session,
+        *,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        order_by: Sequence[str] = ("id",),
+    ) -> Page[ModelType]:
+        """keyset 分頁，以上一頁回傳的 `next_cursor` 取得下一頁
+
+        與 `get_multi` 的 offset 不同，不需要掃過前面的資料，任何深度的分頁查詢成本都相同。
+        `order_by` 的欄位組合必須唯一 (最後一個欄位通常是 `id`)，且應該建立對應的索引
+        """
+
+        columns = [getattr(self.model, name) for name in order_by]
+        stmt = select(self.model).order_by(*columns).limit(limit + 1)
+
+        if cursor is not None:
+            keys = decode_cursor(cursor, order_by)
+
+            # (a, b) > (x, y) 展開成 a > x OR (a = x AND b > y)，所有資料庫都能使用索引
+            stmt = stmt.where(
+                or_(
+                    *(
+                        and_(
+                            *(column == key for column, key in zip(columns[:i], keys[:i])),
+                            columns[i] > keys[i],
+                        )
+                        for i in range(len(columns))
+                    )
+                )
+            )
+
+        items = list(db.scalars(stmt).all())
+        next_cursor = None
+
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(order_by, [getattr(items[-1], name) for name in order_by])
+
+        return Page(items=items, next_cursor=next_cursor)
+
+    def create(self, db: Session, *, obj_in: CreateSchemaType, commit: bool = True) -> ModelType:
+        """`commit=False` 時只會加入 session，由呼叫端透過 `commit()` 一次送出 (unit of work)，
+        此時回傳的物件在 flush 之前不會有 id 等資料庫產生的欄位
+        """
 
         objin_data = obj_in.model_dump()
 
         db_obj = self.model(**objin_data)
 
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+
+        if commit:
+            db.commit()
+            db.refresh(db_obj)
 
         return db_obj
 
     def update(
-        self, db: Session, *, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        self,
+        db: Session,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        commit: bool = True,
     ) -> ModelType:
-        """支援使用 `UpdateSchemaType` 或 dict 的方式更新
+        """支援使用 `UpdateSchemaType` 或 dict 的方式更新，`commit=False` 時不會 commit 和 refresh
 
         例如：
         ```python
@@ -70,15 +213,199 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 setattr(db_obj, field, update_data[field])
 
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+
+        if commit:
+            db.commit()
+            db.refresh(db_obj)
+
+        self._notify_change(db, getattr(db_obj, "id", None), commit)
 
         return db_obj
 
-    def remove(self, db: Session, *, id: Any) -> None:
+    def remove(self, db: Session, *, id: Any, commit: bool = True) -> None:
 
         obj = db.get(self.model, id)
 
         if obj:
             db.delete(obj)
+
+            if commit:
+                db.commit()
+
+            self._notify_change(db, id, commit)
+
+    def _bulk_criteria(
+        self, ids: Optional[Sequence[Any]], where: Optional[Sequence[ColumnElement[bool]]]
+    ) -> List[ColumnElement[bool]]:
+
+        if ids is None and not where:
+            raise ValueError("ids or where is required.")
+
+        criteria = list(where or [])
+
+        if ids is not None:
+            criteria.append(self.model.id.in_(ids))
+
+        return criteria
+
+    def _execute_bulk(self, db: Session, stmt: Any, criteria: List[Any], returning: bool) -> int:
+        """執行批次 update / delete，有 `on_change` 時取得受影響的 id 並通知
+
+        資料庫支援 RETURNING 時在同一個 statement 取得 id，否則先查詢 id 再以 id 更新
+        """
+
+        if self.on_change is None:
+            return db.execute(stmt.where(*criteria)).rowcount
+
+        if returning:
+            ids = db.scalars(stmt.where(*criteria).returning(self.model.id)).all()
+
+        else:
+            ids = db.scalars(select(self.model.id).where(*criteria)).all()
+
+            if ids:
+                db.execute(stmt.where(self.model.id.in_(ids)))
+
+        for id in ids:
+            self._notify_change(db, id, commit=False)
+
+        return len(ids)
+
+    def create_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        commit: bool = True,
+    ) -> List[ModelType]:
+        """一次新增多筆資料
+
+        資料庫支援 executemany RETURNING (SQLite、PostgreSQL、MariaDB) 時以 `insert().returning()`
+        一次寫入並取回資料。MySQL 不支援 RETURNING，自動遞增值保證連續時以一個多列 `INSERT`
+        寫入後依 id 重新查詢；其他情況交由 session flush，每筆資料各一個 `INSERT`
+        """
+
+        if not objs_in:
+            return []
+
+        values = [obj if isinstance(obj, dict) else obj.model_dump() for obj in objs_in]
+        id_column = self.model.__table__.autoincrement_column
+
+        if _supports_returning(db, "insert_executemany"):
+            db_objs = list(db.scalars(insert(self.model).returning(self.model), values).all())
+
+        else:
+            db_objs = None
+
+            if (
+                db.get_bind().dialect.name == "mysql"
+                and id_column is not None
+                and not any(id_column.key in value for value in values)
+            ):
+                db_objs = self._insert_many_mysql(db, values, id_column)
+
+            if db_objs is None:
+                db_objs = [self.model(**value) for value in values]
+                db.add_all(db_objs)
+                db.flush()
+
+        if commit:
             db.commit()
+
+        return db_objs
+
+    def _insert_many_mysql(
+        self, db: Session, values: List[Dict[str, Any]], id_column: Any
+    ) -> Optional[List[ModelType]]:
+        """以一個多列 `INSERT` 寫入，再依 id 重新查詢寫入的資料
+
+        `innodb_autoinc_lock_mode` 為 0 或 1 時，InnoDB 會在 statement 期間持有 AUTO-INC 鎖，
+        一個多列 `INSERT` 取得的 id 從 `lastrowid` 開始、依 `auto_increment_increment` 遞增。
+        lock mode 為 2 (MySQL 8 預設、Galera 必須) 時，並行的 `INSERT` 可能交錯取得 id，
+        此時回傳 `None` 交由 session flush 逐筆寫入
+        """
+
+        lock_mode, step = db.execute(
+            text("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment")
+        ).one()
+
+        if lock_mode == 2:
+            return None
+
+        first_id = db.execute(insert(self.model).values(values)).lastrowid
+        ids = [first_id + i * step for i in range(len(values))]
+
+        db_objs = list(db.scalars(select(self.model).where(id_column.in_(ids)).order_by(id_column)))
+
+        if len(db_objs) != len(values):
+            raise RuntimeError(
+                f"Expected {len(values)} inserted rows from id {first_id}, found {len(db_objs)}."
+            )
+
+        return db_objs
+
+    def update_many(
+        self,
+        db: Session,
+        *,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        ids: Optional[Sequence[Any]] = None,
+        where: Optional[Sequence[ColumnElement[bool]]] = None,
+        commit: bool = True,
+    ) -> int:
+        """以一個 `UPDATE` 更新 `ids` 或符合 `where` 條件的資料，並回傳更新的筆數
+
+        與 `update` 相同，值為 `None` 的欄位不會更新
+
+        例如：
+        ```python
+
+            user_crud.update_many(db, obj_in={"is_active": False}, ids=[1, 2, 3])
+            user_crud.update_many(db, obj_in={"is_active": False}, where=[User.verified_at.is_(None)])
+        ```
+        """
+
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+
+        update_data = {key: value for key, value in update_data.items() if value is not None}
+        criteria = self._bulk_criteria(ids, where)
+
+        if not update_data:
+            return 0
+
+        count = self._execute_bulk(
+            db,
+            update(self.model).values(**update_data),
+            criteria,
+            _supports_returning(db, "update"),
+        )
+
+        if commit:
+            _commit_changes(db)
+
+        return count
+
+    def remove_many(
+        self,
+        db: Session,
+        *,
+        ids: Optional[Sequence[Any]] = None,
+        where: Optional[Sequence[ColumnElement[bool]]] = None,
+        commit: bool = True,
+    ) -> int:
+        """以一個 `DELETE` 刪除 `ids` 或符合 `where` 條件的資料，並回傳刪除的筆數"""
+
+        criteria = self._bulk_criteria(ids, where)
+
+        count = self._execute_bulk(
+            db, delete(self.model), criteria, _supports_returning(db, "delete")
+        )
+
+        if commit:
+            _commit_changes(db)
+
+        return count
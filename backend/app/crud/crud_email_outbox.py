@@ -0,0 +1,92 @@
+from datetime import timedelta
+from typing import List
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.models.email_outbox import EmailOutbox, utc_now
+from app.schemas import db_schemas
+
+
+class EmailOutboxCRUD(
+    CRUDBase[
+        EmailOutbox,
+        db_schemas.email_outbox.EmailOutboxDBCreate,
+        db_schemas.email_outbox.EmailOutboxDBUpdate,
+    ]
+):
+
+    def claim_batch(
+        self, db: Session, *, batch_size: int, lease_seconds: float
+    ) -> List[EmailOutbox]:
+        """取出最多 `batch_size` 筆可寄送的 email，並 commit
+
+        使用 `SELECT ... FOR UPDATE SKIP LOCKED`，多個 sender 同時執行時不會取到相同的資料，
+        取出的資料會延後 `lease_seconds` 才能再被取出，sender 在寄送途中中斷時，
+        資料會在時間到後被其他 sender 重新取出
+        """
+
+        now = utc_now()
+
+        jobs = db.scalars(
+            select(self.model)
+            .where(self.model.status == "pending", self.model.available_at <= now)
+            .order_by(self.model.available_at, self.model.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        if jobs:
+            db.execute(
+                update(self.model)
+                .where(self.model.id.in_([job.id for job in jobs]))
+                .values(available_at=now + timedelta(seconds=lease_seconds))
+            )
+
+        db.commit()
+
+        return jobs
+
+    def mark_sent(self, db: Session, *, job: EmailOutbox, commit: bool = True) -> None:
+
+        job.status = "sent"
+        job.attempts += 1
+        job.sent_at = utc_now()
+        job.last_error = None
+
+        db.add(job)
+
+        if commit:
+            db.commit()
+
+    def mark_failed(
+        self,
+        db: Session,
+        *,
+        job: EmailOutbox,
+        error: str,
+        max_attempts: int,
+        retry_backoff: float,
+        commit: bool = True,
+    ) -> None:
+        """記錄寄送失敗，並以指數退避延後下次寄送的時間，超過 `max_attempts` 次後標記為 `failed`"""
+
+        job.attempts += 1
+        job.last_error = error
+
+        if job.attempts >= max_attempts:
+            job.status = "failed"
+
+        else:
+            job.available_at = utc_now() + timedelta(
+                seconds=retry_backoff * 2 ** (job.attempts - 1)
+            )
+
+        db.add(job)
+
+        if commit:
+            db.commit()
+
+
+email_outbox_crud = EmailOutboxCRUD(EmailOutbox)
@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.models.email_outbox import utc_now
+from app.models.revoked_token import RevokedToken
+from app.schemas import db_schemas
+
+
+class RevokedTokenCRUD(
+    CRUDBase[
+        RevokedToken,
+        db_schemas.revoked_token.RevokedTokenDBCreate,
+        db_schemas.revoked_token.RevokedTokenDBUpdate,
+    ]
+):
+
+    def get_by_hash(self, db: Session, *, token_hash: bytes) -> Optional[RevokedToken]:
+
+        return db.scalars(select(self.model).where(self.model.token_hash == token_hash)).first()
+
+    def revoke(
+        self, db: Session, *, token_hash: bytes, expires_at: datetime, commit: bool = True
+    ) -> None:
+        """撤銷 access token，已經撤銷過的 token 不會重複寫入"""
+
+        if self.get_by_hash(db, token_hash=token_hash) is not None:
+            return
+
+        obj_in = db_schemas.revoked_token.RevokedTokenDBCreate(
+            token_hash=token_hash, expires_at=expires_at
+        )
+
+        self.create(db, obj_in=obj_in, commit=commit)
+
+    def get_created_since(
+        self, db: Session, *, since: Optional[datetime], last_id: int = 0, limit: int
+    ) -> List[Tuple[int, bytes, datetime]]:
+        """依照 `id` 順序取得 `create_at >= since` 且 `id > last_id` 最多 `limit` 筆的
+        `(id, token_hash, create_at)`，`since` 為 `None` 時不限制 `create_at`
+        """
+
+        stmt = select(self.model.id, self.model.token_hash, self.model.create_at).where(
+            self.model.id > last_id
+        )
+
+        if since is not None:
+            stmt = stmt.where(self.model.create_at >= since)
+
+        rows = db.execute(stmt.order_by(self.model.id).limit(limit)).all()
+
+        return [tuple(row) for row in rows]
+
+    def get_active(
+        self, db: Session, *, now: Optional[datetime] = None
+    ) -> List[Tuple[int, bytes, datetime]]:
+        """取得所有尚未過期的 `(id, token_hash, create_at)`"""
+
+        if now is None:
+            now = utc_now()
+
+        rows = db.execute(
+            select(self.model.id, self.model.token_hash, self.model.create_at).where(
+                self.model.expires_at > now
+            )
+        ).all()
+
+        return [tuple(row) for row in rows]
+
+    def delete_expired_batch(
+        self, db: Session, *, batch_size: int, now: Optional[datetime] = None
+    ) -> int:
+        """依照 `expires_at` 順序刪除最多 `batch_size` 筆過期的資料，並回傳刪除的筆數"""
+
+        if now is None:
+            now = utc_now()
+
+        ids = db.scalars(
+            select(self.model.id)
+            .where(self.model.expires_at < now)
+            .order_by(self.model.expires_at)
+            .limit(batch_size)
+        ).all()
+
+        if not ids:
+            return 0
+
+        db.execute(delete(self.model).where(self.model.id.in_(ids)))
+        db.commit()
+
+        return len(ids)
+
+
+revoked_token_crud = RevokedTokenCRUD(RevokedToken)
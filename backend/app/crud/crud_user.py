@@ -1,11 +1,14 @@
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
 
+from app.cache import invalidate_user
 from app.crud.base import CRUDBase
 from app.models.user import User, UserToken
 from app.schemas import db_schemas
+from app.security import hash_token_key
 
 
 class UserCRUD(CRUDBase[User, db_schemas.user.UserDBCreate, db_schemas.user.UserDBUpdate]):
@@ -19,40 +22,61 @@ class UserTokenCRUD(
     CRUDBase[UserToken, db_schemas.user.UserTokenDBCreate, db_schemas.user.UserTokenDBUpdate]
 ):
 
-    def get_user(self, db: Session, *, token_id: int, access_key: str, user_id: int) -> User:
-
-        user_token = (
-            db.query(self.model)
-            .options(joinedload(UserToken.user))
-            .filter(
-                UserToken.id == token_id,
-                UserToken.access_key == access_key,
-                UserToken.user_id == user_id,
-                UserToken.expires_at > datetime.now(),
-            )
-            .first()
+    def get_by_key(self, db: Session, *, token_key: str) -> Optional[UserToken]:
+        """以 token key 的 SHA-256 digest 透過 `ix_user_tokens_token_hash` 唯一索引取得 token"""
+
+        return db.scalars(
+            select(self.model).where(self.model.token_hash == hash_token_key(token_key))
+        ).first()
+
+    def replace_key(
+        self,
+        db: Session,
+        *,
+        id: int,
+        token_hash: bytes,
+        new_token_hash: bytes,
+        expires_at: datetime
+    ) -> bool:
+        """以新的 token 取代 `id` 的 token，不會 commit
+
+        只有 token 仍為 `token_hash` 時才會更新，已經被其他請求取代時回傳 `False`
+        """
+
+        result = db.execute(
+            update(self.model)
+            .where(self.model.id == id, self.model.token_hash == token_hash)
+            .values(token_hash=new_token_hash, expires_at=expires_at)
         )
 
-        if not user_token:
-            return None
+        return result.rowcount == 1
 
-        return user_token.user
+    def delete_expired_batch(
+        self, db: Session, *, batch_size: int, now: Optional[datetime] = None
+    ) -> int:
+        """依照 `expires_at` 順序刪除最多 `batch_size` 筆過期的 token，並回傳刪除的筆數
 
-    def get_by_key(self, db: Session, *, token_key: str) -> Optional[UserToken]:
+        先透過 `expires_at` 索引取得 id 再刪除，每次只鎖定一小批資料
+        """
 
-        return db.query(self.model).filter(self.model.token_key == token_key).first()
+        if now is None:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
 
-    def clear_up_expired_tokens(self, db: Session, *, user_id: int) -> None:
-        """清除過期的 token"""
+        ids = db.scalars(
+            select(self.model.id)
+            .where(self.model.expires_at < now)
+            .order_by(self.model.expires_at)
+            .limit(batch_size)
+        ).all()
 
-        # 為了能夠比對 datetime 的值，需把 timezone 設為 None
-        db.query(self.model).filter(
-            self.model.user_id == user_id,
-            self.model.expires_at < datetime.now(timezone.utc).replace(tzinfo=None),
-        ).delete()
+        if not ids:
+            return 0
 
+        db.execute(delete(self.model).where(self.model.id.in_(ids)))
         db.commit()
 
+        return len(ids)
+
 
-user_crud = UserCRUD(User)
+user_crud = UserCRUD(User, on_change=invalidate_user)
 user_token_crud = UserTokenCRUD(UserToken)
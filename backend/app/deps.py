@@ -1,22 +1,27 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.config.database import SessionLocal
+from app.cache import UserSnapshot, user_cache
+from app.config.database import AsyncSessionLocal, SessionLocal
 from app.config.settings import get_settings
-from app.crud import crud_user
+from app.crud import async_crud_user
+from app.crud.async_base import SessionType
 from app.models.user import User
-from app.schemas import utils_schemas
-from app.security import get_token_payload, str_decode
+from app.revocation import revocation_list
+from app.schemas import response_schemas, utils_schemas
+from app.security import get_token_payload
+from app.token_codec import token_codec
 
 settings = get_settings()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_session() -> Generator[Session, None, None]:
+def get_sync_session() -> Generator[Session, None, None]:
     """取得 db session 實例"""
 
     session = SessionLocal()
@@ -28,12 +33,21 @@ def get_session() -> Generator[Session, None, None]:
         session.close()
 
 
-def get_token_user(token: str, session: Session) -> User:
-    """從 token 中取得使用者資訊"""
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """取得 async db session 實例，需要開啟 `DB_ASYNC`"""
+
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+# 根據 `DB_ASYNC` 決定 request 使用的 session 種類
+get_session = get_async_session if settings.DB_ASYNC else get_sync_session
+
 
-    payload = get_token_payload(token, settings.JWT_SECRET, settings.JWT_ALGORITHM)
+def get_token_claims(token: str) -> utils_schemas.jwt.JWTPayload:
+    """驗證 access token，並回傳 token 中的資訊"""
 
-    user = None
+    payload = get_token_payload(token, token_codec)
 
     # NOTE 這邊可以再重構一下
     if "error" in payload:
@@ -44,32 +58,132 @@ def get_token_user(token: str, session: Session) -> User:
             raise HTTPException(status_code=401, detail="Not authorised.")
 
     try:
-        payload_obj = utils_schemas.jwt.JWTPayload(**payload)
+        payload_obj = utils_schemas.jwt.JWTPayload.from_claims(
+            payload, accept_legacy=settings.JWT_ACCEPT_LEGACY_CLAIMS
+        )
 
     except ValueError:
         raise HTTPException(status_code=401, detail="Not authorised.")
 
     # 防止傳入的 token 不是 access_token 而是 refresh_token 而造成錯誤
-    token_purpose = str_decode(payload_obj.p)
-
-    if token_purpose != "at":
+    if payload_obj.p != "at":
         raise HTTPException(status_code=401, detail="Not authorised.")
 
-    user_id = str_decode(payload_obj.sub)
+    return payload_obj
+
+
+def get_token_user_id(token: str) -> int:
+    """驗證 access token，並回傳 token 所屬的使用者 id"""
+
+    return get_token_claims(token).sub
+
+
+async def get_valid_token_claims(token: str, session: SessionType) -> utils_schemas.jwt.JWTPayload:
+    """驗證 access token，並檢查 token 是否已經在登出時被撤銷
+
+    大部分的 token 只需要檢查記憶體中的 Bloom filter，不會查詢資料庫
+    """
+
+    payload_obj = get_token_claims(token)
+
+    if await revocation_list.is_revoked(session, token_key=payload_obj.t):
+        raise HTTPException(status_code=401, detail="Token revoked.")
+
+    return payload_obj
+
+
+async def get_current_token_claims(
+    token: str = Depends(oauth2_scheme), session: SessionType = Depends(get_session)
+) -> utils_schemas.jwt.JWTPayload:
+    """取得目前 access token 中的資訊，例如登出時需要撤銷的 token key"""
+
+    return await get_valid_token_claims(token, session)
+
+
+async def get_token_user(token: str, session: SessionType) -> User:
+    """從 token 中取得使用者資訊"""
+
+    user_id = (await get_valid_token_claims(token, session)).sub
+
+    user = await async_crud_user.async_user_crud.get(session, id=user_id)
 
-    user = crud_user.user_crud.get(session, id=user_id)
+    if user:
+        user_cache.set(user.id, UserSnapshot.from_user(user))
 
     return user
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), session: SessionType = Depends(get_session)
 ) -> User:
     """從 token 中取得使用者資訊，並檢查 token 是否有效"""
 
-    user = get_token_user(token, session)
+    user = await get_token_user(token, session)
 
     if not user:
         raise HTTPException(status_code=401, detail="Not authorised.")
 
     return user
+
+
+async def get_current_user_snapshot(
+    payload_obj: utils_schemas.jwt.JWTPayload = Depends(get_current_token_claims),
+    session: SessionType = Depends(get_session),
+) -> UserSnapshot:
+    """從 token 中取得使用者資訊，優先使用快取，只有在快取未命中時才查詢資料庫
+
+    token 由 `get_current_token_claims` 驗證，同一個請求中的其他依賴可以共用，不會再解碼一次。
+    回傳的 `UserSnapshot` 不綁定 db session，需要更新使用者資料時請使用 `get_current_user`
+    """
+
+    return await _get_user_snapshot(payload_obj.sub, session)
+
+
+async def _get_user_snapshot(user_id: int, session: SessionType) -> UserSnapshot:
+
+    snapshot = user_cache.get(user_id)
+
+    if snapshot is None:
+        user = await async_crud_user.async_user_crud.get(session, id=user_id)
+
+        if not user:
+            raise HTTPException(status_code=401, detail="Not authorised.")
+
+        snapshot = UserSnapshot.from_user(user)
+        user_cache.set(user_id, snapshot)
+
+    return snapshot
+
+
+async def get_token_profile(
+    token: str = Depends(oauth2_scheme), session: SessionType = Depends(get_session)
+) -> response_schemas.user.FetchUserResp:
+    """直接從 access token 的 `email`、`name` 取得使用者資料，不需要查詢資料庫
+
+    舊的 token 或沒有開啟 `JWT_PROFILE_CLAIMS` 時，會改用 `get_current_user_snapshot` 的方式取得
+    """
+
+    payload_obj = await get_valid_token_claims(token, session)
+    user_id = payload_obj.sub
+
+    if payload_obj.email is not None and payload_obj.name is not None:
+        return response_schemas.user.FetchUserResp(
+            id=user_id, email=payload_obj.email, name=payload_obj.name
+        )
+
+    snapshot = await _get_user_snapshot(user_id, session)
+
+    return response_schemas.user.FetchUserResp(
+        id=snapshot.id, email=snapshot.email, name=snapshot.name
+    )
+
+
+async def get_admin_user(
+    snapshot: UserSnapshot = Depends(get_current_user_snapshot),
+) -> UserSnapshot:
+    """只允許 `ADMIN_EMAILS` 中的使用者"""
+
+    if snapshot.email.lower() not in settings.ADMIN_EMAILS_LIST:
+        raise HTTPException(status_code=403, detail="Permission denied.")
+
+    return snapshot
@@ -0,0 +1,355 @@
+"""Email 寄送佇列
+
+以少量持續連線的 SMTP 連線寄送 email，取代每封信都開一條新連線的 `fm.send_message`：
+
+* 每個 worker 持有一條 SMTP 連線，一次從佇列取出最多 `batch_size` 封信在同一條連線上寄出
+* 寄送失敗時以指數退避重試，超過 `max_retries` 次後放入 dead letter
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from typing import Deque, List, Optional
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig, MessageSchema, MessageType
+
+from app import metrics
+from app.config.email import fm
+from app.config.settings import get_settings
+from app.email_templates import get_email_templates
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EMAIL_SENT_TOTAL = metrics.Counter("email_sent_total", "Emails sent by the dispatcher.")
+EMAIL_RETRIES_TOTAL = metrics.Counter("email_retries_total", "Email send retries.")
+EMAIL_DEAD_LETTERS_TOTAL = metrics.Counter(
+    "email_dead_letters_total", "Emails moved to the dead letter store."
+)
+
+
+@dataclass
+class EmailJob:
+    """一封待寄送的 email"""
+
+    message: MessageSchema
+    template_name: Optional[str] = None
+    attempts: int = 0
+
+
+@dataclass
+class DeadLetter:
+
+    job: EmailJob
+    error: str
+    failed_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class DeadLetterStore:
+    """保存重試後仍失敗的 email，超過 `max_size` 時會捨棄最舊的資料"""
+
+    def __init__(self, max_size: int = 1000) -> None:
+
+        self._items: Deque[DeadLetter] = deque(maxlen=max_size)
+
+    def add(self, job: EmailJob, error: Exception) -> None:
+
+        logger.error(
+            "Email to %s moved to dead letter after %s attempts: %r",
+            job.message.recipients,
+            job.attempts,
+            error,
+        )
+
+        self._items.append(DeadLetter(job=job, error=repr(error)))
+        EMAIL_DEAD_LETTERS_TOTAL.inc()
+
+    def items(self) -> List[DeadLetter]:
+
+        return list(self._items)
+
+    def __len__(self) -> int:
+
+        return len(self._items)
+
+
+class SMTPConnection:
+    """一條可重複使用的 SMTP 連線，斷線時會自動重新連線"""
+
+    def __init__(self, config: ConnectionConfig) -> None:
+
+        self.config = config
+
+        self._smtp = aiosmtplib.SMTP(
+            hostname=config.MAIL_SERVER,
+            port=config.MAIL_PORT,
+            timeout=config.TIMEOUT,
+            use_tls=config.MAIL_SSL_TLS,
+            start_tls=config.MAIL_STARTTLS,
+            validate_certs=config.VALIDATE_CERTS,
+        )
+
+    def build_message(self, job: EmailJob) -> EmailMessage:
+        """以標準函式庫的 `EmailMessage` 組成 email，不支援附件"""
+
+        message = job.message
+
+        if message.attachments:
+            raise ValueError("Attachments are not supported by the email dispatcher.")
+
+        if job.template_name and self.config.TEMPLATE_FOLDER:
+            templates = get_email_templates(self.config.TEMPLATE_FOLDER)
+            body = templates.render(job.template_name, message.template_body)
+
+        else:
+            body = message.body or ""
+
+        sender = self.config.MAIL_FROM
+
+        if self.config.MAIL_FROM_NAME is not None:
+            sender = formataddr((self.config.MAIL_FROM_NAME, self.config.MAIL_FROM))
+
+        email = EmailMessage()
+        email["Date"] = formatdate(localtime=True)
+        email["Message-ID"] = make_msgid()
+        email["From"] = sender
+        email["To"] = ", ".join(message.recipients)
+
+        if message.subject:
+            email["Subject"] = message.subject
+
+        # `aiosmtplib.send_message` 會把 `Bcc` 加入收件者，並在寄出前移除這個 header
+        for name, addresses in (
+            ("Cc", message.cc),
+            ("Bcc", message.bcc),
+            ("Reply-To", message.reply_to),
+        ):
+            if addresses:
+                email[name] = ", ".join(addresses)
+
+        for name, value in (message.headers or {}).items():
+            email[name] = value
+
+        email.set_content(body, subtype=message.subtype.value, charset=message.charset)
+
+        if message.alternative_body is not None:
+            alternative = "plain" if message.subtype == MessageType.html else "html"
+            email.add_alternative(
+                message.alternative_body, subtype=alternative, charset=message.charset
+            )
+
+        return email
+
+    async def _connect(self) -> None:
+
+        await self._smtp.connect()
+
+        if self.config.USE_CREDENTIALS:
+            await self._smtp.login(
+                self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD.get_secret_value()
+            )
+
+    async def send(self, job: EmailJob) -> None:
+
+        message = self.build_message(job)
+
+        if self.config.SUPPRESS_SEND:
+            return
+
+        if not self._smtp.is_connected:
+            await self._connect()
+
+        try:
+            await self._smtp.send_message(message)
+
+        except aiosmtplib.SMTPServerDisconnected:
+            # 閒置過久被 server 關閉的連線，重新連線後再寄一次
+            self.close()
+            await self._connect()
+            await self._smtp.send_message(message)
+
+        except Exception:
+            # 連線狀態不明，下次寄送時重新連線
+            self.close()
+            raise
+
+    def close(self) -> None:
+
+        if self._smtp.is_connected:
+            self._smtp.close()
+
+
+class EmailDispatcher:
+
+    def __init__(
+        self,
+        config: ConnectionConfig,
+        connections: int = 2,
+        batch_size: int = 20,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        queue_size: int = 10000,
+        dead_letter: Optional[DeadLetterStore] = None,
+    ) -> None:
+        """
+        Args:
+            * `config`: fastapi-mail 的連線設定
+            * `connections`: SMTP 連線 (worker) 數量
+            * `batch_size`: 每條連線一次最多連續寄出的 email 數量
+            * `max_retries`: 最多重試次數，超過後放入 dead letter
+            * `retry_backoff`: 第一次重試前等待的秒數，之後每次加倍
+            * `queue_size`: 佇列上限，佇列滿時 `submit` 會回傳 `False`
+        """
+
+        self.config = config
+        self.connections = connections
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.queue_size = queue_size
+        self.dead_letter = dead_letter if dead_letter is not None else DeadLetterStore()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retries: set = set()
+        self._pending = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+
+        return bool(self._workers)
+
+    @property
+    def pending(self) -> int:
+        """尚未寄出 (包含等待重試) 的 email 數量"""
+
+        return self._pending
+
+    def start(self) -> None:
+
+        if self.running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(max(self.connections, 1))
+        ]
+
+    async def stop(self, timeout: float = 10) -> None:
+        """等待佇列中的 email 寄出 (最多 `timeout` 秒) 後關閉所有連線"""
+
+        if not self.running:
+            return
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+
+        except asyncio.TimeoutError:
+            logger.warning("Email dispatcher stopped with %s pending emails.", self._pending)
+
+        for task in [*self._workers, *self._retries]:
+            task.cancel()
+
+        await asyncio.gather(*self._workers, *self._retries, return_exceptions=True)
+
+        self._workers = []
+        self._retries = set()
+
+    def submit(self, message: MessageSchema, template_name: Optional[str] = None) -> bool:
+        """將 email 放入佇列，dispatcher 未啟動或佇列已滿時回傳 `False`"""
+
+        if not self.running:
+            return False
+
+        try:
+            self._queue.put_nowait(EmailJob(message=message, template_name=template_name))
+
+        except asyncio.QueueFull:
+            return False
+
+        self._job_added()
+
+        return True
+
+    async def join(self) -> None:
+        """等待所有 email 寄出或放入 dead letter"""
+
+        await self._idle.wait()
+
+    def _job_added(self) -> None:
+
+        self._pending += 1
+        self._idle.clear()
+        metrics.EMAIL_QUEUE_DEPTH.inc()
+
+    def _job_done(self) -> None:
+
+        self._pending -= 1
+        metrics.EMAIL_QUEUE_DEPTH.dec()
+
+        if self._pending == 0:
+            self._idle.set()
+
+    async def _worker(self) -> None:
+
+        connection = SMTPConnection(self.config)
+
+        try:
+            while True:
+                jobs = [await self._queue.get()]
+
+                while len(jobs) < self.batch_size and not self._queue.empty():
+                    jobs.append(self._queue.get_nowait())
+
+                for job in jobs:
+                    try:
+                        await connection.send(job)
+
+                    except Exception as send_exec:
+                        self._retry(job, send_exec)
+
+                    else:
+                        EMAIL_SENT_TOTAL.inc()
+                        self._job_done()
+
+        finally:
+            connection.close()
+
+    def _retry(self, job: EmailJob, error: Exception) -> None:
+
+        job.attempts += 1
+
+        if job.attempts > self.max_retries:
+            self.dead_letter.add(job, error)
+            self._job_done()
+            return
+
+        EMAIL_RETRIES_TOTAL.inc()
+
+        task = asyncio.create_task(self._requeue(job, self.retry_backoff * 2 ** (job.attempts - 1)))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _requeue(self, job: EmailJob, delay: float) -> None:
+
+        await asyncio.sleep(delay)
+        await self._queue.put(job)
+
+
+email_dispatcher = EmailDispatcher(
+    fm.config,
+    connections=settings.EMAIL_DISPATCHER_CONNECTIONS,
+    batch_size=settings.EMAIL_DISPATCHER_BATCH_SIZE,
+    max_retries=settings.EMAIL_DISPATCHER_MAX_RETRIES,
+    retry_backoff=settings.EMAIL_DISPATCHER_RETRY_BACKOFF_SECONDS,
+    queue_size=settings.EMAIL_DISPATCHER_QUEUE_SIZE,
+)
@@ -0,0 +1,151 @@
+"""預先編譯的 email template
+
+啟動時一次編譯所有 template，並預先以固定不變的資料 (例如 `app_name`) 渲染出 template 的靜態內容，
+寄送時只需要把每封信不同的欄位 (例如 `name`、`activate_url`) 填入對應的位置，不必再走一次 Jinja 的渲染流程
+
+只有以 `{{ name }}` 直接輸出的變數可以這樣處理，使用到 filter、條件判斷、`include` 等語法的 template
+會改用一般的 Jinja 渲染，結果與 fastapi-mail 相同
+"""
+
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple, Union
+
+from jinja2 import Environment, FileSystemLoader, Template, meta, nodes
+
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+_SLOT_MARKER = "\x1f"
+_SLOT_PATTERN = re.compile(f"{_SLOT_MARKER}(\\w+){_SLOT_MARKER}")
+
+
+def _find_slots(env: Environment, source: str, static_names: Set[str]) -> Optional[Set[str]]:
+    """找出 template 中每封信不同的變數，無法只靠替換字串渲染時回傳 `None`"""
+
+    ast = env.parse(source)
+
+    if any(ast.find_all((nodes.Extends, nodes.Include, nodes.Import, nodes.FromImport))):
+        return None
+
+    slots = meta.find_undeclared_variables(ast) - static_names
+
+    output_names = {
+        id(node)
+        for output in ast.find_all(nodes.Output)
+        for node in output.nodes
+        if isinstance(node, nodes.Name)
+    }
+
+    for node in ast.find_all(nodes.Name):
+        if node.name in slots and id(node) not in output_names:
+            return None
+
+    return slots
+
+
+class CompiledTemplate:
+    """編譯後的 template，`fragments` 為靜態內容與變數名稱交錯的 tuple"""
+
+    def __init__(
+        self, template: Template, static_context: Mapping[str, Any], slots: Optional[Set[str]]
+    ) -> None:
+
+        self.template = template
+        self.static_context = dict(static_context)
+        self.fragments: Optional[Tuple[str, ...]] = None
+
+        if slots is not None:
+            shell = template.render(
+                **self.static_context,
+                **{slot: f"{_SLOT_MARKER}{slot}{_SLOT_MARKER}" for slot in slots},
+            )
+            self.fragments = tuple(_SLOT_PATTERN.split(shell))
+
+    def _can_fill(self, context: Mapping[str, Any]) -> bool:
+
+        if self.fragments is None:
+            return False
+
+        # 呼叫端覆寫了靜態資料時，改用完整的渲染
+        for key, value in self.static_context.items():
+            if key in context and context[key] != value:
+                return False
+
+        return True
+
+    def render(self, context: Mapping[str, Any]) -> str:
+
+        if not self._can_fill(context):
+            return self.template.render(**{**self.static_context, **context})
+
+        parts: List[str] = []
+
+        for i, fragment in enumerate(self.fragments):
+            if i % 2 == 0:
+                parts.append(fragment)
+
+            else:
+                # 與 Jinja 相同，沒有提供的變數輸出為空字串
+                parts.append(str(context[fragment]) if fragment in context else "")
+
+        return "".join(parts)
+
+
+class EmailTemplates:
+
+    def __init__(self, folder: Union[str, Path], static_context: Mapping[str, Any]) -> None:
+        """
+        Args:
+            * `folder`: template 資料夾
+            * `static_context`: 所有 email 共用且不會改變的資料
+        """
+
+        self.folder = Path(folder)
+        self.static_context = dict(static_context)
+        self.env = Environment(loader=FileSystemLoader(self.folder))
+
+        self._templates: Dict[str, CompiledTemplate] = {}
+        self._lock = threading.Lock()
+
+    def _compile(self, name: str) -> CompiledTemplate:
+
+        source, _, _ = self.env.loader.get_source(self.env, name)
+        slots = _find_slots(self.env, source, set(self.static_context))
+
+        return CompiledTemplate(self.env.get_template(name), self.static_context, slots)
+
+    def load(self) -> None:
+        """編譯資料夾中所有的 template"""
+
+        templates = {name: self._compile(name) for name in self.env.list_templates()}
+
+        with self._lock:
+            self._templates.update(templates)
+
+    def get(self, name: str) -> CompiledTemplate:
+
+        template = self._templates.get(name)
+
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+
+                if template is None:
+                    template = self._templates[name] = self._compile(name)
+
+        return template
+
+    def render(self, name: str, context: Mapping[str, Any]) -> str:
+
+        return self.get(name).render(context)
+
+
+@lru_cache
+def get_email_templates(folder: Union[str, Path]) -> EmailTemplates:
+    """取得 `folder` 的 `EmailTemplates`，同一個資料夾只會編譯一次"""
+
+    return EmailTemplates(folder, static_context={"app_name": settings.APP_NAME})
@@ -0,0 +1,203 @@
+"""JWT 簽署與驗證用的 key
+
+`JWT_ALGORITHM` 為 `HS256` 時使用 `JWT_SECRET`，與其他服務共用同一把 secret；
+為 `EdDSA` (Ed25519) 或 `ES256` (P-256) 時使用 `JWT_PRIVATE_KEYS` 中的 PEM 檔案，
+token header 會帶有 `kid`，其他服務可以從 `/.well-known/jwks.json` 取得公鑰在本地驗證 token。
+
+`JWT_PRIVATE_KEYS` 中第一把 key 用來簽署，其餘的 key (也可以只有公鑰) 只用來驗證，輪替 key 的步驟：
+
+1. 產生新的 key，加在 `JWT_PRIVATE_KEYS` 的最後面，讓其他服務先從 JWKS 取得新的公鑰
+2. 超過 `JWT_JWKS_MAX_AGE_SECONDS` 後，把新的 key 移到最前面開始簽署
+3. 超過 refresh token 的有效時間後，移除舊的 key
+
+產生 key：
+
+    python -m app.jwt_keys generate --algorithm EdDSA keys/2026-10.pem
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "ES256")
+
+# 計算 JWK thumbprint (RFC 7638) 時使用的欄位
+_THUMBPRINT_MEMBERS = {"OKP": ("crv", "kty", "x"), "EC": ("crv", "kty", "x", "y")}
+
+
+@dataclass(frozen=True)
+class JWTKey:
+    """解析後的 key，`signing_key` 為 `None` 時只能用來驗證"""
+
+    kid: Optional[str]
+    algorithm: str
+    signing_key: Any
+    verifying_key: Any
+    jwk: Optional[Dict[str, str]] = None
+
+
+def _thumbprint(jwk: Dict[str, str]) -> str:
+
+    members = {name: jwk[name] for name in _THUMBPRINT_MEMBERS[jwk["kty"]]}
+    digest = hashlib.sha256(
+        json.dumps(members, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    ).digest()
+
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def _key_algorithm(public_key: Any) -> str:
+
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return "EdDSA"
+
+    if isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(
+        public_key.curve, ec.SECP256R1
+    ):
+        return "ES256"
+
+    raise ValueError("Only Ed25519 and P-256 keys are supported.")
+
+
+def load_pem_key(data: bytes) -> JWTKey:
+    """解析 PEM 格式的私鑰或公鑰，`kid` 為公鑰的 JWK thumbprint"""
+
+    if b"PRIVATE KEY" in data:
+        signing_key = serialization.load_pem_private_key(data, password=None)
+        public_key = signing_key.public_key()
+
+    else:
+        signing_key = None
+        public_key = serialization.load_pem_public_key(data)
+
+    algorithm = _key_algorithm(public_key)
+
+    if algorithm == "EdDSA":
+        jwk = OKPAlgorithm.to_jwk(public_key, as_dict=True)
+
+    else:
+        jwk = ECAlgorithm.to_jwk(public_key, as_dict=True)
+
+    kid = _thumbprint(jwk)
+    jwk = {**jwk, "kid": kid, "alg": algorithm, "use": "sig"}
+
+    return JWTKey(
+        kid=kid, algorithm=algorithm, signing_key=signing_key, verifying_key=public_key, jwk=jwk
+    )
+
+
+class KeyRing:
+
+    def __init__(self, keys: Sequence[JWTKey]) -> None:
+        """
+        Args:
+            * `keys`: 第一把 key 用來簽署，其餘只用來驗證
+        """
+
+        if not keys or keys[0].signing_key is None:
+            raise ValueError("The first JWT key must be able to sign.")
+
+        self.keys = list(keys)
+        self.active = self.keys[0]
+
+        self._by_kid = {key.kid: key for key in self.keys if key.kid is not None}
+        self._jwks = {"keys": [key.jwk for key in self.keys if key.jwk is not None]}
+        self._jwks_json = json.dumps(self._jwks, separators=(",", ":")).encode("utf-8")
+        self._jwks_etag = '"%s"' % hashlib.sha256(self._jwks_json).hexdigest()[:32]
+
+    def jwks(self) -> Dict[str, List[Dict[str, str]]]:
+
+        return self._jwks
+
+    @property
+    def jwks_json(self) -> bytes:
+        """預先序列化的 JWKS，公鑰不會在執行期間改變"""
+
+        return self._jwks_json
+
+    @property
+    def jwks_etag(self) -> str:
+
+        return self._jwks_etag
+
+
+def load_keyring(algorithm: str, secret: str, key_files: Sequence[Union[str, Path]]) -> KeyRing:
+    """依照設定載入 key，啟動時執行一次"""
+
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        return KeyRing(
+            [JWTKey(kid=None, algorithm=algorithm, signing_key=secret, verifying_key=secret)]
+        )
+
+    if not key_files:
+        raise RuntimeError(f"`JWT_PRIVATE_KEYS` is required when JWT_ALGORITHM is `{algorithm}`.")
+
+    keys = [load_pem_key(Path(path).read_bytes()) for path in key_files]
+
+    if keys[0].algorithm != algorithm:
+        raise RuntimeError(f"The signing key does not match JWT_ALGORITHM `{algorithm}`.")
+
+    return KeyRing(keys)
+
+
+def generate_private_key(algorithm: str) -> bytes:
+    """產生 PEM 格式 (PKCS8) 的私鑰"""
+
+    if algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+
+    elif algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+
+    else:
+        raise ValueError("Invalid algorithm.")
+
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+keyring = load_keyring(settings.JWT_ALGORITHM, settings.JWT_SECRET, settings.JWT_PRIVATE_KEYS_LIST)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="產生新的私鑰")
+    generate_parser.add_argument("path", type=Path)
+    generate_parser.add_argument("--algorithm", choices=ASYMMETRIC_ALGORITHMS, default="EdDSA")
+
+    args = parser.parse_args(argv)
+
+    if args.path.exists():
+        print(f"{args.path} already exists.", file=sys.stderr)
+        return 1
+
+    args.path.write_bytes(generate_private_key(args.algorithm))
+    args.path.chmod(0o600)
+
+    print(f"kid: {load_pem_key(args.path.read_bytes()).kid}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
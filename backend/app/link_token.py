@@ -0,0 +1,136 @@
+import base64
+import hashlib
+import hmac
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app import security
+from app.config.settings import get_settings
+from app.models.user import User
+
+settings = get_settings()
+
+TOKEN_VERSION = "v1"
+
+
+def _get_signing_key() -> bytes:
+    """取得簽署連結 token 用的 key
+
+    沒有設定 `LINK_TOKEN_SECRET` 時，從 `JWT_SECRET` 衍生，避免兩種 token 共用同一把 key
+    """
+
+    if settings.LINK_TOKEN_SECRET:
+        return settings.LINK_TOKEN_SECRET.encode("utf-8")
+
+    return hmac.new(
+        settings.JWT_SECRET.encode("utf-8"), b"email-link-token", hashlib.sha256
+    ).digest()
+
+
+_signing_key = _get_signing_key()
+
+
+def _sign(user_id: str, purpose: str, expires: str, context: str) -> str:
+
+    message = f"{user_id}.{purpose}.{expires}.{context}".encode("utf-8")
+    digest = hmac.new(_signing_key, message, hashlib.sha256).digest()
+
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def generate_link_token(user: User, purpose: str, expires_minutes: Optional[int] = None) -> str:
+    """產生 email 連結使用的 token
+
+    token 格式為 `v1.<user_id>.<expires>.<signature>`，簽章涵蓋使用者 id、`purpose`、
+    到期時間與 `User.get_context_string` 的結果，所以使用者密碼或 `updated_at` 變更後，
+    舊的連結就會失效
+    """
+
+    if expires_minutes is None:
+        expires_minutes = settings.LINK_TOKEN_EXPIRE_MINUTES
+
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
+    expires = str(int(expires_at.timestamp()))
+
+    user_id = str(user.id)
+    signature = _sign(user_id, purpose, expires, user.get_context_string(purpose))
+
+    return f"{TOKEN_VERSION}.{user_id}.{expires}.{signature}"
+
+
+def verify_signed_token(user: User, purpose: str, token: str) -> bool:
+    """驗證 `generate_link_token` 產生的 token"""
+
+    parts = token.split(".")
+
+    if len(parts) != 4 or parts[0] != TOKEN_VERSION:
+        return False
+
+    _, user_id, expires, signature = parts
+
+    if user_id != str(user.id) or not expires.isdigit():
+        return False
+
+    if int(expires) < datetime.now(timezone.utc).timestamp():
+        return False
+
+    expected = _sign(user_id, purpose, expires, user.get_context_string(purpose))
+
+    return hmac.compare_digest(expected, signature)
+
+
+def is_legacy_token(token: str) -> bool:
+    """是否為舊版使用 bcrypt hash 產生的 token"""
+
+    return token.startswith("$2")
+
+
+def parse_legacy_until(accept_legacy: bool, until: str) -> Optional[datetime]:
+    """取得接受舊版 bcrypt token 的結束時間，不接受時回傳 `None`
+
+    接受舊版 token 時必須設定結束時間，否則每個舊連結都會一直觸發 bcrypt 驗證
+    """
+
+    if not accept_legacy:
+        return None
+
+    if not until:
+        raise RuntimeError(
+            "`LINK_TOKEN_LEGACY_UNTIL` is required when LINK_TOKEN_ACCEPT_LEGACY is true."
+        )
+
+    until_at = datetime.fromisoformat(until)
+
+    if until_at.tzinfo is None:
+        until_at = until_at.replace(tzinfo=timezone.utc)
+
+    return until_at
+
+
+legacy_until = parse_legacy_until(
+    settings.LINK_TOKEN_ACCEPT_LEGACY, settings.LINK_TOKEN_LEGACY_UNTIL
+)
+
+
+def legacy_token_allowed() -> bool:
+    """是否還在接受舊版 bcrypt token 的過渡期間"""
+
+    return legacy_until is not None and datetime.now(timezone.utc) < legacy_until
+
+
+async def verify_link_token(user: User, purpose: str, token: str) -> bool:
+    """驗證 email 連結的 token
+
+    新版 token 只需要計算一次 HMAC，過渡期間內的舊版 bcrypt token 則交給 hashing pool 驗證
+    """
+
+    if is_legacy_token(token):
+        if not legacy_token_allowed():
+            return False
+
+        logging.info("Verifying legacy bcrypt link token.")
+
+        return await security.verify_hashed_string_async(user.get_context_string(purpose), token)
+
+    return verify_signed_token(user, purpose, token)
@@ -1,19 +1,68 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app import reaper, security
+from app.config.email import fm
 from app.config.settings import get_settings
-from app.routes import auth, base, user
+from app.email_dispatcher import email_dispatcher
+from app.email_templates import get_email_templates
+from app.middleware import MetricsMiddleware
+from app.outbox_sender import outbox_sender
+from app.revocation import revocation_list
+from app.routes import auth, base, metrics, user
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """在啟動時預熱 hashing pool、啟動過期 token 清理、撤銷 token 同步與 email 寄送，並在關閉時釋放資源"""
+
+    security.hashing_pool.start()
+    get_email_templates(fm.config.TEMPLATE_FOLDER).load()
+
+    if settings.EMAIL_DISPATCHER_ENABLED:
+        email_dispatcher.start()
+
+    if settings.EMAIL_OUTBOX_ENABLED and settings.EMAIL_OUTBOX_SENDER_IN_APP:
+        outbox_sender.start()
+
+    # 預設由 `python -m app.reaper` 執行，單一 worker 的部署才需要在 app 中啟動
+    if settings.TOKEN_REAPER_ENABLED:
+        reaper.token_reaper.start()
+
+    # 先載入撤銷的 token 再開始處理請求，載入失敗時由背景 task 重試，期間直接查詢資料庫
+    try:
+        await revocation_list.load()
+
+    except Exception as load_exec:
+        logger.exception(load_exec)
+
+    revocation_list.start()
+
+    yield
+
+    await revocation_list.stop()
+    await reaper.token_reaper.stop()
+    await outbox_sender.stop()
+    await email_dispatcher.stop()
+    security.hashing_pool.shutdown()
 
 
 def create_app():
 
     settings = get_settings()
 
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
     app.include_router(user.user_auth_router)
     app.include_router(user.user_router)
     app.include_router(base.base_router)
     app.include_router(auth.auth_router)
+    app.include_router(metrics.metrics_router)
 
     app.add_middleware(
         CORSMiddleware,
@@ -22,6 +71,7 @@ def create_app():
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(MetricsMiddleware)
 
     return app
 
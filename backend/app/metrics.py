@@ -0,0 +1,334 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Generator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    """收集所有 metric，並輸出成 Prometheus text exposition 格式"""
+
+    def __init__(self) -> None:
+
+        self._metrics: List["Metric"] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> None:
+
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+
+        with self._lock:
+            metrics = list(self._metrics)
+
+        lines = []
+
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.collect())
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _escape(value: object) -> str:
+
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, object]) -> str:
+
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Metric:
+    """metric 的共用邏輯，`labelnames` 不為空時需透過 `labels()` 取得子 metric"""
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ) -> None:
+
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self) -> object:
+
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> object:
+
+        key = tuple(str(value) for value in values)
+
+        if len(key) != len(self.labelnames):
+            raise ValueError("Incorrect label count.")
+
+        child = self._children.get(key)
+
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+
+        return child
+
+    def items(self) -> List[Tuple[Dict[str, str], object]]:
+
+        with self._lock:
+            return [
+                (dict(zip(self.labelnames, key)), child) for key, child in self._children.items()
+            ]
+
+    def collect(self) -> List[str]:
+
+        raise NotImplementedError
+
+
+class _Value:
+
+    def __init__(self) -> None:
+
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1) -> None:
+
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+
+        with self._lock:
+            self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """每次輸出時才呼叫 `function` 取得數值"""
+
+        self._function = function
+
+    def get(self) -> float:
+
+        if self._function is not None:
+            return float(self._function())
+
+        with self._lock:
+            return self._value
+
+
+class Counter(Metric):
+    """只會增加的計數器"""
+
+    type = "counter"
+
+    def _new_child(self) -> _Value:
+
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+
+        self._children[()].inc(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+
+        self._children[()].set_function(function)
+
+    def get(self) -> float:
+
+        return self._children[()].get()
+
+    def collect(self) -> List[str]:
+
+        return [
+            f"{self.name}{_format_labels(labels)} {child.get()}" for labels, child in self.items()
+        ]
+
+
+class Gauge(Counter):
+    """可增可減的數值"""
+
+    type = "gauge"
+
+    def dec(self, amount: float = 1) -> None:
+
+        self._children[()].dec(amount)
+
+    def set(self, value: float) -> None:
+
+        self._children[()].set(value)
+
+
+class _HistogramValue:
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+
+        self.buckets = buckets
+
+        self._lock = threading.Lock()
+        self._counts = [0] * len(buckets)
+        self._count = 0
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """記錄一筆觀測值 (單位為秒)"""
+
+        with self._lock:
+            self._count += 1
+            self._sum += value
+
+            for i, le in enumerate(self.buckets):
+                if value <= le:
+                    self._counts[i] += 1
+
+    @contextmanager
+    def time(self) -> Generator[None, None, None]:
+        """記錄區塊執行的時間"""
+
+        start = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, object]:
+        """取得目前的統計資訊"""
+
+        with self._lock:
+            return {
+                "buckets": dict(zip(self.buckets, self._counts)),
+                "count": self._count,
+                "sum": self._sum,
+            }
+
+
+class Histogram(Metric):
+    """延遲分佈統計
+
+    與 Prometheus 的 histogram 相同，每個 bucket 記錄小於等於 `le` 的觀測次數 (累計值)
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = REGISTRY,
+    ) -> None:
+
+        self.buckets = tuple(sorted(buckets))
+
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramValue:
+
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+
+        self._children[()].observe(value)
+
+    def time(self):
+
+        return self._children[()].time()
+
+    def snapshot(self) -> Dict[str, object]:
+
+        return self._children[()].snapshot()
+
+    def collect(self) -> List[str]:
+
+        lines = []
+
+        for labels, child in self.items():
+            snapshot = child.snapshot()
+
+            for le, count in snapshot["buckets"].items():
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {count}")
+
+            lines.append(
+                f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {snapshot['count']}"
+            )
+            lines.append(f"{self.name}_count{_format_labels(labels)} {snapshot['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {snapshot['sum']}")
+
+        return lines
+
+
+# HTTP
+HTTP_REQUESTS_TOTAL = Counter(
+    "http_requests_total", "Total HTTP requests.", labelnames=("method", "route", "status")
+)
+HTTP_REQUEST_DURATION_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", labelnames=("method", "route")
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being processed.")
+
+# Database pool
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the pool.",
+    labelnames=("engine",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Connections the pool may hold.", labelnames=("engine",))
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out.", labelnames=("engine",)
+)
+DB_POOL_UTILIZATION = Gauge(
+    "db_pool_utilization", "Checked out connections / pool capacity.", labelnames=("engine",)
+)
+
+# Password hashing
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "bcrypt latency in the hashing pool, including queueing.",
+    labelnames=("op",),
+)
+
+# JWT
+JWT_ENCODE_SECONDS = Histogram(
+    "jwt_encode_seconds",
+    "JWT encode latency.",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+)
+JWT_DECODE_SECONDS = Histogram(
+    "jwt_decode_seconds",
+    "JWT decode latency.",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+)
+
+# Email
+EMAIL_QUEUE_DEPTH = Gauge("email_queue_depth", "Emails waiting to be sent.")
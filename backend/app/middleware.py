@@ -0,0 +1,55 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import metrics
+
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH")
+)
+
+
+class MetricsMiddleware:
+    """記錄每個 route 的請求數、延遲與處理中的請求數
+
+    route label 使用 route 的 path template (例如 `/users/{id}`)，避免 label 數量無限增加，
+    沒有對應 route 的請求一律記為 `unmatched`，非標準的 HTTP method 記為 `other`
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+            await send(message)
+
+        metrics.HTTP_REQUESTS_IN_FLIGHT.inc()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+
+        finally:
+            metrics.HTTP_REQUESTS_IN_FLIGHT.dec()
+
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "other"
+
+            metrics.HTTP_REQUEST_DURATION_SECONDS.labels(method, route).observe(
+                time.perf_counter() - start
+            )
+            metrics.HTTP_REQUESTS_TOTAL.labels(method, route, status_code).inc()
@@ -1 +1 @@
-from . import user
+from . import email_outbox, revoked_token, user
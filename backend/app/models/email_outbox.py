@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text, func
+
+from app.config.database import Base
+
+
+def utc_now() -> datetime:
+    """不含 timezone 的 UTC 時間，與 `UserToken.expires_at` 的比對方式相同"""
+
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class EmailOutbox(Base):
+    """待寄送的 email (transactional outbox)
+
+    與使用者資料的變更在同一個 transaction 中寫入，再由 `app.outbox_sender` 取出寄送
+    """
+
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recipients = Column(JSON, nullable=False)
+    subject = Column(String(255), nullable=False)
+    template_name = Column(String(255), nullable=True, default=None)
+    template_body = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default="pending", comment="pending, sent, failed")
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(
+        DateTime, nullable=False, default=utc_now, comment="可以被取出寄送的時間 (UTC)"
+    )
+    last_error = Column(Text, nullable=True, default=None)
+    sent_at = Column(DateTime, nullable=True, default=None)
+    create_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (Index("ix_email_outbox_status_available_at", "status", "available_at"),)
@@ -0,0 +1,19 @@
+from sqlalchemy import BINARY, Column, DateTime, Integer, func
+
+from app.config.database import Base
+
+
+class RevokedToken(Base):
+    """被撤銷的 access token，在 `expires_at` 之前都不能再使用
+
+    每個 worker 會以 `create_at` 遞增的順序讀取新資料，同步到記憶體中的 Bloom filter (`app.revocation`)
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    token_hash = Column(
+        BINARY(32), nullable=False, unique=True, comment="token key 的 SHA-256 digest"
+    )
+    expires_at = Column(DateTime, nullable=False, index=True, comment="access token 的到期時間")
+    create_at = Column(DateTime, nullable=False, index=True, server_default=func.now())
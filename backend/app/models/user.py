@@ -1,4 +1,14 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import (
+    BINARY,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    func,
+)
 from sqlalchemy.orm import mapped_column, relationship
 
 from app.config.database import Base
@@ -8,6 +18,10 @@ class User(Base):
     """使用者資料資料表"""
 
     __tablename__ = "users"
+    __table_args__ = (
+        # 使用者列表以 `create_at` 排序的 keyset 分頁 (`ORDER BY create_at, id`)
+        Index("ix_users_create_at_id", "create_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     email = Column(String(255), unique=True, index=True)
@@ -39,7 +53,9 @@ class UserToken(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = mapped_column(ForeignKey("users.id"))
-    token_key = Column(String(255), nullable=True, index=True, default=None)
+    token_hash = Column(
+        BINARY(32), nullable=False, unique=True, index=True, comment="token key 的 SHA-256 digest"
+    )
     create_at = Column(DateTime, nullable=False, server_default=func.now())
     expires_at = Column(DateTime, nullable=False, index=True, comment="token expires time")
     purpose = Column(String(20), nullable=False)
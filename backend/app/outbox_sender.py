@@ -0,0 +1,231 @@
+"""寄送 `email_outbox` 中的 email
+
+多個 sender 可以同時執行 (`SELECT ... FOR UPDATE SKIP LOCKED`)，寄送量可以獨立於 API 水平擴展：
+
+    python -m app.outbox_sender
+
+預設也會在 app 啟動時執行，使用獨立的 sender 時可以關閉 `EMAIL_OUTBOX_SENDER_IN_APP`
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import timedelta
+from typing import Callable, List, Optional
+
+from fastapi_mail import ConnectionConfig, MessageSchema, MessageType
+
+from app import metrics
+from app.background import BackgroundTask
+from app.config.email import fm
+from app.config.settings import get_settings
+from app.crud.async_base import SessionType, close_session, new_session
+from app.crud.async_crud_email_outbox import async_email_outbox_crud
+from app.email_dispatcher import EmailJob, SMTPConnection
+from app.models.email_outbox import EmailOutbox, utc_now
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+OUTBOX_SENT_TOTAL = metrics.Counter("email_outbox_sent_total", "Outbox emails sent.")
+OUTBOX_FAILED_TOTAL = metrics.Counter(
+    "email_outbox_failed_total", "Outbox emails that failed to send."
+)
+
+
+def _default_session_factory() -> SessionType:
+
+    # 取出的資料在 commit 之後仍會使用，不讓物件過期以免逐筆重新查詢
+    return new_session(expire_on_commit=False)
+
+
+def _to_job(outbox: EmailOutbox) -> EmailJob:
+
+    message = MessageSchema(
+        subject=outbox.subject,
+        recipients=outbox.recipients,
+        template_body=outbox.template_body,
+        subtype=MessageType.html,
+    )
+
+    return EmailJob(message=message, template_name=outbox.template_name, attempts=outbox.attempts)
+
+
+class OutboxSender(BackgroundTask):
+
+    def __init__(
+        self,
+        config: ConnectionConfig,
+        batch_size: int,
+        poll_interval: float,
+        lease_seconds: float,
+        max_attempts: int,
+        retry_backoff: float,
+        session_factory: Callable[[], SessionType] = _default_session_factory,
+    ) -> None:
+        """
+        Args:
+            * `config`: fastapi-mail 的連線設定
+            * `batch_size`: 每次取出的 email 數量
+            * `poll_interval`: 沒有待寄送的 email 時，等待的秒數
+            * `lease_seconds`: 取出的 email 在這段時間內不會被其他 sender 取出
+            * `max_attempts`: 最多寄送次數，超過後標記為 `failed`
+            * `retry_backoff`: 第一次重試前等待的秒數，之後每次加倍
+            * `session_factory`: 建立 db session 的函數
+        """
+
+        self.config = config
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.session_factory = session_factory
+
+        self._connection: Optional[SMTPConnection] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def run_once(self) -> int:
+        """取出一批 email 寄送，並回傳取出的數量
+
+        每寄出一封就 commit 一次；lease 到期後這批剩下的 email 可能已被其他 sender 重新取出，
+        不再寄送以免重複
+        """
+
+        if self._connection is None:
+            self._connection = SMTPConnection(self.config)
+
+        session = self.session_factory()
+
+        try:
+            lease_until = utc_now() + timedelta(seconds=self.lease_seconds)
+
+            jobs = await async_email_outbox_crud.claim_batch(
+                session, batch_size=self.batch_size, lease_seconds=self.lease_seconds
+            )
+
+            for index, job in enumerate(jobs):
+                if utc_now() >= lease_until:
+                    logger.warning(
+                        "Outbox lease expired, left %s emails to other senders.", len(jobs) - index
+                    )
+                    break
+
+                try:
+                    await self._connection.send(_to_job(job))
+
+                except Exception as send_exec:
+                    logger.warning("Failed to send outbox email %s: %r", job.id, send_exec)
+                    OUTBOX_FAILED_TOTAL.inc()
+
+                    await async_email_outbox_crud.mark_failed(
+                        session,
+                        job=job,
+                        error=repr(send_exec),
+                        max_attempts=self.max_attempts,
+                        retry_backoff=self.retry_backoff,
+                    )
+
+                else:
+                    OUTBOX_SENT_TOTAL.inc()
+                    await async_email_outbox_crud.mark_sent(session, job=job)
+
+            return len(jobs)
+
+        finally:
+            await close_session(session)
+
+    def notify(self) -> None:
+        """有新的 email 寫入 outbox 時呼叫，讓 sender 不必等到下一次輪詢"""
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+
+        self._wakeup = asyncio.Event()
+
+        try:
+            while True:
+                try:
+                    sent = await self.run_once()
+
+                except Exception as send_exec:
+                    logger.exception(send_exec)
+                    sent = 0
+
+                # 取滿一批時代表可能還有資料，直接處理下一批
+                if sent >= self.batch_size:
+                    continue
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+
+                except asyncio.TimeoutError:
+                    pass
+
+                self._wakeup.clear()
+
+        finally:
+            self.close()
+
+    def close(self) -> None:
+
+        if self._connection is not None:
+            self._connection.close()
+
+    async def stop(self) -> None:
+
+        await super().stop()
+
+        self._wakeup = None
+
+
+def create_outbox_sender(**kwargs) -> OutboxSender:
+
+    options = {
+        "config": fm.config,
+        "batch_size": settings.EMAIL_OUTBOX_BATCH_SIZE,
+        "poll_interval": settings.EMAIL_OUTBOX_POLL_SECONDS,
+        "lease_seconds": settings.EMAIL_OUTBOX_LEASE_SECONDS,
+        "max_attempts": settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        "retry_backoff": settings.EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS,
+    }
+    options.update(kwargs)
+
+    return OutboxSender(**options)
+
+
+outbox_sender = create_outbox_sender()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Send emails from the email outbox.")
+    parser.add_argument("--once", action="store_true", help="寄送一批後結束")
+    parser.add_argument("--batch-size", type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=settings.EMAIL_OUTBOX_POLL_SECONDS)
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    sender = create_outbox_sender(batch_size=args.batch_size, poll_interval=args.poll_interval)
+
+    if args.once:
+        try:
+            asyncio.run(sender.run_once())
+
+        finally:
+            sender.close()
+
+        return 0
+
+    asyncio.run(sender.run())
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
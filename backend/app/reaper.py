@@ -0,0 +1,148 @@
+"""定期清理過期的 refresh token 與撤銷的 access token
+
+使用 key-value token store 時，refresh token 會自動過期，只會清理撤銷的 access token。
+
+多個 worker 部署時，以獨立的 process 執行一個 reaper，或以排程執行一輪：
+
+    python -m app.reaper
+    python -m app.reaper --once
+
+單一 worker 的部署可以開啟 `TOKEN_REAPER_ENABLED`，在 app 啟動時以背景 task 執行；
+每個 worker 都會執行自己的 reaper，彼此會競爭刪除相同的資料
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Any, Callable, List, Optional
+
+from app import metrics
+from app.background import BackgroundTask
+from app.config.settings import get_settings
+from app.crud import async_crud_revoked_token, async_crud_user
+from app.crud.async_base import SessionType, close_session, new_session
+from app.token_store import token_store
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+TOKENS_REAPED_TOTAL = metrics.Counter(
+    "tokens_reaped_total", "Expired tokens deleted by the reaper."
+)
+REVOKED_TOKENS_REAPED_TOTAL = metrics.Counter(
+    "revoked_tokens_reaped_total", "Expired revoked access tokens deleted by the reaper."
+)
+
+
+class TokenReaper(BackgroundTask):
+
+    def __init__(
+        self,
+        interval: float,
+        batch_size: int,
+        session_factory: Callable[[], SessionType] = new_session,
+        user_tokens: bool = True,
+    ) -> None:
+        """
+        以固定間隔分批刪除過期的 token
+
+        Args:
+            * `interval`: 每輪清理的間隔秒數
+            * `batch_size`: 每個 transaction 最多刪除的筆數
+            * `session_factory`: 建立 db session 的函數
+            * `user_tokens`: 是否清理 `user_tokens`，關閉時只清理撤銷的 access token
+        """
+
+        self.interval = interval
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self.user_tokens = user_tokens
+
+    async def _reap(self, session: SessionType, crud: Any, counter: metrics.Counter) -> int:
+
+        total = 0
+
+        while True:
+            deleted = await crud.delete_expired_batch(session, batch_size=self.batch_size)
+
+            total += deleted
+            counter.inc(deleted)
+
+            if deleted < self.batch_size:
+                return total
+
+            # 批次之間讓出 event loop，避免長時間佔用
+            await asyncio.sleep(0)
+
+    async def run_once(self) -> int:
+        """刪除所有過期的 token，並回傳刪除的筆數"""
+
+        session = self.session_factory()
+        total = 0
+
+        try:
+            if self.user_tokens:
+                total += await self._reap(
+                    session, async_crud_user.async_user_token_crud, TOKENS_REAPED_TOTAL
+                )
+
+            total += await self._reap(
+                session,
+                async_crud_revoked_token.async_revoked_token_crud,
+                REVOKED_TOKENS_REAPED_TOTAL,
+            )
+
+            return total
+
+        finally:
+            await close_session(session)
+
+    async def run(self) -> None:
+
+        while True:
+            try:
+                deleted = await self.run_once()
+                logger.info("Deleted %s expired tokens.", deleted)
+
+            except Exception as reap_exec:
+                logger.exception(reap_exec)
+
+            await asyncio.sleep(self.interval)
+
+
+token_reaper = TokenReaper(
+    interval=settings.TOKEN_REAPER_INTERVAL_SECONDS,
+    batch_size=settings.TOKEN_REAPER_BATCH_SIZE,
+    user_tokens=token_store.needs_cleanup,
+)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Delete expired user tokens in batches.")
+    parser.add_argument("--once", action="store_true", help="執行一輪後結束")
+    parser.add_argument("--batch-size", type=int, default=settings.TOKEN_REAPER_BATCH_SIZE)
+    parser.add_argument("--interval", type=float, default=settings.TOKEN_REAPER_INTERVAL_SECONDS)
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    reaper = TokenReaper(
+        interval=args.interval,
+        batch_size=args.batch_size,
+        user_tokens=token_store.needs_cleanup,
+    )
+
+    if args.once:
+        asyncio.run(reaper.run_once())
+        return 0
+
+    asyncio.run(reaper.run())
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""撤銷 access token
+
+登出時會把 access token 的 token key (`JWTPayload.t`) 寫入 `revoked_tokens`，直到 token 過期為止。
+每個 worker 在記憶體中保存一份 Bloom filter：
+
+* 大部分請求的 token 都沒有被撤銷，Bloom filter 沒有命中時可以直接放行，不需要查詢資料庫
+* 命中時可能是誤判 (false positive)，才會查詢資料庫確認
+
+背景 task 每 `refresh_interval` 秒讀取新增的資料 (增量同步)，
+並每 `rebuild_interval` 秒以尚未過期的資料重建 Bloom filter，移除過期的 token。
+其他 worker 撤銷的 token 最多會延遲 `refresh_interval` 秒才生效。
+第一次從資料庫載入完成前 Bloom filter 並不完整，這段期間每次都查詢資料庫
+
+`id` 與 `create_at` 在 INSERT 時產生，commit 的順序可能不同，較小的 `id` 可能較晚才能讀到。
+因此增量同步會從讀到的最大 `create_at` 往前 `sync_margin` 秒重新讀取，已經在 Bloom filter 中的不會重複加入
+"""
+
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Optional
+
+from app import metrics
+from app.background import BackgroundTask
+from app.config.settings import get_settings
+from app.crud.async_base import SessionType, close_session, new_session
+from app.crud.async_crud_revoked_token import async_revoked_token_crud
+from app.security import hash_token_key
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+REVOKED_TOKEN_DB_CHECKS_TOTAL = metrics.Counter(
+    "revoked_token_db_checks_total",
+    "Bloom filter hits verified against the revoked_tokens table.",
+    labelnames=("result",),
+)
+
+
+class BloomFilter:
+    """以 SHA-256 digest 作為 hash 的 Bloom filter
+
+    digest 本身已經均勻分布，直接把 256 bits 切成 `hashes` 段，每段作為一個位置，
+    位置數量取 2 的次方，只需要位移與 mask，不需要再計算其他 hash
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """
+        Args:
+            * `capacity`: 預計加入的數量，超過時誤判率會上升
+            * `error_rate`: 加入 `capacity` 個項目時的誤判率
+        """
+
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+
+        size = -self.capacity * math.log(error_rate) / math.log(2) ** 2
+        self._bits_per_hash = max(math.ceil(math.log2(max(size, 8))), 3)
+
+        self.size = 1 << self._bits_per_hash
+        # digest 只有 256 bits，容量非常大時會減少 hash 數量
+        self.hashes = min(
+            max(round(self.size / self.capacity * math.log(2)), 1), 256 // self._bits_per_hash
+        )
+        self.count = 0
+
+        self._mask = self.size - 1
+        self._bits = bytearray(self.size // 8)
+
+    def _positions(self, digest: bytes) -> Iterable[int]:
+
+        value = int.from_bytes(digest, "little")
+
+        for _ in range(self.hashes):
+            yield value & self._mask
+            value >>= self._bits_per_hash
+
+    def add(self, digest: bytes) -> None:
+
+        bits = self._bits
+
+        for position in self._positions(digest):
+            bits[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+
+        # 熱門路徑，不使用 `_positions` 的 generator，
+        # 沒有被撤銷的 token 通常在前一、兩個位置就會判定不存在
+        bits = self._bits
+        mask = self._mask
+        shift = self._bits_per_hash
+        value = int.from_bytes(digest, "little")
+
+        for _ in range(self.hashes):
+            position = value & mask
+
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+
+            value >>= shift
+
+        return True
+
+    def __len__(self) -> int:
+
+        return self.count
+
+
+class RevocationList(BackgroundTask):
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        refresh_interval: float,
+        rebuild_interval: float,
+        sync_margin: float = 60,
+        batch_size: int = 1000,
+        session_factory: Callable[[], SessionType] = new_session,
+    ) -> None:
+        """
+        Args:
+            * `capacity`: Bloom filter 的初始容量，撤銷的 token 超過容量時會以兩倍的容量重建
+            * `error_rate`: Bloom filter 的誤判率，誤判時會多一次資料庫查詢
+            * `refresh_interval`: 同步其他 worker 撤銷的 token 的間隔秒數
+            * `rebuild_interval`: 重建 Bloom filter 以移除過期 token 的間隔秒數
+            * `sync_margin`: 增量同步時重新讀取的秒數，涵蓋較晚 commit 的資料
+            * `batch_size`: 每次同步最多讀取的筆數
+            * `session_factory`: 建立 db session 的函數
+        """
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.sync_margin = timedelta(seconds=sync_margin)
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+
+        self.clear()
+
+    def clear(self) -> None:
+
+        self._filter = BloomFilter(self.capacity, self.error_rate)
+        self._synced_at: Optional[datetime] = None
+        self._rebuilt_at = time.monotonic()
+        self._loaded = False
+
+    @property
+    def synced_at(self) -> Optional[datetime]:
+        """已經同步到 Bloom filter 的最大 `create_at`"""
+
+        return self._synced_at
+
+    @property
+    def loaded(self) -> bool:
+        """是否已經從資料庫載入所有撤銷的 token"""
+
+        return self._loaded
+
+    def __len__(self) -> int:
+
+        return len(self._filter)
+
+    async def is_revoked(self, session: SessionType, *, token_key: str) -> bool:
+        """Bloom filter 沒有命中時 token 一定沒有被撤銷，命中時才查詢資料庫確認
+
+        尚未從資料庫載入時 (例如剛啟動) 直接查詢資料庫
+        """
+
+        if not self._loaded:
+            token_hash = hash_token_key(token_key)
+
+            return (
+                await async_revoked_token_crud.get_by_hash(session, token_hash=token_hash)
+                is not None
+            )
+
+        if not self._filter.count:
+            return False
+
+        token_hash = hash_token_key(token_key)
+
+        if token_hash not in self._filter:
+            return False
+
+        revoked = (
+            await async_revoked_token_crud.get_by_hash(session, token_hash=token_hash) is not None
+        )
+
+        REVOKED_TOKEN_DB_CHECKS_TOTAL.labels("revoked" if revoked else "false_positive").inc()
+
+        return revoked
+
+    async def revoke(self, session: SessionType, *, token_key: str, expires_at: datetime) -> None:
+        """撤銷 access token，不會 commit，由呼叫端以 `commit()` 送出
+
+        會馬上加入目前 worker 的 Bloom filter，即使 transaction 沒有 commit，也只會多一次資料庫查詢
+        """
+
+        if expires_at.tzinfo is not None:
+            expires_at = expires_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+        token_hash = hash_token_key(token_key)
+
+        await async_revoked_token_crud.revoke(
+            session, token_hash=token_hash, expires_at=expires_at, commit=False
+        )
+
+        self._add(token_hash)
+
+    def _add(self, token_hash: bytes) -> bool:
+        """加入 Bloom filter，已經存在 (或誤判為存在) 時不會重複加入，並回傳是否有加入"""
+
+        if token_hash in self._filter:
+            return False
+
+        if self._filter.count >= self._filter.capacity:
+            # 容量不足時先擴大，下次重建時會再從資料庫載入所有尚未過期的資料
+            self._rebuilt_at = -math.inf
+            self.capacity = self._filter.capacity * 2
+
+        self._filter.add(token_hash)
+
+        return True
+
+    async def refresh(self, session: SessionType) -> int:
+        """讀取 `synced_at - sync_margin` 之後新增的資料，並回傳新加入 Bloom filter 的筆數"""
+
+        since = None if self._synced_at is None else self._synced_at - self.sync_margin
+        last_id = 0
+        total = 0
+
+        while True:
+            rows = await async_revoked_token_crud.get_created_since(
+                session, since=since, last_id=last_id, limit=self.batch_size
+            )
+
+            for row_id, token_hash, create_at in rows:
+                total += self._add(token_hash)
+                last_id = row_id
+
+                if self._synced_at is None or create_at > self._synced_at:
+                    self._synced_at = create_at
+
+            if len(rows) < self.batch_size:
+                # 從頭讀取所有資料時也等同載入完成
+                self._loaded = self._loaded or since is None
+
+                return total
+
+    async def rebuild(self, session: SessionType) -> int:
+        """以所有尚未過期的資料重建 Bloom filter，並回傳載入的筆數"""
+
+        rows = await async_revoked_token_crud.get_active(session)
+
+        capacity = max(self.capacity, len(rows) * 2)
+        bloom_filter = BloomFilter(capacity, self.error_rate)
+        synced_at = self._synced_at
+
+        for _, token_hash, create_at in rows:
+            bloom_filter.add(token_hash)
+
+            if synced_at is None or create_at > synced_at:
+                synced_at = create_at
+
+        self.capacity = capacity
+        self._filter = bloom_filter
+        self._synced_at = synced_at
+        self._rebuilt_at = time.monotonic()
+        self._loaded = True
+
+        return len(rows)
+
+    async def load(self) -> int:
+        """從資料庫重建 Bloom filter，在開始處理請求前呼叫，並回傳載入的筆數"""
+
+        session = self.session_factory()
+
+        try:
+            return await self.rebuild(session)
+
+        finally:
+            await close_session(session)
+
+    async def sync(self) -> int:
+        """到期時重建 Bloom filter，否則只讀取新增的資料"""
+
+        session = self.session_factory()
+
+        try:
+            if time.monotonic() - self._rebuilt_at >= self.rebuild_interval:
+                return await self.rebuild(session)
+
+            return await self.refresh(session)
+
+        finally:
+            await close_session(session)
+
+    async def run(self) -> None:
+
+        while True:
+            try:
+                await self.sync()
+
+            except Exception as sync_exec:
+                logger.exception(sync_exec)
+
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+
+        if not self.running and not self._loaded:
+            # 尚未載入時，啟動後第一次同步就從資料庫重建
+            self._rebuilt_at = -math.inf
+
+        super().start()
+
+
+revocation_list = RevocationList(
+    capacity=settings.REVOKED_TOKEN_FILTER_CAPACITY,
+    error_rate=settings.REVOKED_TOKEN_FILTER_ERROR_RATE,
+    refresh_interval=settings.REVOKED_TOKEN_REFRESH_SECONDS,
+    rebuild_interval=settings.REVOKED_TOKEN_REBUILD_SECONDS,
+    sync_margin=settings.REVOKED_TOKEN_SYNC_MARGIN_SECONDS,
+)
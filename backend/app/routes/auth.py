@@ -1,11 +1,11 @@
 from fastapi import APIRouter, BackgroundTasks, Depends, Header, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
-from app.deps import get_current_user, get_session
-from app.models.user import User
-from app.schemas import request_schemas, response_schemas
+from app.cache import UserSnapshot
+from app.crud.async_base import SessionType
+from app.deps import get_current_token_claims, get_current_user_snapshot, get_session
+from app.schemas import request_schemas, response_schemas, utils_schemas
 from app.services import auth_serv
 
 auth_router = APIRouter(prefix="/auth", tags=["Auth"], responses={404: {"message": "Not found."}})
@@ -15,7 +15,7 @@ auth_router = APIRouter(prefix="/auth", tags=["Auth"], responses={404: {"message
 async def verify_user_account(
     data: request_schemas.user.UserVerifiyAccountReq,
     background_tasks: BackgroundTasks,
-    session: Session = Depends(get_session),
+    session: SessionType = Depends(get_session),
 ):
     """使用傳入的 token 和 email 驗證使用者帳戶，並發送帳戶已啟用 email 至使用者信箱"""
 
@@ -28,7 +28,7 @@ async def verify_user_account(
 async def resend_verifiy_email(
     data: request_schemas.auth.ReSendVerifiyEmailReq,
     background_tasks: BackgroundTasks,
-    session: Session = Depends(get_session),
+    session: SessionType = Depends(get_session),
 ):
     """重新寄送用戶認證 email 至使用者信箱"""
 
@@ -40,26 +40,30 @@ async def resend_verifiy_email(
 @auth_router.post(
     "/login", status_code=status.HTTP_200_OK, response_model=response_schemas.auth.JWTokenResp
 )
-def user_login(
-    data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)
+async def user_login(
+    data: OAuth2PasswordRequestForm = Depends(), session: SessionType = Depends(get_session)
 ):
     """使用者登入，並回傳 JWT"""
 
-    return auth_serv.get_login_token(data, session)
+    token_resp = await auth_serv.get_login_token(data, session)
+
+    return Response(content=token_resp.render(), media_type="application/json")
 
 
 @auth_router.post("/token/refresh", response_model=response_schemas.auth.JWTokenResp)
-def refresh_token(refresh_token=Header(), session: Session = Depends(get_session)):
+async def refresh_token(refresh_token=Header(), session: SessionType = Depends(get_session)):
     """使用 refresh token 取得新的 access token"""
 
-    return auth_serv.refresh_token(refresh_token, session)
+    token_resp = await auth_serv.refresh_token(refresh_token, session)
+
+    return Response(content=token_resp.render(), media_type="application/json")
 
 
 @auth_router.post("/forgot-password", status_code=status.HTTP_200_OK)
 async def forgot_password_request(
     data: request_schemas.user.UserForgotPasswordReq,
     background_tasks: BackgroundTasks,
-    session: Session = Depends(get_session),
+    session: SessionType = Depends(get_session),
 ):
     """用戶忘記密碼，重新設定請求，會發送重新設定密碼的 email 至使用者信箱"""
 
@@ -72,7 +76,7 @@ async def forgot_password_request(
 async def forgot_password_reset(
     data: request_schemas.user.UserForgotPasswordResetReq,
     background_tasks: BackgroundTasks,
-    session: Session = Depends(get_session),
+    session: SessionType = Depends(get_session),
 ):
     """根據傳入的 token 和 email，重設使用者密碼，並寄送密碼已經重新設定的 email 至使用者信箱"""
 
@@ -82,13 +86,14 @@ async def forgot_password_reset(
 
 
 @auth_router.get("/logout")
-def user_logout(
+async def user_logout(
     refresh_token=Header(),
-    session: Session = Depends(get_session),
-    user: User = Depends(get_current_user),
+    session: SessionType = Depends(get_session),
+    user: UserSnapshot = Depends(get_current_user_snapshot),
+    access_token: utils_schemas.jwt.JWTPayload = Depends(get_current_token_claims),
 ):
-    """登出使用者"""
+    """登出使用者，並撤銷目前的 access token"""
 
-    auth_serv.user_logout(refresh_token, session, user)
+    await auth_serv.user_logout(refresh_token, session, user, access_token)
 
     return JSONResponse(content={"message": "You have been logged out."})
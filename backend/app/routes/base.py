@@ -1,6 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Response
 from fastapi.responses import JSONResponse
 
+from app.config.settings import get_settings
+from app.jwt_keys import keyring
+
+settings = get_settings()
+
 base_router = APIRouter(tags=["Base"], responses={404: {"message": "Not found."}})
 
 
@@ -8,3 +13,21 @@ base_router = APIRouter(tags=["Base"], responses={404: {"message": "Not found."}
 def index():
 
     return JSONResponse({"message": "welcome to user system."})
+
+
+@base_router.get("/.well-known/jwks.json")
+def jwks(if_none_match: str = Header(default="")):
+    """驗證 access token 用的公鑰 (JWK Set)，使用 `HS256` 時為空的 `keys`
+
+    內容在啟動時就已經序列化，並以 `Cache-Control` 與 `ETag` 讓其他服務快取
+    """
+
+    headers = {
+        "Cache-Control": f"public, max-age={settings.JWT_JWKS_MAX_AGE_SECONDS}",
+        "ETag": keyring.jwks_etag,
+    }
+
+    if if_none_match == keyring.jwks_etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=keyring.jwks_json, media_type="application/json", headers=headers)
@@ -0,0 +1,36 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app import metrics
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+def verify_metrics_access(authorization: Optional[str] = Header(None)) -> None:
+    """`METRICS_ENABLED` 關閉時回傳 404，設定 `METRICS_TOKEN` 時檢查 bearer token"""
+
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        (authorization or "").encode(), f"Bearer {settings.METRICS_TOKEN}".encode()
+    ):
+        raise HTTPException(
+            status_code=401, detail="Invalid metrics token.", headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+@metrics_router.get(
+    "/metrics", include_in_schema=False, dependencies=[Depends(verify_metrics_access)]
+)
+def get_metrics():
+
+    return PlainTextResponse(
+        metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,8 +1,16 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, Header, status
+from typing import Literal, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, Query, status
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
 
-from app.deps import get_current_user, get_session, oauth2_scheme
+from app.crud.async_base import SessionType
+from app.deps import (
+    get_admin_user,
+    get_current_user,
+    get_session,
+    get_token_profile,
+    oauth2_scheme,
+)
 from app.models.user import User
 from app.schemas import request_schemas, response_schemas
 from app.services import user_serv
@@ -20,7 +28,7 @@ user_auth_router = APIRouter(
 async def register_user(
     data: request_schemas.user.UserCreateAccountReq,
     background_tasks: BackgroundTasks,
-    session: Session = Depends(get_session),
+    session: SessionType = Depends(get_session),
 ):
     """註冊使用者"""
 
@@ -34,7 +42,7 @@ async def reset_password(
     data: request_schemas.user.UserResetPasswordReq,
     background_tasks: BackgroundTasks,
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: SessionType = Depends(get_session),
 ):
     """重新設定用戶密碼，並發送密碼已經重新設定的 email 至使用者信箱"""
 
@@ -44,6 +52,20 @@ async def reset_password(
 
 
 @user_auth_router.get("/me", response_model=response_schemas.user.FetchUserResp)
-def fetch_user(user: User = Depends(get_current_user)):
+async def fetch_user(user: response_schemas.user.FetchUserResp = Depends(get_token_profile)):
 
     return user
+
+
+@user_auth_router.get(
+    "", response_model=response_schemas.user.UserListResp, dependencies=[Depends(get_admin_user)]
+)
+async def list_users(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    order: Literal["id", "create_at"] = "id",
+    session: SessionType = Depends(get_session),
+):
+    """列出所有使用者 (只有 `ADMIN_EMAILS` 中的使用者可以使用)，以回傳的 `next_cursor` 取得下一頁"""
+
+    return await user_serv.list_users(session, limit, cursor, order)
@@ -0,0 +1,20 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class EmailOutboxDBCreate(BaseModel):
+    """建立待寄送的 email"""
+
+    recipients: List[str]
+    subject: str
+    template_name: Optional[str] = None
+    template_body: Dict[str, Any]
+
+
+class EmailOutboxDBUpdate(BaseModel):
+    """更新待寄送的 email"""
+
+    status: Optional[str] = None
+    attempts: Optional[int] = None
+    last_error: Optional[str] = None
@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class RevokedTokenDBCreate(BaseModel):
+    """撤銷 access token"""
+
+    token_hash: bytes
+    expires_at: datetime
+
+
+class RevokedTokenDBUpdate(BaseModel):
+    """更新撤銷的 access token"""
+
+    expires_at: Optional[datetime] = None
@@ -27,7 +27,7 @@ class UserTokenDBCreate(BaseModel):
     """建立使用者 token 資料"""
 
     user_id: int
-    token_key: str
+    token_hash: bytes
     expires_at: datetime
     purpose: Literal["at", "rt"]
 
@@ -35,5 +35,5 @@ class UserTokenDBCreate(BaseModel):
 class UserTokenDBUpdate(BaseModel):
     """更新使用者 token 資料"""
 
-    token_key: str
+    token_hash: bytes
     expires_at: datetime
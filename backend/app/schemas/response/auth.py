@@ -1,17 +1,49 @@
+from dataclasses import dataclass
 from datetime import datetime
 
-from pydantic import BaseModel
+# token 只包含 base64url 字元與 `.`，不需要跳脫，直接填入預先組好的 JSON
+_JWTOKEN_RESP_TEMPLATE = (
+    '{"access_token":{"token":"%s","expires_at":"%s"},'
+    '"refresh_token":{"token":"%s","expires_at":"%s"}}'
+)
 
 
-class JWToken(BaseModel):
+def _isoformat(value: datetime) -> str:
+
+    text = value.isoformat()
+
+    # 與 pydantic 相同，UTC 以 `Z` 表示
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+@dataclass(slots=True)
+class JWToken:
     """JWT 資訊回應體"""
 
     token: str
     expires_at: datetime
 
 
-class JWTokenResp(BaseModel):
-    """JWT 資訊回應體"""
+@dataclass(slots=True)
+class JWTokenResp:
+    """JWT 資訊回應體
+
+    登入與 refresh 都會回傳，以 `render` 直接產生 JSON，不經過 `response_model` 的驗證與序列化，
+    `response_model` 只用來產生 API 文件
+    """
 
     access_token: JWToken
     refresh_token: JWToken
+
+    def render(self) -> bytes:
+        """產生與 pydantic 序列化結果相同的 JSON"""
+
+        return (
+            _JWTOKEN_RESP_TEMPLATE
+            % (
+                self.access_token.token,
+                _isoformat(self.access_token.expires_at),
+                self.refresh_token.token,
+                _isoformat(self.refresh_token.expires_at),
+            )
+        ).encode("ascii")
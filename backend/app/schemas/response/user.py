@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict
 
 
 class FetchUserResp(BaseModel):
@@ -7,3 +10,23 @@ class FetchUserResp(BaseModel):
     id: int
     email: str
     name: str
+
+
+class UserListItemResp(BaseModel):
+    """使用者列表中的使用者資料"""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    email: str
+    name: str
+    is_active: bool
+    verified_at: Optional[datetime] = None
+    create_at: datetime
+
+
+class UserListResp(BaseModel):
+    """使用者列表回應體，`next_cursor` 為 `None` 代表已經是最後一頁"""
+
+    items: List[UserListItemResp]
+    next_cursor: Optional[str] = None
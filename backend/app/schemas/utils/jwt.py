@@ -1,16 +1,104 @@
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Literal, Mapping, Optional
 
-from pydantic import BaseModel
+from app.security import str_decode
 
+# token 中 claims 的格式版本，沒有 `v` 的是以 base85 編碼 `sub` 和 `p` 的舊格式
+CLAIMS_VERSION = 2
 
-class JWTPayload(BaseModel):
+_PURPOSE_CODES = {"at": "a", "rt": "r"}
+_PURPOSES = {code: purpose for purpose, code in _PURPOSE_CODES.items()}
+
+
+def _optional_str(claims: Mapping[str, Any], name: str) -> Optional[str]:
+
+    value = claims.get(name)
+
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"Invalid `{name}` claim.")
+
+    return value
+
+
+@dataclass(slots=True)
+class JWTPayload:
     """JWT 資訊
 
-    其中 `sub` 和 `p` 使用 `str_encode` 來編碼
+    每個請求都會解析 access token，所以不使用 pydantic model，也不使用 `frozen` (建立時每個欄位都要經過
+    `object.__setattr__`)：直接建立時不會驗證 (由 `_generate_token_payload` 產生)，
+    從 token 解析時由 `from_claims` 驗證一次
+
+    token 中的 claims 為精簡格式 (`v` 為 2)：`sub` 為使用者 id 的十進位字串，
+    `p` 為 `a` (access token) 或 `r` (refresh token)，`exp` 為 timestamp。
+    `sub` 維持字串是為了符合 RFC 7519，其他服務以一般的 JWT 函式庫驗證時不會出錯
+
+    `email` 和 `name` 只有在開啟 `JWT_PROFILE_CLAIMS` 時才會出現在 access token 中
 
     """
 
-    sub: str
+    sub: int
     t: str
-    p: str
+    p: Literal["at", "rt"]
     exp: datetime
+    email: Optional[str] = None
+    name: Optional[str] = None
+
+    def to_claims(self) -> Dict[str, Any]:
+        """轉換成 token 中的精簡格式"""
+
+        claims: Dict[str, Any] = {
+            "v": CLAIMS_VERSION,
+            "sub": str(self.sub),
+            "t": self.t,
+            "p": _PURPOSE_CODES[self.p],
+            "exp": int(self.exp.timestamp()),
+        }
+
+        if self.email is not None:
+            claims["email"] = self.email
+
+        if self.name is not None:
+            claims["name"] = self.name
+
+        return claims
+
+    @classmethod
+    def from_claims(cls, claims: Mapping[str, Any], accept_legacy: bool = True) -> "JWTPayload":
+        """解析 token 中的 claims，`accept_legacy` 時也接受舊格式，格式錯誤時拋出 `ValueError`"""
+
+        try:
+            if claims.get("v") == CLAIMS_VERSION:
+                sub, purpose = claims["sub"], _PURPOSES[claims["p"]]
+
+            elif accept_legacy and "v" not in claims:
+                sub, purpose = str_decode(claims["sub"]), str_decode(claims["p"])
+
+                if purpose not in _PURPOSE_CODES:
+                    raise ValueError("Invalid `p` claim.")
+
+            else:
+                raise ValueError("Unsupported claims version.")
+
+            token_key, exp = claims["t"], claims["exp"]
+
+        except (KeyError, TypeError) as claims_exec:
+            raise ValueError("Invalid claims.") from claims_exec
+
+        if not (isinstance(sub, str) and sub.isascii() and sub.isdigit()):
+            raise ValueError("Invalid `sub` claim.")
+
+        if not isinstance(token_key, str):
+            raise ValueError("Invalid `t` claim.")
+
+        if isinstance(exp, bool) or not isinstance(exp, (int, float)):
+            raise ValueError("Invalid `exp` claim.")
+
+        return cls(
+            sub=int(sub),
+            t=token_key,
+            p=purpose,
+            exp=datetime.fromtimestamp(exp, timezone.utc),
+            email=_optional_str(claims, "email"),
+            name=_optional_str(claims, "name"),
+        )
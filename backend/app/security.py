@@ -1,13 +1,26 @@
+import asyncio
 import base64
+import hashlib
 import logging
+import multiprocessing
 import secrets
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
-from typing import Dict
+from typing import Any, Callable, Dict, Optional
 
 import jwt
+from fastapi import HTTPException, status
 from jwt.exceptions import ExpiredSignatureError
 from passlib.context import CryptContext
 
+from app import metrics
+from app.config.settings import get_settings
+from app.token_codec import TokenCodec
+
+settings = get_settings()
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -23,10 +36,174 @@ def verify_hashed_string(plain_string: str, hashed_string: str) -> bool:
     return pwd_context.verify(plain_string, hashed_string)
 
 
-def generate_token(payload: dict, secret: dict, algo: dict) -> str:
-    """產生 JWT token"""
+def _warm_up() -> None:
+    """預先載入 bcrypt backend，讓 worker 在第一個請求前就準備好"""
+
+    pwd_context.handler().get_backend()
+
+
+class HashingPool:
+    """bcrypt 運算專用的工作池
+
+    將 hash 運算丟到獨立的 thread 或 process pool 中執行，避免阻塞 event loop。
+
+    同時間送出的工作數量 (執行中 + 排隊中) 超過 `max_workers + max_queue` 時，
+    會直接回傳 503，而不是讓請求無限制地排隊。
+
+    process pool 使用 `spawn` 建立 worker，避免在有多個 thread 的 server process 中 fork。
+    每個 uvicorn worker 都有自己的工作池，總共的 process 數量為 `WEB_CONCURRENCY * max_workers`
+    """
+
+    def __init__(
+        self,
+        executor: str,
+        max_workers: int,
+        max_queue: int,
+        latency_histogram: Optional[metrics.Histogram] = None,
+    ) -> None:
+
+        if executor not in ("thread", "process"):
+            raise ValueError("Invalid executor type.")
+
+        self.executor_type = executor
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+        if latency_histogram is None:
+            latency_histogram = metrics.Histogram(
+                "password_hash_seconds", "Hashing pool latency.", labelnames=("op",), registry=None
+            )
+
+        self._latency = latency_histogram
+
+    def _get_executor(self) -> Executor:
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_type == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers, thread_name_prefix="hashing"
+                        )
+
+        return self._executor
+
+    def start(self) -> None:
+        """建立所有 worker 並預先載入 bcrypt，避免第一批請求負擔啟動成本"""
+
+        executor = self._get_executor()
+
+        futures = [executor.submit(_warm_up) for _ in range(self.max_workers)]
+        wait(futures)
+
+    @property
+    def queue_depth(self) -> int:
+        """排隊中，尚未被 worker 執行的工作數量"""
+
+        return max(self._in_flight - self.max_workers, 0)
+
+    def stats(self) -> Dict[str, int]:
+        """取得工作池的統計資訊"""
+
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def latency(self) -> Dict[str, Dict[str, object]]:
+        """取得每種運算 (包含排隊時間) 的延遲分佈"""
+
+        return {labels["op"]: child.snapshot() for labels, child in self._latency.items()}
 
-    return jwt.encode(payload, secret, algorithm=algo)
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在工作池中執行 `func`，如果工作池已滿，會拋出 503 錯誤"""
+
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy, please try again later.",
+                    headers={"Retry-After": "1"},
+                )
+
+            self._in_flight += 1
+
+        histogram = self._latency.labels(getattr(func, "__name__", "unknown"))
+        start = time.perf_counter()
+
+        try:
+            loop = asyncio.get_running_loop()
+
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+
+    def shutdown(self) -> None:
+        """關閉工作池"""
+
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+hashing_pool = HashingPool(
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    latency_histogram=metrics.PASSWORD_HASH_SECONDS,
+)
+
+metrics.Gauge("password_hash_in_flight", "Hashing pool jobs running or queued.").set_function(
+    lambda: hashing_pool.stats()["in_flight"]
+)
+metrics.Gauge("password_hash_queue_depth", "Hashing pool jobs waiting for a worker.").set_function(
+    lambda: hashing_pool.queue_depth
+)
+metrics.Counter(
+    "password_hash_rejected_total", "Hashing pool jobs rejected with 503."
+).set_function(lambda: hashing_pool.stats()["rejected"])
+
+
+async def hash_string_async(string: str) -> str:
+    """在 hashing pool 中將字串進行 hash，不會阻塞 event loop"""
+
+    return await hashing_pool.run(hash_string, string)
+
+
+async def verify_hashed_string_async(plain_string: str, hashed_string: str) -> bool:
+    """在 hashing pool 中比對 hash 字串是否正確，不會阻塞 event loop"""
+
+    return await hashing_pool.run(verify_hashed_string, plain_string, hashed_string)
+
+
+def generate_token(payload: dict, secret: Any, algo: str, kid: Optional[str] = None) -> str:
+    """產生 JWT token，`secret` 可以是字串或已解析的私鑰，有 `kid` 時會放在 header 中"""
+
+    headers = {"kid": kid} if kid is not None else None
+
+    with metrics.JWT_ENCODE_SECONDS.time():
+        return jwt.encode(payload, secret, algorithm=algo, headers=headers)
 
 
 def get_unique_string(byte: int = 8) -> str:
@@ -35,6 +212,12 @@ def get_unique_string(byte: int = 8) -> str:
     return secrets.token_urlsafe(byte)
 
 
+def hash_token_key(token_key: str) -> bytes:
+    """取得 token key 的 SHA-256 digest (32 bytes)，資料庫只保存 digest，不保存原始的 key"""
+
+    return hashlib.sha256(token_key.encode("ascii")).digest()
+
+
 def str_encode(string: str) -> str:
     """將字串進行 base85 編碼"""
 
@@ -47,8 +230,8 @@ def str_decode(string: str) -> str:
     return base64.b85decode(string.encode("ascii")).decode("ascii")
 
 
-def get_token_payload(token: str, secret: str, alog: str) -> Dict[str, str]:
-    """取得 token 資訊
+def get_token_payload(token: str, codec: TokenCodec) -> Dict[str, str]:
+    """以啟動時建立的 `codec` 取得 token 資訊
 
     如果 token 有效，回傳 token 資訊，否則回傳錯誤訊息
 
@@ -70,7 +253,7 @@ def get_token_payload(token: str, secret: str, alog: str) -> Dict[str, str]:
     """
 
     try:
-        payload = jwt.decode(token, secret, alog)
+        payload = codec.decode(token)
 
     except ExpiredSignatureError:
         payload = {"error": "token expired"}
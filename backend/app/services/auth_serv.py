@@ -1,37 +1,45 @@
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Literal
+from typing import Literal, Optional
 
 from fastapi import BackgroundTasks, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
-from app import security
+from app import link_token, security
+from app.cache import UserSnapshot
+from app.config.replica import use_primary
 from app.config.settings import get_settings
-from app.crud import crud_user
+from app.crud import async_crud_user
+from app.crud.async_base import SessionType, commit
 from app.models.user import User
+from app.revocation import revocation_list
 from app.schemas import db_schemas, request_schemas, response_schemas, utils_schemas
 from app.services import email_serv
+from app.token_codec import token_codec
+from app.token_store import token_store
 
 settings = get_settings()
 
 
 async def activate_user_account(
     data: request_schemas.user.UserVerifiyAccountReq,
-    session: Session,
+    session: SessionType,
     backgroundtasks: BackgroundTasks,
 ) -> None:
     """認證使用者帳號，並發送帳號已啟用 email 至使用者信箱"""
 
-    user = crud_user.user_crud.get_by_email(session, email=data.email)
+    # 以 primary 的資料驗證連結，避免 replica 落後時重複使用已經用過的連結
+    use_primary(session)
+
+    user = await async_crud_user.async_user_crud.get_by_email(session, email=data.email)
 
     if not user:
         raise HTTPException(status_code=400, detail="This link is not valid.")
 
-    user_token = user.get_context_string(settings.USER_VERIFY_ACCOUNT_EMAIL_CONTEXT)
-
     try:
-        token_valid = security.verify_hashed_string(user_token, data.token)
+        token_valid = await link_token.verify_link_token(
+            user, settings.USER_VERIFY_ACCOUNT_EMAIL_CONTEXT, data.token
+        )
 
     except Exception as verify_exec:
         logging.exception(verify_exec)
@@ -40,11 +48,11 @@ async def activate_user_account(
     if not token_valid:
         raise HTTPException(status_code=400, detail="This link is not valid.")
 
-    user.is_active = True
-    user.verified_at = datetime.now(timezone.utc)
+    update_scheam = db_schemas.user.UserDBUpdate(
+        is_active=True, verified_at=datetime.now(timezone.utc)
+    )
 
-    session.add(user)
-    session.commit()
+    await async_crud_user.async_user_crud.update(session, db_obj=user, obj_in=update_scheam)
 
     await email_serv.send_account_verifiaction_confirmation_email(user, backgroundtasks)
 
@@ -52,11 +60,11 @@ async def activate_user_account(
 async def resend_verifiy_email(
     data: request_schemas.auth.ReSendVerifiyEmailReq,
     background_tasks: BackgroundTasks,
-    session: Session,
+    session: SessionType,
 ):
     """重新寄送用戶認證 email 至使用者信箱"""
 
-    user = crud_user.user_crud.get_by_email(session, email=data.email)
+    user = await async_crud_user.async_user_crud.get_by_email(session, email=data.email)
 
     if not user:
         raise HTTPException(status_code=400, detail="Email is not exists.")
@@ -76,12 +84,13 @@ def _generate_token_payload(
 
     """
 
+    # token key 只需要唯一且無法猜測，128 / 256 bits 已經足夠，較短的 key 讓 token 更小
     if purpose == "at":
-        token_key = security.get_unique_string(50)
+        token_key = security.get_unique_string(16)
         expires_min = settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES
 
     elif purpose == "rt":
-        token_key = security.get_unique_string(100)
+        token_key = security.get_unique_string(32)
         expires_min = settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES
     else:
         raise ValueError("Invalid token purpose.")
@@ -89,43 +98,50 @@ def _generate_token_payload(
     expires = timedelta(minutes=expires_min)
     expires_at = datetime.now(timezone.utc) + expires
 
-    token_payload = utils_schemas.jwt.JWTPayload(
-        sub=security.str_encode(str(user.id)),
-        t=token_key,
-        p=security.str_encode(purpose),
-        exp=expires_at,
-    )
+    email = name = None
+
+    if purpose == "at" and settings.JWT_PROFILE_CLAIMS:
+        email, name = user.email, user.name
 
-    return token_payload
+    return utils_schemas.jwt.JWTPayload(
+        sub=user.id, t=token_key, p=purpose, exp=expires_at, email=email, name=name
+    )
 
 
 def _generate_token(payload: utils_schemas.jwt.JWTPayload) -> response_schemas.auth.JWToken:
-    """產生 JWT token"""
+    """產生 JWT token，以 `token_codec` 中目前用來簽署的 key 簽署"""
 
-    token = security.generate_token(
-        payload.model_dump(), settings.JWT_SECRET, settings.JWT_ALGORITHM
-    )
+    token = token_codec.encode(payload.to_claims())
 
     return response_schemas.auth.JWToken(token=token, expires_at=payload.exp)
 
 
-def get_login_token(
-    data: OAuth2PasswordRequestForm, session: Session
+def _parse_claims(token_payload: dict) -> utils_schemas.jwt.JWTPayload:
+    """解析 token 中的 claims，遷移期間同時接受舊格式"""
+
+    try:
+        return utils_schemas.jwt.JWTPayload.from_claims(
+            token_payload, accept_legacy=settings.JWT_ACCEPT_LEGACY_CLAIMS
+        )
+
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Not authorised.")
+
+
+async def get_login_token(
+    data: OAuth2PasswordRequestForm, session: SessionType
 ) -> response_schemas.auth.JWTokenResp:
     """使用者登入，並回傳 JWT
 
     `data` 中的 `username` 等同於 `email`
 
     並會將 refresh token 寫入資料庫
-
-    並會清理資料庫中屬於該 user 的過期的 refresh token 資料
-
     """
 
     # 這邊的 username 等同於 email
-    user = crud_user.user_crud.get_by_email(session, email=data.username)
+    user = await async_crud_user.async_user_crud.get_by_email(session, email=data.username)
 
-    if not user or not security.verify_hashed_string(data.password, user.password):
+    if not user or not await security.verify_hashed_string_async(data.password, user.password):
         raise HTTPException(status_code=400, detail="Incorrect email or password.")
 
     if not user.is_active:
@@ -137,34 +153,27 @@ def get_login_token(
     at_payload = _generate_token_payload(user, "at")
     rt_payload = _generate_token_payload(user, "rt")
 
-    # 資料庫中只存 refresh token 資料
-    rt_token_in = db_schemas.user.UserTokenDBCreate(
-        user_id=user.id,
-        token_key=rt_payload.t,
-        expires_at=rt_payload.exp,
-        purpose="rt",
+    # 只保存 refresh token，整個登入只有一次 commit，也不需要 refresh 取回 token 資料
+    await token_store.add(
+        session, user_id=user.id, token_key=rt_payload.t, expires_at=rt_payload.exp
     )
-
-    crud_user.user_token_crud.create(session, obj_in=rt_token_in)
+    await commit(session)
 
     at = _generate_token(at_payload)
     rt = _generate_token(rt_payload)
 
-    crud_user.user_token_crud.clear_up_expired_tokens(session, user_id=user.id)
-
     return response_schemas.auth.JWTokenResp(access_token=at, refresh_token=rt)
 
 
-def refresh_token(refresh_token: str, session: Session) -> response_schemas.auth.JWTokenResp:
+async def refresh_token(
+    refresh_token: str, session: SessionType
+) -> response_schemas.auth.JWTokenResp:
     """使用 refresh token 取得新的 access token 和 refresh token
 
-    如果 refresh token 有效，則會生成新的 access token 和 refresh token，並會將在資料庫中的 refresh token 更新，
-    並清理資料庫中屬於該 user 的過期的 refresh token 資料
+    如果 refresh token 有效，則會生成新的 access token 和 refresh token，並會將在資料庫中的 refresh token 更新
     """
 
-    token_payload = security.get_token_payload(
-        refresh_token, settings.JWT_SECRET, settings.JWT_ALGORITHM
-    )
+    token_payload = security.get_token_payload(refresh_token, token_codec)
 
     # NOTE 這邊可以再重構一下
     if "error" in token_payload:
@@ -175,23 +184,24 @@ def refresh_token(refresh_token: str, session: Session) -> response_schemas.auth
         if token_payload["error"] == "token invalid":
             raise HTTPException(status_code=401, detail="Not authorised.")
 
-    payload_obj = utils_schemas.jwt.JWTPayload(**token_payload)
-
-    token_type = security.str_decode(payload_obj.p)
+    payload_obj = _parse_claims(token_payload)
 
-    if token_type != "rt":
+    if payload_obj.p != "rt":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token.")
 
-    user_id = security.str_decode(payload_obj.sub)
+    user_id = payload_obj.sub
+
+    # 剛登入或剛輪替的 refresh token 可能還沒複寫到 replica
+    use_primary(session)
 
-    user = crud_user.user_crud.get(session, id=user_id)
+    user = await async_crud_user.async_user_crud.get(session, id=user_id)
 
     if not user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid request.")
 
     token_key = payload_obj.t
 
-    user_token = crud_user.user_token_crud.get_by_key(session, token_key=token_key)
+    user_token = await token_store.get(session, token_key=token_key)
 
     if not user_token:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid request.")
@@ -199,14 +209,15 @@ def refresh_token(refresh_token: str, session: Session) -> response_schemas.auth
     at_patload = _generate_token_payload(user, "at")
     rt_payload = _generate_token_payload(user, "rt")
 
-    # 更新 token 資料，並清理過期的 token
-    rt_token_update_in = db_schemas.user.UserTokenDBUpdate(
-        token_key=rt_payload.t,
-        expires_at=rt_payload.exp,
+    # 以新的 refresh token 取代舊的，SQL 中過期的 token 由 `app.reaper` 定期清理
+    replaced = await token_store.replace(
+        session, user_token, token_key=rt_payload.t, expires_at=rt_payload.exp
     )
 
-    crud_user.user_token_crud.update(session, db_obj=user_token, obj_in=rt_token_update_in)
-    crud_user.user_token_crud.clear_up_expired_tokens(session, user_id=user.id)
+    if not replaced:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid request.")
+
+    await commit(session)
 
     at = _generate_token(at_patload)
     rt = _generate_token(rt_payload)
@@ -216,12 +227,12 @@ def refresh_token(refresh_token: str, session: Session) -> response_schemas.auth
 
 async def forgot_password(
     data: request_schemas.user.UserForgotPasswordReq,
-    session: Session,
+    session: SessionType,
     bakground_tasks: BackgroundTasks,
 ):
     """使用者忘記密碼的請求，會發送重新設定密碼的 email 至使用者信箱"""
 
-    user = crud_user.user_crud.get_by_email(session, email=data.email)
+    user = await async_crud_user.async_user_crud.get_by_email(session, email=data.email)
 
     if user is None:
         raise HTTPException(status_code=400, detail="Email is not exists.")
@@ -238,11 +249,14 @@ async def forgot_password(
 async def forgot_password_reset(
     data: request_schemas.user.UserForgotPasswordResetReq,
     background_tasks: BackgroundTasks,
-    session: Session,
+    session: SessionType,
 ):
     """使用者重新設定密碼，這個函數是針對未登入的使用者，並會在重新設定密碼後發送密碼已經被重新設定的 email 至使用者信箱"""
 
-    user = crud_user.user_crud.get_by_email(session, email=data.email)
+    # 以 primary 的資料驗證連結，避免 replica 落後時重複使用已經用過的連結
+    use_primary(session)
+
+    user = await async_crud_user.async_user_crud.get_by_email(session, email=data.email)
 
     if not user:
         raise HTTPException(status_code=400, detail="Email is not exists.")
@@ -253,10 +267,10 @@ async def forgot_password_reset(
     if not user.verified_at:
         raise HTTPException(status_code=400, detail="Your account is not verified.")
 
-    user_token = user.get_context_string(settings.USER_FORGOT_PASSWORD_EMAIL_CONTEXT)
-
     try:
-        token_valid = security.verify_hashed_string(user_token, data.token)
+        token_valid = await link_token.verify_link_token(
+            user, settings.USER_FORGOT_PASSWORD_EMAIL_CONTEXT, data.token
+        )
 
     except Exception as verify_exec:
         logging.exception(verify_exec)
@@ -265,25 +279,18 @@ async def forgot_password_reset(
     if not token_valid:
         raise HTTPException(status_code=400, detail="This link is not valid.")
 
-    update_scheam = db_schemas.user.UserDBUpdate(password=security.hash_string(data.new_password))
+    hashed_pwd = await security.hash_string_async(data.new_password)
+    update_scheam = db_schemas.user.UserDBUpdate(password=hashed_pwd)
 
-    crud_user.user_crud.update(session, db_obj=user, obj_in=update_scheam)
+    await async_crud_user.async_user_crud.update(session, db_obj=user, obj_in=update_scheam)
 
     await email_serv.send_password_reset_email(user, background_tasks)
 
 
-def user_logout(refresh_token: str, session: Session, user: User) -> None:
-    """登出使用者
-
-    並且如果傳入的 refresh token 沒有過期，則將其從資料庫中刪除。
+async def _remove_refresh_token(refresh_token: str, session: SessionType) -> None:
+    """刪除 refresh token，已經過期時不處理，無效時拋出 401，不會 commit"""
 
-    並且會清理資料庫中屬於該 user 的過期 token 資料
-
-    """
-
-    token_payload = security.get_token_payload(
-        refresh_token, settings.JWT_SECRET, settings.JWT_ALGORITHM
-    )
+    token_payload = security.get_token_payload(refresh_token, token_codec)
 
     if "error" in token_payload:
 
@@ -293,19 +300,43 @@ def user_logout(refresh_token: str, session: Session, user: User) -> None:
         if token_payload["error"] == "token invalid":
             raise HTTPException(status_code=401, detail="Not authorised.")
 
-    payload_obj = utils_schemas.jwt.JWTPayload(**token_payload)
+    payload_obj = _parse_claims(token_payload)
 
-    token_type = security.str_decode(payload_obj.p)
-
-    if token_type != "rt":
+    if payload_obj.p != "rt":
         raise HTTPException(status_code=401, detail="Not authorised.")
 
     token_key = payload_obj.t
 
-    user_token = crud_user.user_token_crud.get_by_key(session, token_key=token_key)
+    use_primary(session)
+    user_token = await token_store.get(session, token_key=token_key)
 
     if not user_token:
         raise HTTPException(status_code=401, detail="Not authorised.")
 
-    crud_user.user_token_crud.remove(session, id=user_token.id)
-    crud_user.user_token_crud.clear_up_expired_tokens(session, user_id=user.id)
+    await token_store.remove(session, user_token)
+
+
+async def user_logout(
+    refresh_token: str,
+    session: SessionType,
+    user: UserSnapshot,
+    access_token: Optional[utils_schemas.jwt.JWTPayload] = None,
+) -> None:
+    """登出使用者
+
+    並且如果傳入的 refresh token 沒有過期，則將其從資料庫中刪除。
+    有傳入 `access_token` 時會撤銷該 access token，在過期之前都不能再使用。
+    """
+
+    if access_token is not None:
+        await revocation_list.revoke(session, token_key=access_token.t, expires_at=access_token.exp)
+
+    try:
+        await _remove_refresh_token(refresh_token, session)
+
+    except HTTPException:
+        # refresh token 無效時仍要送出 access token 的撤銷
+        await commit(session)
+        raise
+
+    await commit(session)
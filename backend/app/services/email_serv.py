@@ -1,14 +1,32 @@
 from fastapi import BackgroundTasks
 from fastapi_mail import MessageSchema, MessageType
 
-from app import security
+from app import link_token, metrics
 from app.config.email import fm
 from app.config.settings import get_settings
+from app.crud.async_base import SessionType
+from app.crud.async_crud_email_outbox import async_email_outbox_crud
+from app.email_dispatcher import email_dispatcher
+from app.email_templates import get_email_templates
 from app.models.user import User
+from app.schemas import db_schemas
 
 settings = get_settings()
 
 
+async def _send_message(message: MessageSchema, template_name: str) -> None:
+
+    try:
+        body = get_email_templates(fm.config.TEMPLATE_FOLDER).render(
+            template_name, message.template_body
+        )
+
+        await fm.send_message(message.model_copy(update={"template_body": body}))
+
+    finally:
+        metrics.EMAIL_QUEUE_DEPTH.dec()
+
+
 async def send_email(
     recipients: list,
     subject: str,
@@ -21,15 +39,29 @@ async def send_email(
         subject=subject, recipients=recipients, template_body=context, subtype=MessageType.html
     )
 
-    background_tasks.add_task(fm.send_message, message, template_name=template_name)
+    # dispatcher 未啟動 (例如未執行 lifespan 的測試) 或佇列已滿時，改用 `BackgroundTasks` 寄送
+    if email_dispatcher.submit(message, template_name=template_name):
+        return
 
+    metrics.EMAIL_QUEUE_DEPTH.inc()
+    background_tasks.add_task(_send_message, message, template_name=template_name)
 
-async def send_account_verification_email(user: User, background_tasks: BackgroundTasks) -> None:
-    """在背景寄送用帳號認證信件"""
 
-    context_string = user.get_context_string(context=settings.USER_VERIFY_ACCOUNT_EMAIL_CONTEXT)
+async def queue_email(
+    recipients: list, subject: str, context: dict, template_name: str, session: SessionType
+) -> None:
+    """將 email 寫入 outbox，會與呼叫端的其他變更在同一個 transaction 中 commit"""
+
+    obj_in = db_schemas.email_outbox.EmailOutboxDBCreate(
+        recipients=recipients, subject=subject, template_name=template_name, template_body=context
+    )
+
+    await async_email_outbox_crud.create(session, obj_in=obj_in, commit=False)
 
-    token = security.hash_string(context_string)
+
+def _account_verification_email(user: User) -> dict:
+
+    token = link_token.generate_link_token(user, settings.USER_VERIFY_ACCOUNT_EMAIL_CONTEXT)
 
     active_url = f"{settings.FRONTEND_HOST}{settings.FRONTEND_ACTIVE_ACCOUNT_URL}?token={token}&email={user.email}"
 
@@ -37,13 +69,24 @@ async def send_account_verification_email(user: User, background_tasks: Backgrou
 
     subject = f"Account Verifiaction - {settings.APP_NAME}"
 
-    await send_email(
-        recipients=[user.email],
-        subject=subject,
-        template_name="users/account-verification.html",
-        context=data,
-        background_tasks=background_tasks,
-    )
+    return {
+        "recipients": [user.email],
+        "subject": subject,
+        "template_name": "users/account-verification.html",
+        "context": data,
+    }
+
+
+async def send_account_verification_email(user: User, background_tasks: BackgroundTasks) -> None:
+    """在背景寄送用帳號認證信件"""
+
+    await send_email(**_account_verification_email(user), background_tasks=background_tasks)
+
+
+async def queue_account_verification_email(user: User, session: SessionType) -> None:
+    """將帳號認證信件寫入 outbox，需要由呼叫端 commit"""
+
+    await queue_email(**_account_verification_email(user), session=session)
 
 
 async def send_account_verifiaction_confirmation_email(
@@ -84,8 +127,7 @@ async def send_password_reset_email(user: User, background_tasks: BackgroundTask
 
 async def send_forgot_password_reset_email(user: User, background_tasks: BackgroundTasks) -> None:
 
-    string_context = user.get_context_string(context=settings.USER_FORGOT_PASSWORD_EMAIL_CONTEXT)
-    token = security.hash_string(string_context)
+    token = link_token.generate_link_token(user, settings.USER_FORGOT_PASSWORD_EMAIL_CONTEXT)
 
     reset_url = f"{settings.FRONTEND_HOST}{settings.FRONTEND_FORGOT_PASSWORD_RESET_URL}?token={token}&email={user.email}"
 
@@ -1,11 +1,14 @@
+from typing import Optional
+
 from fastapi import BackgroundTasks, HTTPException, status
-from sqlalchemy.orm import Session
 
 from app import security
 from app.config.settings import get_settings
-from app.crud import crud_user
+from app.crud import async_crud_user
+from app.crud.async_base import SessionType, commit, refresh
 from app.models.user import User
-from app.schemas import db_schemas, request_schemas
+from app.outbox_sender import outbox_sender
+from app.schemas import db_schemas, request_schemas, response_schemas
 from app.services import email_serv
 
 settings = get_settings()
@@ -13,22 +16,40 @@ settings = get_settings()
 
 async def create_user_account(
     data: request_schemas.user.UserCreateAccountReq,
-    session: Session,
+    session: SessionType,
     backgroundtasks: BackgroundTasks,
 ) -> User:
-    """建立使用者帳戶，並發送認證帳戶的 email 至使用者信箱"""
+    """建立使用者帳戶，並發送認證帳戶的 email 至使用者信箱
+
+    開啟 `EMAIL_OUTBOX_ENABLED` 時，認證信會與使用者資料在同一個 transaction 中寫入 outbox，
+    不會因為 worker 重啟而遺失
+    """
 
-    user_exist = crud_user.user_crud.get_by_email(session, email=data.email)
+    user_exist = await async_crud_user.async_user_crud.get_by_email(session, email=data.email)
 
     if user_exist:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email is already exists.")
 
-    hashed_pwd = security.hash_string(data.password)
+    hashed_pwd = await security.hash_string_async(data.password)
     obj_in = db_schemas.user.UserDBCreate(email=data.email, name=data.name, password=hashed_pwd)
 
-    user = crud_user.user_crud.create(session, obj_in=obj_in)
+    user = await async_crud_user.async_user_crud.create(session, obj_in=obj_in, commit=False)
+
+    # 產生認證連結需要 id 和 create_at
+    await refresh(session, user)
+
+    if not settings.EMAIL_OUTBOX_ENABLED:
+        await commit(session)
+        await email_serv.send_account_verification_email(
+            user=user, background_tasks=backgroundtasks
+        )
 
-    await email_serv.send_account_verification_email(user=user, background_tasks=backgroundtasks)
+        return user
+
+    await email_serv.queue_account_verification_email(user=user, session=session)
+    await commit(session)
+
+    outbox_sender.notify()
 
     return user
 
@@ -36,13 +57,37 @@ async def create_user_account(
 async def reset_password(
     data: request_schemas.user.UserResetPasswordReq,
     user: User,
-    session: Session,
+    session: SessionType,
     bakground_tasks: BackgroundTasks,
 ):
     """使用者重新設定密碼，這個函數是針對已經登入的使用者，並會在重新設定密碼後發送密碼已經被重新設定的 email 至使用者信箱"""
 
-    update_scheam = db_schemas.user.UserDBUpdate(password=security.hash_string(data.new_password))
+    hashed_pwd = await security.hash_string_async(data.new_password)
+    update_scheam = db_schemas.user.UserDBUpdate(password=hashed_pwd)
 
-    crud_user.user_crud.update(session, db_obj=user, obj_in=update_scheam)
+    await async_crud_user.async_user_crud.update(session, db_obj=user, obj_in=update_scheam)
 
     await email_serv.send_password_reset_email(user, bakground_tasks)
+
+
+# 使用者列表可以使用的排序方式，最後一個欄位必須是唯一的 `id`
+USER_LIST_ORDERS = {"id": ("id",), "create_at": ("create_at", "id")}
+
+
+async def list_users(
+    session: SessionType, limit: int, cursor: Optional[str], order: str
+) -> response_schemas.user.UserListResp:
+    """以 keyset 分頁列出使用者"""
+
+    try:
+        page = await async_crud_user.async_user_crud.get_page(
+            session, limit=limit, cursor=cursor, order_by=USER_LIST_ORDERS[order]
+        )
+
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+    return response_schemas.user.UserListResp(
+        items=[response_schemas.user.UserListItemResp.model_validate(user) for user in page.items],
+        next_cursor=page.next_cursor,
+    )
@@ -0,0 +1,183 @@
+"""JWT 編碼與解碼
+
+`jwt.encode`/`jwt.decode` 每次呼叫都會重新查詢演算法、解析並檢查 key (HMAC 的 `prepare_key`
+會檢查 secret 是否為 PEM 格式)。`TokenCodec` 在啟動時依照 `Settings` 一次準備好這些資料：
+
+* 每把 key 對應的演算法物件與已解析的 key，只接受 key 本身的演算法
+* 簽署用的 header (`alg`、`kid`、`typ`) 預先編碼成 base64url
+* 設定好必要 claims 的 `jwt.PyJWT`，以及驗證 `exp`/`nbf` 時的 leeway
+
+簽章以 PyJWT 的演算法物件與已解析的 key 計算與驗證，產生的 token 與 `jwt.encode` 相同。
+解碼時先驗證簽章，再交由 `jwt.PyJWT` 解析 header、payload 並驗證 claims (不再驗證一次簽章)
+"""
+
+import json
+from calendar import timegm
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+import jwt
+from jwt.algorithms import Algorithm, get_default_algorithms
+from jwt.utils import base64url_decode, base64url_encode
+
+from app import metrics
+from app.config.settings import Settings, get_settings
+from app.jwt_keys import JWTKey, KeyRing, keyring
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class PreparedKey:
+    """已經準備好的 key，`header` 為簽署時使用的 base64url header"""
+
+    kid: Optional[str]
+    algorithm: str
+    alg_obj: Algorithm
+    signing_key: Any
+    verifying_key: Any
+    header: Optional[bytes]
+
+
+def _prepare(key: JWTKey) -> PreparedKey:
+
+    alg_obj = get_default_algorithms()[key.algorithm]
+    header = None
+
+    if key.signing_key is not None:
+        fields = {"alg": key.algorithm, "typ": "JWT"}
+
+        if key.kid is not None:
+            fields["kid"] = key.kid
+
+        # 與 `jwt.encode` 相同，header 的欄位依照名稱排序
+        header = base64url_encode(
+            json.dumps(fields, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        )
+
+    return PreparedKey(
+        kid=key.kid,
+        algorithm=key.algorithm,
+        alg_obj=alg_obj,
+        signing_key=alg_obj.prepare_key(key.signing_key) if key.signing_key is not None else None,
+        verifying_key=alg_obj.prepare_key(key.verifying_key),
+        header=header,
+    )
+
+
+def _json_default(value: Any) -> Any:
+
+    if isinstance(value, datetime):
+        return timegm(value.utctimetuple())
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class TokenCodec:
+
+    def __init__(
+        self, keyring: KeyRing, *, required_claims: Sequence[str] = ("exp",), leeway: float = 0
+    ) -> None:
+        """
+        Args:
+            * `keyring`: 簽署與驗證用的 key
+            * `required_claims`: 解碼時必須存在的 claims
+            * `leeway`: 驗證 `exp`、`nbf` 時容許的時間誤差秒數
+        """
+
+        self.required_claims = tuple(required_claims)
+        self.leeway = leeway
+
+        self._jwt = jwt.PyJWT()
+        # 簽章由 `decode` 以已解析的 key 驗證，PyJWT 只解析 token 並驗證 claims
+        self._claim_options = {
+            "verify_signature": False,
+            "verify_exp": True,
+            "verify_nbf": True,
+            "verify_iat": True,
+            "require": list(self.required_claims),
+        }
+
+        keys = [_prepare(key) for key in keyring.keys]
+
+        self.active = keys[0]
+        self._by_kid = {key.kid: key for key in keys if key.kid is not None}
+        # 只有一把 key 時不需要先讀取 header 選擇 key
+        self._single_key = len(keys) == 1
+
+    @classmethod
+    def from_settings(cls, settings: Settings, keyring: KeyRing) -> "TokenCodec":
+
+        return cls(
+            keyring,
+            required_claims=("sub", "t", "p", "exp"),
+            leeway=settings.JWT_LEEWAY_SECONDS,
+        )
+
+    def encode(self, payload: Mapping[str, Any]) -> str:
+        """以目前的簽署 key 產生 token，`exp` 等時間欄位可以是 `datetime`"""
+
+        key = self.active
+
+        with metrics.JWT_ENCODE_SECONDS.time():
+            body = base64url_encode(
+                json.dumps(payload, separators=(",", ":"), default=_json_default).encode("utf-8")
+            )
+            signing_input = key.header + b"." + body
+            signature = key.alg_obj.sign(signing_input, key.signing_key)
+
+            return (signing_input + b"." + base64url_encode(signature)).decode("ascii")
+
+    def _resolve(self, header: Dict[str, Any]) -> PreparedKey:
+
+        kid = header.get("kid")
+        key = self.active if kid is None else self._by_kid.get(kid)
+
+        if key is None:
+            raise jwt.InvalidKeyError("Unknown key id.")
+
+        if "crit" in header:
+            raise jwt.InvalidTokenError("Unsupported critical header.")
+
+        return key
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """驗證並解碼 token，token 無效時拋出 `jwt.InvalidTokenError`，過期時為 `jwt.ExpiredSignatureError`"""
+
+        with metrics.JWT_DECODE_SECONDS.time():
+            if self._single_key:
+                key = self.active
+
+            else:
+                key = self._resolve(jwt.get_unverified_header(token))
+
+            signing_input, _, signature = token.rpartition(".")
+
+            try:
+                verified = key.alg_obj.verify(
+                    signing_input.encode("ascii"), key.verifying_key, base64url_decode(signature)
+                )
+
+            except (UnicodeEncodeError, ValueError) as decode_exec:
+                raise jwt.DecodeError("Invalid token.") from decode_exec
+
+            if not verified:
+                raise jwt.InvalidSignatureError("Signature verification failed.")
+
+            decoded = self._jwt.decode_complete(
+                token, options=self._claim_options, leeway=self.leeway
+            )
+            header = decoded["header"]
+
+            # 只接受 key 本身的演算法，避免以 header 的 `alg` 切換驗證方式，並確認 `kid` 與 `crit`
+            if header.get("alg") != key.algorithm:
+                raise jwt.InvalidAlgorithmError("The specified alg value is not allowed.")
+
+            if self._resolve(header) is not key:
+                raise jwt.InvalidKeyError("Unknown key id.")
+
+            return decoded["payload"]
+
+
+token_codec = TokenCodec.from_settings(settings, keyring)
@@ -0,0 +1,268 @@
+"""refresh token 的儲存方式
+
+* `sql`：存在 `user_tokens` 資料表 (預設)，過期的 token 由 `app.reaper` 清理
+* `redis`：存在 Redis (或相容的服務)，以 key 的 TTL 讓 token 自動過期，不需要清理，需要安裝 `redis`
+* `memory`：存在目前 process 的記憶體中，只適合單一 process 或測試使用
+
+key-value 的實作中，key 為 token key 的 SHA-256 digest，值為 `{user_id}:{expires_at timestamp}`
+"""
+
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Protocol, Tuple, Union
+
+from app.config.settings import get_settings
+from app.crud.async_base import SessionType
+from app.crud.async_crud_user import async_user_token_crud
+from app.schemas import db_schemas
+from app.security import hash_token_key
+
+settings = get_settings()
+
+
+@dataclass
+class StoredToken:
+    """取得的 refresh token，`ref` 為各實作用來更新或刪除 token 的資料"""
+
+    user_id: int
+    expires_at: datetime
+    ref: Any
+
+
+class TokenStore(ABC):
+    """refresh token 的儲存介面
+
+    SQL 的實作不會 commit，由呼叫端以 `commit()` 一次送出 (unit of work)
+    """
+
+    # 是否需要 `app.reaper` 清理過期的 token
+    needs_cleanup = False
+
+    @abstractmethod
+    async def add(
+        self, session: SessionType, *, user_id: int, token_key: str, expires_at: datetime
+    ) -> None: ...
+
+    @abstractmethod
+    async def get(self, session: SessionType, *, token_key: str) -> Optional[StoredToken]: ...
+
+    @abstractmethod
+    async def replace(
+        self, session: SessionType, token: StoredToken, *, token_key: str, expires_at: datetime
+    ) -> bool:
+        """以新的 token 取代 `token`，`token` 已經被其他請求取代或刪除時回傳 `False`"""
+
+    @abstractmethod
+    async def remove(self, session: SessionType, token: StoredToken) -> None: ...
+
+
+class SQLTokenStore(TokenStore):
+
+    needs_cleanup = True
+
+    async def add(
+        self, session: SessionType, *, user_id: int, token_key: str, expires_at: datetime
+    ) -> None:
+
+        obj_in = db_schemas.user.UserTokenDBCreate(
+            user_id=user_id,
+            token_hash=hash_token_key(token_key),
+            expires_at=expires_at,
+            purpose="rt",
+        )
+
+        await async_user_token_crud.create(session, obj_in=obj_in, commit=False)
+
+    async def get(self, session: SessionType, *, token_key: str) -> Optional[StoredToken]:
+
+        user_token = await async_user_token_crud.get_by_key(session, token_key=token_key)
+
+        if user_token is None:
+            return None
+
+        return StoredToken(
+            user_id=user_token.user_id, expires_at=user_token.expires_at, ref=user_token
+        )
+
+    async def replace(
+        self, session: SessionType, token: StoredToken, *, token_key: str, expires_at: datetime
+    ) -> bool:
+
+        # 以 `token_hash` 作為條件，同一個 refresh token 只有一個請求能取代
+        return await async_user_token_crud.replace_key(
+            session,
+            id=token.ref.id,
+            token_hash=token.ref.token_hash,
+            new_token_hash=hash_token_key(token_key),
+            expires_at=expires_at,
+        )
+
+    async def remove(self, session: SessionType, token: StoredToken) -> None:
+
+        await async_user_token_crud.remove(session, id=token.ref.id, commit=False)
+
+
+class KeyValueClient(Protocol):
+    """`KeyValueTokenStore` 需要的指令，與 `redis.asyncio.Redis` 相同"""
+
+    async def get(self, name: str) -> Optional[Union[bytes, str]]: ...
+
+    async def set(self, name: str, value: str, px: Optional[int] = None) -> Any: ...
+
+    async def delete(self, *names: str) -> int: ...
+
+
+class MemoryKeyValue:
+    """在記憶體中實作 `KeyValueClient`，過期的 key 會在存取時或定期清除
+
+    所有操作都沒有 `await`，在同一個 event loop 中不需要額外的鎖
+    """
+
+    def __init__(self, sweep_every: int = 1000) -> None:
+
+        self.sweep_every = sweep_every
+
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._writes = 0
+
+    def _alive(self, name: str, now: float) -> bool:
+
+        item = self._data.get(name)
+
+        if item is None:
+            return False
+
+        if item[1] is not None and item[1] <= now:
+            del self._data[name]
+            return False
+
+        return True
+
+    def _sweep(self, now: float) -> None:
+
+        for name in [
+            name for name, (_, expires) in self._data.items() if expires and expires <= now
+        ]:
+            del self._data[name]
+
+    async def get(self, name: str) -> Optional[str]:
+
+        if not self._alive(name, time.monotonic()):
+            return None
+
+        return self._data[name][0]
+
+    async def set(self, name: str, value: str, px: Optional[int] = None) -> bool:
+
+        now = time.monotonic()
+
+        self._data[name] = (value, None if px is None else now + px / 1000)
+        self._writes += 1
+
+        if self._writes % self.sweep_every == 0:
+            self._sweep(now)
+
+        return True
+
+    async def delete(self, *names: str) -> int:
+
+        now = time.monotonic()
+        deleted = 0
+
+        for name in names:
+            if self._alive(name, now):
+                del self._data[name]
+                deleted += 1
+
+        return deleted
+
+    def __len__(self) -> int:
+
+        return len(self._data)
+
+
+class KeyValueTokenStore(TokenStore):
+    """以 key 的 TTL 讓 token 自動過期，取得與刪除都是 O(1)，不會使用 db session"""
+
+    def __init__(self, client: KeyValueClient, prefix: str = "rt:") -> None:
+
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, token_key: str) -> str:
+
+        return self.prefix + hash_token_key(token_key).hex()
+
+    async def add(
+        self, session: SessionType, *, user_id: int, token_key: str, expires_at: datetime
+    ) -> None:
+
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+
+        ttl = int((expires_at - datetime.now(timezone.utc)).total_seconds() * 1000)
+
+        if ttl <= 0:
+            return
+
+        await self.client.set(self._key(token_key), f"{user_id}:{expires_at.timestamp()}", px=ttl)
+
+    async def get(self, session: SessionType, *, token_key: str) -> Optional[StoredToken]:
+
+        key = self._key(token_key)
+        value = await self.client.get(key)
+
+        if value is None:
+            return None
+
+        if isinstance(value, bytes):
+            value = value.decode()
+
+        user_id, timestamp = value.split(":", 1)
+
+        return StoredToken(
+            user_id=int(user_id),
+            expires_at=datetime.fromtimestamp(float(timestamp), tz=timezone.utc),
+            ref=key,
+        )
+
+    async def replace(
+        self, session: SessionType, token: StoredToken, *, token_key: str, expires_at: datetime
+    ) -> bool:
+
+        # 只有成功刪除舊 token 的請求可以取得新的 token，同一個 refresh token 不能重複使用
+        if not await self.client.delete(token.ref):
+            return False
+
+        await self.add(session, user_id=token.user_id, token_key=token_key, expires_at=expires_at)
+
+        return True
+
+    async def remove(self, session: SessionType, token: StoredToken) -> None:
+
+        await self.client.delete(token.ref)
+
+
+def create_token_store(backend: str, redis_url: Optional[str] = None) -> TokenStore:
+
+    if backend == "sql":
+        return SQLTokenStore()
+
+    if backend == "memory":
+        return KeyValueTokenStore(MemoryKeyValue())
+
+    if backend == "redis":
+        try:
+            import redis.asyncio
+
+        except ImportError:
+            raise RuntimeError("`redis` is required when TOKEN_STORE is `redis`.")
+
+        return KeyValueTokenStore(redis.asyncio.from_url(redis_url))
+
+    raise ValueError("Invalid token store.")
+
+
+token_store = create_token_store(settings.TOKEN_STORE, settings.TOKEN_STORE_REDIS_URL)
@@ -0,0 +1,382 @@
+"""批次匯入與匯出使用者
+
+匯入時以串流方式讀取 CSV 或 JSONL，在 process pool 中平行 hash 密碼 (也可以直接提供 bcrypt hash)，
+再以 `insert()` 分批寫入；匯出時透過 server-side cursor 逐批讀取，不會把整個 `users` 資料表載入記憶體：
+
+    python -m app.user_io import users.csv --batch-size 1000 --workers 4
+    python -m app.user_io export users.jsonl
+
+欄位：`email`、`name`、`password` 或 `password_hash`、`is_active`、`verified_at` (ISO 8601)
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import database
+from app.config.replica import use_primary
+from app.config.settings import get_settings
+from app.models.user import User
+from app.security import hash_string, pwd_context
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+EXPORT_FIELDS = ("id", "email", "name", "is_active", "verified_at", "create_at")
+
+
+@dataclass
+class ImportResult:
+
+    inserted: int = 0
+    skipped: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+
+def detect_format(path: Path) -> str:
+
+    if path.suffix.lower() == ".csv":
+        return "csv"
+
+    return "jsonl"
+
+
+def read_rows(file: IO[str], format: str) -> Iterator[Any]:
+    """逐筆讀取使用者資料，無法解析的 JSONL 行以 `ValueError` 取代，由 `import_users` 記錄"""
+
+    if format == "csv":
+        yield from csv.DictReader(file)
+        return
+
+    for line in file:
+        if not line.strip():
+            continue
+
+        try:
+            yield json.loads(line)
+
+        except ValueError as decode_exec:
+            yield ValueError(f"Invalid JSON: {decode_exec}")
+
+
+def _parse_bool(value: Any) -> bool:
+
+    if isinstance(value, bool):
+        return value
+
+    return str(value or "").strip().lower() in ("1", "true", "yes")
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+
+    if value in (None, ""):
+        return None
+
+    return datetime.fromisoformat(value)
+
+
+def prepare_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """將一筆資料轉換成 `users` 的欄位，在 process pool 中執行
+
+    有 `password_hash` 時直接使用 (必須是 bcrypt)，否則 hash `password`
+    """
+
+    email = (row.get("email") or "").strip()
+    name = (row.get("name") or "").strip()
+
+    if not email or not name:
+        raise ValueError("email and name are required.")
+
+    password_hash = row.get("password_hash")
+
+    if password_hash:
+        if pwd_context.identify(password_hash) != "bcrypt":
+            raise ValueError("password_hash is not a bcrypt hash.")
+
+    elif row.get("password"):
+        password_hash = hash_string(row["password"])
+
+    else:
+        raise ValueError("password or password_hash is required.")
+
+    return {
+        "email": email,
+        "name": name,
+        "password": password_hash,
+        "is_active": _parse_bool(row.get("is_active")),
+        "verified_at": _parse_datetime(row.get("verified_at")),
+    }
+
+
+def _prepare_safe(row: Tuple[int, Any]) -> Tuple[int, Any]:
+
+    line, data = row
+
+    if isinstance(data, Exception):
+        return line, data
+
+    try:
+        return line, prepare_row(data)
+
+    except Exception as prepare_exec:
+        return line, prepare_exec
+
+
+def _batched(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+
+    iterator = iter(rows)
+
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def _hashing_executor(workers: int) -> Generator[Optional[Executor], None, None]:
+    """`workers` 為 0 時在目前的 process 中 hash"""
+
+    if workers <= 0:
+        yield None
+        return
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+    try:
+        yield executor
+
+    finally:
+        executor.shutdown(wait=True)
+
+
+def _insert_batch(db: Session, values: List[Dict[str, Any]]) -> int:
+    """寫入一批使用者並回傳寫入的筆數
+
+    檢查後才被其他匯入寫入的 email 會讓整批 `INSERT` 失敗，此時改為每筆一個 savepoint 逐筆寫入，
+    略過重複的 email
+    """
+
+    try:
+        with db.begin_nested():
+            db.execute(insert(User), values)
+
+        return len(values)
+
+    except IntegrityError:
+        pass
+
+    inserted = 0
+
+    for value in values:
+        try:
+            with db.begin_nested():
+                db.execute(insert(User), [value])
+
+            inserted += 1
+
+        except IntegrityError:
+            pass
+
+    return inserted
+
+
+def import_users(
+    db: Session, rows: Iterable[Any], *, batch_size: int = 1000, workers: int = 0
+) -> ImportResult:
+    """匯入使用者，每 `batch_size` 筆 commit 一次
+
+    email 已存在 (或在檔案中重複) 的資料會略過，無法解析或格式錯誤的資料會記錄在 `errors` 中
+    """
+
+    result = ImportResult()
+
+    # 檢查 email 是否存在時必須讀到其他批次剛寫入的資料
+    use_primary(db)
+
+    with _hashing_executor(workers) as executor:
+        for batch in _batched(enumerate(rows, start=1), batch_size):
+            if executor is None:
+                prepared = map(_prepare_safe, batch)
+
+            else:
+                chunksize = max(len(batch) // (workers * 4), 1)
+                prepared = executor.map(_prepare_safe, batch, chunksize=chunksize)
+
+            values: Dict[str, Dict[str, Any]] = {}
+
+            for line, data in prepared:
+                if isinstance(data, Exception):
+                    result.errors.append((line, str(data)))
+
+                elif data["email"] in values:
+                    result.skipped += 1
+
+                else:
+                    values[data["email"]] = data
+
+            if not values:
+                continue
+
+            existing = set(db.scalars(select(User.email).where(User.email.in_(values))).all())
+
+            for email in existing:
+                del values[email]
+
+            result.skipped += len(existing)
+
+            if values:
+                inserted = _insert_batch(db, list(values.values()))
+                db.commit()
+
+                result.inserted += inserted
+                result.skipped += len(values) - inserted
+
+            logger.info("Imported %s users, skipped %s.", result.inserted, result.skipped)
+
+    return result
+
+
+def iter_users(
+    db: Session, *, batch_size: int = 1000, include_password: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """以 server-side cursor 逐批讀取使用者"""
+
+    columns = [getattr(User, name) for name in EXPORT_FIELDS]
+
+    if include_password:
+        columns.append(User.password.label("password_hash"))
+
+    stmt = select(*columns).order_by(User.id).execution_options(yield_per=batch_size)
+
+    for row in db.execute(stmt):
+        yield row._asdict()
+
+
+def _serialize(value: Any) -> Any:
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return value
+
+
+def export_users(
+    db: Session,
+    file: IO[str],
+    format: str,
+    *,
+    batch_size: int = 1000,
+    include_password: bool = False,
+) -> int:
+    """匯出使用者，並回傳匯出的筆數"""
+
+    fields = list(EXPORT_FIELDS) + (["password_hash"] if include_password else [])
+    writer = csv.DictWriter(file, fieldnames=fields) if format == "csv" else None
+
+    if writer is not None:
+        writer.writeheader()
+
+    count = 0
+
+    for row in iter_users(db, batch_size=batch_size, include_password=include_password):
+        row = {key: _serialize(value) for key, value in row.items()}
+
+        if writer is not None:
+            writer.writerow(row)
+
+        else:
+            file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+        count += 1
+
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Bulk import or export users.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="從 CSV 或 JSONL 匯入使用者")
+    import_parser.add_argument("path", type=Path)
+    import_parser.add_argument("--format", choices=FORMATS)
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.add_argument(
+        "--workers", type=int, default=settings.PASSWORD_HASH_MAX_WORKERS, help="0 表示不使用 pool"
+    )
+
+    export_parser = subparsers.add_parser("export", help="將使用者匯出成 CSV 或 JSONL")
+    export_parser.add_argument("path", type=Path, help="`-` 表示輸出到 stdout")
+    export_parser.add_argument("--format", choices=FORMATS)
+    export_parser.add_argument("--batch-size", type=int, default=1000)
+    export_parser.add_argument("--include-password-hash", action="store_true")
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    with database.SessionLocal() as db:
+        if args.command == "import":
+            with args.path.open(newline="", encoding="utf-8") as file:
+                result = import_users(
+                    db,
+                    read_rows(file, args.format or detect_format(args.path)),
+                    batch_size=args.batch_size,
+                    workers=args.workers,
+                )
+
+            for line, error in result.errors:
+                logger.error("Row %s: %s", line, error)
+
+            logger.info(
+                "Done: %s inserted, %s skipped, %s errors.",
+                result.inserted,
+                result.skipped,
+                len(result.errors),
+            )
+
+            return 1 if result.errors else 0
+
+        format = args.format or ("jsonl" if str(args.path) == "-" else detect_format(args.path))
+
+        if str(args.path) == "-":
+            count = export_users(
+                db,
+                sys.stdout,
+                format,
+                batch_size=args.batch_size,
+                include_password=args.include_password_hash,
+            )
+
+        else:
+            with args.path.open("w", newline="", encoding="utf-8") as file:
+                count = export_users(
+                    db,
+                    file,
+                    format,
+                    batch_size=args.batch_size,
+                    include_password=args.include_password_hash,
+                )
+
+        logger.info("Exported %s users.", count)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""In-process ASGI 壓力測試
+
+直接透過 `httpx.ASGITransport` 呼叫 app，不需要啟動 uvicorn，資料庫預設使用暫存的 SQLite
+檔案，也可以用 `--db-uri` 指定本機的 MySQL
+
+在 `backend` 目錄下執行：
+
+    python -m benchmarks.load --requests 200 --concurrency 10
+    python -m benchmarks.load --save benchmarks/baseline.json
+    python -m benchmarks.load --compare benchmarks/baseline.json --tolerance 0.2
+
+baseline 只有在同一台機器上比較才有意義，所以不放進版本控制 (已加入 `.gitignore`)：
+修改前先在本機以 `--save` 記錄，修改後再以 `--compare` 比較
+"""
+
+import argparse
+import asyncio
+import itertools
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Generator, List, Optional
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import link_token, security
+from app.config.database import Base
+from app.config.email import fm
+from app.config.settings import get_settings
+from app.deps import get_session
+from app.main import create_app
+from app.models.user import User
+from benchmarks.report import ScenarioResult, compare_reports, load_report, save_report
+
+settings = get_settings()
+
+SCENARIOS = ("login", "refresh", "me", "register", "verify")
+PASSWORD = "benchmark-password"
+
+RequestFunc = Callable[[httpx.AsyncClient, int, Dict[str, Any]], Awaitable[httpx.Response]]
+
+
+class LoadEnv:
+    """壓測用的 app 與資料庫"""
+
+    def __init__(self, db_uri: Optional[str]) -> None:
+
+        if db_uri is None:
+            self._tmpdir = tempfile.TemporaryDirectory()
+            db_uri = f"sqlite:///{self._tmpdir.name}/benchmark.db"
+
+        connect_args = (
+            {"check_same_thread": False, "timeout": 30} if db_uri.startswith("sqlite") else {}
+        )
+
+        self.engine = create_engine(db_uri, connect_args=connect_args)
+        self.SessionBench = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+        self.run_id = uuid.uuid4().hex[:8]
+
+        Base.metadata.create_all(bind=self.engine)
+
+        self.app = create_app()
+        self.app.dependency_overrides[get_session] = self._get_session
+
+        fm.config.SUPPRESS_SEND = 1
+
+    def _get_session(self) -> Generator[Session, None, None]:
+
+        session = self.SessionBench()
+
+        try:
+            yield session
+
+        finally:
+            session.close()
+
+    def seed_users(self, prefix: str, count: int, active: bool = True) -> List[User]:
+        """建立測試使用者，所有使用者共用同一個密碼 hash，避免建立資料時就花費大量時間"""
+
+        hashed_pwd = security.hash_string(PASSWORD)
+
+        with self.SessionBench(expire_on_commit=False) as session:
+            users = [
+                User(
+                    email=f"{prefix}-{self.run_id}-{i}@test.com",
+                    name=f"{prefix}{i}",
+                    password=hashed_pwd,
+                    is_active=active,
+                    verified_at=datetime.now() if active else None,
+                )
+                for i in range(count)
+            ]
+
+            session.add_all(users)
+            session.commit()
+
+            for user in users:
+                session.refresh(user)
+
+        return users
+
+    def close(self) -> None:
+
+        self.engine.dispose()
+
+
+async def _login(client: httpx.AsyncClient, user: User) -> Dict[str, str]:
+
+    response = await client.post("/auth/login", data={"username": user.email, "password": PASSWORD})
+    response.raise_for_status()
+
+    return {
+        "access_token": response.json()["access_token"]["token"],
+        "refresh_token": response.json()["refresh_token"]["token"],
+    }
+
+
+async def _prepare(
+    env: LoadEnv, client: httpx.AsyncClient, name: str, requests: int, concurrency: int
+) -> List[Dict[str, Any]]:
+    """建立每個 worker 在計時前需要的資料"""
+
+    if name == "login":
+        users = env.seed_users("login", concurrency)
+
+        return [{"user": user} for user in users]
+
+    if name in ("refresh", "me"):
+        users = env.seed_users(name, concurrency)
+
+        return [await _login(client, user) for user in users]
+
+    if name == "verify":
+        users = env.seed_users("verify", requests, active=False)
+        tokens = [
+            link_token.generate_link_token(user, settings.USER_VERIFY_ACCOUNT_EMAIL_CONTEXT)
+            for user in users
+        ]
+
+        return [{"users": users, "tokens": tokens} for _ in range(concurrency)]
+
+    return [{} for _ in range(concurrency)]
+
+
+def _get_request_func(name: str, run_id: str) -> RequestFunc:
+
+    async def login(client: httpx.AsyncClient, i: int, state: Dict[str, Any]) -> httpx.Response:
+
+        return await client.post(
+            "/auth/login", data={"username": state["user"].email, "password": PASSWORD}
+        )
+
+    async def refresh(client: httpx.AsyncClient, i: int, state: Dict[str, Any]) -> httpx.Response:
+
+        response = await client.post(
+            "/auth/token/refresh", headers={"refresh-token": state["refresh_token"]}
+        )
+
+        if response.status_code == 200:
+            state["refresh_token"] = response.json()["refresh_token"]["token"]
+
+        return response
+
+    async def me(client: httpx.AsyncClient, i: int, state: Dict[str, Any]) -> httpx.Response:
+
+        return await client.get(
+            "/users/me", headers={"Authorization": f"Bearer {state['access_token']}"}
+        )
+
+    async def register(client: httpx.AsyncClient, i: int, state: Dict[str, Any]) -> httpx.Response:
+
+        data = {
+            "email": f"register-{run_id}-{i}@test.com",
+            "name": f"register{i}",
+            "password": PASSWORD,
+        }
+
+        return await client.post("/users", json=data)
+
+    async def verify(client: httpx.AsyncClient, i: int, state: Dict[str, Any]) -> httpx.Response:
+
+        data = {"email": state["users"][i].email, "token": state["tokens"][i]}
+
+        return await client.post("/auth/verifiy", json=data)
+
+    return {
+        "login": login,
+        "refresh": refresh,
+        "me": me,
+        "register": register,
+        "verify": verify,
+    }[name]
+
+
+async def run_scenario(
+    env: LoadEnv, client: httpx.AsyncClient, name: str, requests: int, concurrency: int
+) -> ScenarioResult:
+    """以 `concurrency` 個 worker 共送出 `requests` 個請求"""
+
+    states = await _prepare(env, client, name, requests, concurrency)
+    request_func = _get_request_func(name, env.run_id)
+
+    result = ScenarioResult(name=name)
+    counter = itertools.count()
+
+    async def worker(state: Dict[str, Any]) -> None:
+
+        while (i := next(counter)) < requests:
+            start = time.perf_counter()
+            response = await request_func(client, i, state)
+            result.latencies.append(time.perf_counter() - start)
+
+            if response.status_code >= 400:
+                result.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(state) for state in states))
+    result.duration = time.perf_counter() - start
+
+    return result
+
+
+async def run(
+    scenarios: List[str], requests: int, concurrency: int, db_uri: Optional[str] = None
+) -> Dict[str, Dict[str, float]]:
+    """執行壓測，並回傳每個情境的統計結果"""
+
+    env = LoadEnv(db_uri)
+    security.hashing_pool.start()
+
+    transport = httpx.ASGITransport(app=env.app)
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            report = {}
+
+            for name in scenarios:
+                result = await run_scenario(env, client, name, requests, concurrency)
+                report[name] = result.summary()
+
+            return report
+
+    finally:
+        security.hashing_pool.shutdown()
+        env.close()
+
+
+def _print_report(report: Dict[str, Dict[str, float]]) -> None:
+
+    print(
+        f"{'scenario':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+    )
+
+    for name, summary in report.items():
+        print(
+            f"{name:<10}{summary['requests']:>10}{summary['errors']:>8}{summary['rps']:>10}"
+            f"{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['p99_ms']:>10}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Load test the auth hot paths in-process.")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, dest="scenarios")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--db-uri", default=None, help="預設使用暫存的 SQLite 檔案")
+    parser.add_argument("--save", type=Path, help="將結果存成 baseline")
+    parser.add_argument("--compare", type=Path, help="與 baseline 比較，退步時回傳 1")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(
+        run(list(args.scenarios or SCENARIOS), args.requests, args.concurrency, args.db_uri)
+    )
+
+    _print_report(report)
+
+    if args.save:
+        save_report(report, args.save)
+
+    if args.compare:
+        regressions = compare_reports(report, load_report(args.compare), args.tolerance)
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
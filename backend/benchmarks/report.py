@@ -0,0 +1,84 @@
+import json
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """取得 `values` 的第 `q` 百分位數 (nearest-rank)"""
+
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+
+    return ordered[rank]
+
+
+@dataclass
+class ScenarioResult:
+    """單一情境的壓測結果，延遲單位為秒"""
+
+    name: str
+    duration: float = 0.0
+    errors: int = 0
+    latencies: List[float] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, float]:
+        """回傳 req/s 與 p50/p95/p99 延遲 (毫秒)"""
+
+        requests = len(self.latencies)
+
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "rps": round(requests / self.duration, 2) if self.duration else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 3),
+        }
+
+
+def save_report(report: Dict[str, Dict[str, float]], path: Path) -> None:
+
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+
+def load_report(path: Path) -> Dict[str, Dict[str, float]]:
+
+    return json.loads(path.read_text())
+
+
+def compare_reports(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float = 0.2,
+) -> List[str]:
+    """比較目前結果與 baseline，回傳效能退步的項目
+
+    p95 / p99 延遲高於 baseline `tolerance` 比例以上，或 req/s 低於 baseline `tolerance`
+    比例以上，都視為退步
+    """
+
+    regressions = []
+
+    for name, base in baseline.items():
+        result = current.get(name)
+
+        if result is None:
+            continue
+
+        for metric in ("p95_ms", "p99_ms"):
+            if base[metric] and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {result[metric]} > baseline {base[metric]} (+{tolerance:.0%})"
+                )
+
+        if base["rps"] and result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: rps {result['rps']} < baseline {base['rps']} (-{tolerance:.0%})"
+            )
+
+    return regressions
@@ -0,0 +1,235 @@
+"""auth 熱門路徑的 micro-benchmark
+
+pytest benchmarks --no-cov
+pytest benchmarks --no-cov --benchmark-autosave
+pytest benchmarks --no-cov --benchmark-compare --benchmark-compare-fail=mean:20%
+"""
+
+from datetime import datetime
+from typing import Literal, Optional
+
+import jwt
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+
+from app import deps, link_token
+from app.cache import TTLCache, UserSnapshot
+from app.config.settings import get_settings
+from app.models.user import User
+from app.schemas import response_schemas, utils_schemas
+from app.security import get_unique_string, hash_string, str_encode, verify_hashed_string
+from app.services import auth_serv
+from app.token_codec import token_codec
+
+settings = get_settings()
+
+
+@pytest.fixture(scope="module")
+def user() -> User:
+
+    return User(
+        id=1,
+        email="test@test.com",
+        name="test",
+        password=hash_string("test"),
+        is_active=True,
+        verified_at=datetime.now(),
+        create_at=datetime(2024, 1, 1, 12, 0, 0),
+    )
+
+
+def test_bench_generate_access_token(benchmark, user) -> None:
+
+    def generate() -> str:
+        return auth_serv._generate_token(auth_serv._generate_token_payload(user, "at")).token
+
+    assert benchmark(generate)
+
+
+def test_bench_decode_access_token(benchmark, user) -> None:
+
+    token = auth_serv._generate_token(auth_serv._generate_token_payload(user, "at")).token
+
+    assert benchmark(deps.get_token_user_id, token) == user.id
+
+
+def test_bench_decode_pyjwt_per_request(benchmark, user) -> None:
+    """改用 `TokenCodec` 之前的作法：每次都以原始的 secret 與演算法字串呼叫 `jwt.decode`"""
+
+    token = auth_serv._generate_token(auth_serv._generate_token_payload(user, "at")).token
+
+    def decode() -> dict:
+        return jwt.decode(token, settings.JWT_SECRET, settings.JWT_ALGORITHM)
+
+    assert benchmark(decode)["t"]
+
+
+def test_bench_decode_token_codec(benchmark, user) -> None:
+
+    token = auth_serv._generate_token(auth_serv._generate_token_payload(user, "at")).token
+
+    assert benchmark(token_codec.decode, token)["t"]
+
+
+def test_bench_encode_pyjwt_per_request(benchmark, user) -> None:
+
+    payload = auth_serv._generate_token_payload(user, "at").to_claims()
+
+    def encode() -> str:
+        return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+    assert benchmark(encode)
+
+
+def test_bench_encode_token_codec(benchmark, user) -> None:
+
+    payload = auth_serv._generate_token_payload(user, "at").to_claims()
+
+    assert benchmark(token_codec.encode, payload)
+
+
+def _legacy_claims(payload: utils_schemas.jwt.JWTPayload) -> dict:
+    """遷移前的格式：`sub`、`p` 以 base85 編碼，access token 的 token key 為 50 bytes"""
+
+    return {
+        "sub": str_encode(str(payload.sub)),
+        "t": get_unique_string(50),
+        "p": str_encode(payload.p),
+        "exp": payload.exp,
+    }
+
+
+@pytest.mark.parametrize("claims_format", ["legacy", "compact"])
+def test_bench_claims_round_trip(benchmark, user, claims_format: str) -> None:
+    """簽署、驗證到取得使用者 id 的成本，`token_bytes` 為 token 的長度"""
+
+    payload = auth_serv._generate_token_payload(user, "at")
+
+    claims = _legacy_claims(payload) if claims_format == "legacy" else payload.to_claims()
+
+    def round_trip() -> str:
+
+        token = token_codec.encode(claims)
+
+        assert utils_schemas.jwt.JWTPayload.from_claims(token_codec.decode(token)).sub == user.id
+
+        return token
+
+    token = benchmark(round_trip)
+    benchmark.extra_info["token_bytes"] = len(token)
+
+
+class _PydanticJWTPayload(BaseModel):
+    """改用 `__slots__` 之前的 `JWTPayload`"""
+
+    sub: int
+    t: str
+    p: Literal["at", "rt"]
+    exp: datetime
+    email: Optional[str] = None
+    name: Optional[str] = None
+
+
+class _PydanticJWToken(BaseModel):
+
+    token: str
+    expires_at: datetime
+
+
+class _PydanticJWTokenResp(BaseModel):
+    """改用 `JWTokenResp.render` 之前，由 `response_model` 驗證並序列化的回應"""
+
+    access_token: _PydanticJWToken
+    refresh_token: _PydanticJWToken
+
+
+def _run_until_await(coro):
+    """執行不會真正等待的 coroutine，避免把 event loop 的成本算進去"""
+
+    try:
+        coro.send(None)
+
+    except StopIteration as stop:
+        return stop.value
+
+    raise RuntimeError("The coroutine awaited.")
+
+
+@pytest.mark.parametrize("claims_type", ["pydantic", "slots"])
+def test_bench_parse_claims(benchmark, user, claims_type: str) -> None:
+    """驗證 token 之後，把 claims 轉換成 `JWTPayload` 的成本"""
+
+    claims = auth_serv._generate_token_payload(user, "at").to_claims()
+
+    if claims_type == "pydantic":
+
+        def parse() -> int:
+            return _PydanticJWTPayload(
+                sub=claims["sub"],
+                t=claims["t"],
+                p=utils_schemas.jwt._PURPOSES[claims["p"]],
+                exp=claims["exp"],
+                email=claims.get("email"),
+                name=claims.get("name"),
+            ).sub
+
+    else:
+
+        def parse() -> int:
+            return utils_schemas.jwt.JWTPayload.from_claims(claims).sub
+
+    assert benchmark(parse) == user.id
+
+
+@pytest.mark.parametrize("resp_type", ["pydantic", "render"])
+def test_bench_token_resp(benchmark, user, resp_type: str) -> None:
+    """登入與 refresh 回應的建立與序列化，`pydantic` 為經過 `response_model` 的作法"""
+
+    at = auth_serv._generate_token(auth_serv._generate_token_payload(user, "at"))
+    rt = auth_serv._generate_token(auth_serv._generate_token_payload(user, "rt"))
+
+    if resp_type == "pydantic":
+        field = create_response_field(
+            name="response", type_=_PydanticJWTokenResp, mode="serialization"
+        )
+
+        def render() -> bytes:
+            resp = _PydanticJWTokenResp(
+                access_token=_PydanticJWToken(token=at.token, expires_at=at.expires_at),
+                refresh_token=_PydanticJWToken(token=rt.token, expires_at=rt.expires_at),
+            )
+            content = _run_until_await(serialize_response(field=field, response_content=resp))
+
+            return JSONResponse(content).body
+
+    else:
+
+        def render() -> bytes:
+            return response_schemas.auth.JWTokenResp(access_token=at, refresh_token=rt).render()
+
+    assert benchmark(render).startswith(b'{"access_token":')
+
+
+def test_bench_verify_link_token(benchmark, user) -> None:
+
+    token = link_token.generate_link_token(user, "verify-account")
+
+    assert benchmark(link_token.verify_signed_token, user, "verify-account", token) is True
+
+
+def test_bench_user_cache_hit(benchmark, user) -> None:
+
+    cache = TTLCache(max_size=100, ttl=60)
+    cache.set(user.id, UserSnapshot.from_user(user))
+
+    assert benchmark(cache.get, user.id) is not None
+
+
+def test_bench_bcrypt_verify(benchmark, user) -> None:
+
+    result = benchmark.pedantic(verify_hashed_string, args=("test", user.password), rounds=5)
+
+    assert result is True
@@ -0,0 +1,142 @@
+"""CRUDBase 單筆與批次操作的 micro-benchmark
+
+pytest benchmarks/test_bench_crud.py --no-cov
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.crud.base import encode_cursor
+from app.crud.crud_user import user_crud
+from app.schemas.db.user import UserDBCreate
+
+ROWS = 200
+PAGING_ROWS = 50000
+PAGE_SIZE = 50
+
+
+@pytest.fixture(scope="function")
+def session():
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    SessionBench = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    Base.metadata.create_all(bind=engine)
+
+    with SessionBench() as session:
+        yield session
+
+    engine.dispose()
+
+
+def _users(prefix: str):
+
+    return [
+        UserDBCreate(email=f"{prefix}{i}@test.com", name=f"user{i}", password="hashed")
+        for i in range(ROWS)
+    ]
+
+
+def _seed(session):
+
+    session.execute(Base.metadata.tables["users"].delete())
+    session.commit()
+
+    return [user.id for user in user_crud.create_many(session, objs_in=_users("seed"))]
+
+
+def test_bench_create_per_row(benchmark, session) -> None:
+
+    def create() -> None:
+        session.execute(Base.metadata.tables["users"].delete())
+
+        for user in _users("row"):
+            user_crud.create(session, obj_in=user)
+
+    benchmark.pedantic(create, rounds=5)
+
+
+def test_bench_create_many(benchmark, session) -> None:
+
+    def create() -> None:
+        session.execute(Base.metadata.tables["users"].delete())
+        user_crud.create_many(session, objs_in=_users("many"))
+
+    benchmark.pedantic(create, rounds=5)
+
+
+def test_bench_update_per_row(benchmark, session) -> None:
+
+    def update(ids) -> None:
+        for id in ids:
+            user_crud.update(session, db_obj=user_crud.get(session, id), obj_in={"is_active": True})
+
+    benchmark.pedantic(update, setup=lambda: ((_seed(session),), {}), rounds=5)
+
+
+def test_bench_update_many(benchmark, session) -> None:
+
+    def update(ids) -> None:
+        user_crud.update_many(session, obj_in={"is_active": True}, ids=ids)
+
+    benchmark.pedantic(update, setup=lambda: ((_seed(session),), {}), rounds=5)
+
+
+def test_bench_remove_per_row(benchmark, session) -> None:
+
+    def remove(ids) -> None:
+        for id in ids:
+            user_crud.remove(session, id=id)
+
+    benchmark.pedantic(remove, setup=lambda: ((_seed(session),), {}), rounds=5)
+
+
+def test_bench_remove_many(benchmark, session) -> None:
+
+    def remove(ids) -> None:
+        user_crud.remove_many(session, ids=ids)
+
+    benchmark.pedantic(remove, setup=lambda: ((_seed(session),), {}), rounds=5)
+
+
+@pytest.fixture(scope="module")
+def paging_session():
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    SessionBench = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    Base.metadata.create_all(bind=engine)
+
+    with SessionBench() as session:
+        user_crud.create_many(
+            session,
+            objs_in=[
+                {"email": f"page{i}@test.com", "name": f"user{i}", "password": "hashed"}
+                for i in range(PAGING_ROWS)
+            ],
+        )
+
+        yield session
+
+    engine.dispose()
+
+
+@pytest.mark.parametrize("depth", [0, PAGING_ROWS - PAGE_SIZE])
+def test_bench_offset_page(benchmark, paging_session, depth: int) -> None:
+
+    result = benchmark(user_crud.get_multi, paging_session, skip=depth, limit=PAGE_SIZE)
+
+    assert len(result) == PAGE_SIZE
+
+
+@pytest.mark.parametrize("depth", [0, PAGING_ROWS - PAGE_SIZE])
+def test_bench_keyset_page(benchmark, paging_session, depth: int) -> None:
+
+    cursor = encode_cursor(("id",), [depth]) if depth else None
+
+    result = benchmark(user_crud.get_page, paging_session, limit=PAGE_SIZE, cursor=cursor)
+
+    assert len(result.items) == PAGE_SIZE
@@ -0,0 +1,42 @@
+"""email template 渲染的 micro-benchmark
+
+pytest benchmarks/test_bench_email.py --no-cov
+"""
+
+import pytest
+from jinja2 import Environment, FileSystemLoader
+
+from app.config.email import fm
+from app.email_templates import EmailTemplates
+
+TEMPLATE_NAME = "users/account-verification.html"
+
+
+@pytest.fixture(scope="module")
+def context() -> dict:
+
+    return {
+        "app_name": "User System",
+        "name": "test",
+        "activate_url": "http://127.0.0.1/verify?token=v1.1.2.abc&email=test@test.com",
+    }
+
+
+def test_bench_render_fastapi_mail(benchmark, context) -> None:
+    """與 fastapi-mail 相同，每次寄送都重新建立 Environment 並取得 template"""
+
+    def render() -> str:
+        env = Environment(loader=FileSystemLoader(fm.config.TEMPLATE_FOLDER))
+        return env.get_template(TEMPLATE_NAME).render(**context)
+
+    assert benchmark(render)
+
+
+def test_bench_render_compiled(benchmark, context) -> None:
+
+    templates = EmailTemplates(
+        fm.config.TEMPLATE_FOLDER, static_context={"app_name": "User System"}
+    )
+    templates.load()
+
+    assert benchmark(templates.render, TEMPLATE_NAME, context)
@@ -0,0 +1,96 @@
+"""撤銷 access token 的檢查：Bloom filter 與每次查詢資料庫的比較
+
+pytest benchmarks/test_bench_revocation.py --no-cov
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.crud.crud_revoked_token import revoked_token_crud
+from app.models.revoked_token import RevokedToken
+from app.revocation import BloomFilter, RevocationList
+from app.security import hash_token_key
+
+REVOKED_ROWS = 100000
+
+
+def _run_until_await(coro):
+    """Bloom filter 沒有命中時 `is_revoked` 不會 await，可以不經過 event loop 直接取得結果"""
+
+    try:
+        coro.send(None)
+
+    except StopIteration as stop:
+        return stop.value
+
+    raise RuntimeError("Coroutine awaited.")
+
+
+@pytest.fixture(scope="module")
+def session():
+
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+
+    expires_at = datetime.utcnow() + timedelta(minutes=3)
+
+    with engine.begin() as connection:
+        connection.execute(
+            insert(RevokedToken),
+            [
+                {"token_hash": hash_token_key(f"revoked-{i}"), "expires_at": expires_at}
+                for i in range(REVOKED_ROWS)
+            ],
+        )
+
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def revocation_list(session) -> RevocationList:
+
+    revocation_list = RevocationList(
+        capacity=REVOKED_ROWS, error_rate=0.001, refresh_interval=1, rebuild_interval=300
+    )
+    asyncio.run(revocation_list.rebuild(session))
+
+    return revocation_list
+
+
+def test_bench_bloom_filter_probe(benchmark, revocation_list) -> None:
+    """沒有被撤銷的 token 只需要檢查 Bloom filter (包含計算 SHA-256)"""
+
+    bloom_filter: BloomFilter = revocation_list._filter
+
+    def probe() -> bool:
+        return hash_token_key("not-revoked") in bloom_filter
+
+    assert not benchmark(probe)
+
+
+def test_bench_is_revoked(benchmark, revocation_list, session) -> None:
+
+    def check() -> bool:
+        return _run_until_await(revocation_list.is_revoked(session, token_key="not-revoked"))
+
+    assert not benchmark(check)
+
+
+def test_bench_db_lookup(benchmark, session) -> None:
+    """每個請求都查詢 `revoked_tokens` 的做法"""
+
+    def lookup() -> bool:
+        return revoked_token_crud.get_by_hash(session, token_hash=hash_token_key("not-revoked"))
+
+    assert benchmark(lookup) is None
@@ -0,0 +1,100 @@
+"""`user_tokens` 的查詢效能
+
+`get_by_key` 透過 `ix_user_tokens_token_hash` 唯一索引查詢。預設會建立十萬筆 token，
+可以用 `BENCH_TOKEN_ROWS` 調整，資料量較大時建立資料需要較久：
+
+    BENCH_TOKEN_ROWS=1000000 pytest benchmarks/test_bench_tokens.py --no-cov
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base
+from app.crud.crud_user import user_token_crud
+from app.models.user import User, UserToken
+from app.security import hash_token_key
+from app.token_store import KeyValueTokenStore, MemoryKeyValue
+
+TOKEN_ROWS = int(os.environ.get("BENCH_TOKEN_ROWS", 100_000))
+USER_ROWS = 10000
+CHUNK_SIZE = 50000
+
+
+def _seed(path) -> None:
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    now = datetime.now()
+
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User),
+            [
+                {"email": f"user{i}@test.com", "name": f"user{i}", "password": "hashed"}
+                for i in range(USER_ROWS)
+            ],
+        )
+
+        for start in range(0, TOKEN_ROWS, CHUNK_SIZE):
+            connection.execute(
+                insert(UserToken),
+                [
+                    {
+                        "user_id": i % USER_ROWS + 1,
+                        "token_hash": hash_token_key(f"token-key-{i}"),
+                        # 一半的 token 已經過期
+                        "expires_at": now + timedelta(minutes=i % 2 * 2 - 1, seconds=i % 3600),
+                        "purpose": "rt",
+                    }
+                    for i in range(start, min(start + CHUNK_SIZE, TOKEN_ROWS))
+                ],
+            )
+
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def session(tmp_path_factory):
+
+    path = tmp_path_factory.mktemp("tokens") / "tokens.db"
+    _seed(path)
+
+    engine = create_engine(f"sqlite:///{path}")
+    session = sessionmaker(bind=engine)()
+
+    yield session
+
+    session.close()
+    engine.dispose()
+
+
+def test_bench_token_get_by_key(benchmark, session) -> None:
+
+    token_key = f"token-key-{TOKEN_ROWS // 2}"
+
+    assert benchmark(user_token_crud.get_by_key, session, token_key=token_key) is not None
+
+
+def test_bench_memory_token_store_get(benchmark) -> None:
+
+    store = KeyValueTokenStore(MemoryKeyValue())
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    loop = asyncio.new_event_loop()
+
+    for i in range(min(TOKEN_ROWS, 100000)):
+        loop.run_until_complete(
+            store.add(None, user_id=i, token_key=f"token-key-{i}", expires_at=expires_at)
+        )
+
+    def get():
+        return loop.run_until_complete(store.get(None, token_key="token-key-50"))
+
+    assert benchmark(get) is not None
+
+    loop.close()
@@ -0,0 +1,36 @@
+from benchmarks.report import ScenarioResult, compare_reports, percentile
+
+
+def test_percentile() -> None:
+
+    values = [float(i) for i in range(1, 101)]
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_scenario_result_summary() -> None:
+
+    result = ScenarioResult(name="me", duration=2.0, errors=1, latencies=[0.01] * 10)
+
+    summary = result.summary()
+
+    assert summary["requests"] == 10
+    assert summary["errors"] == 1
+    assert summary["rps"] == 5.0
+    assert summary["p99_ms"] == 10.0
+
+
+def test_compare_reports() -> None:
+
+    baseline = {"me": {"rps": 100.0, "p95_ms": 10.0, "p99_ms": 20.0}}
+
+    assert compare_reports({"me": {"rps": 95.0, "p95_ms": 11.0, "p99_ms": 21.0}}, baseline) == []
+
+    regressions = compare_reports({"me": {"rps": 50.0, "p95_ms": 20.0, "p99_ms": 20.0}}, baseline)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("me: p95_ms")
+    assert regressions[1].startswith("me: rps")
@@ -1,4 +1,36 @@
 import os
 import sys
+from typing import AsyncGenerator
+
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import Base  # noqa: E402
+
+
+@pytest_asyncio.fixture(scope="function", name="async_sqlite_session")
+async def async_sqlite_session() -> AsyncGenerator[AsyncSession, None]:
+    """取得 async sqlite orm session，並會初始化和刪除資料表"""
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    SessionTest = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session = SessionTest()
+
+    try:
+        yield session
+
+    finally:
+
+        await session.close()
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+
+        await engine.dispose()
@@ -7,11 +7,13 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from app.cache import user_cache
 from app.config.database import Base
 from app.config.email import fm
 from app.config.settings import get_settings
 from app.deps import get_session
 from app.main import create_app
+from app.revocation import revocation_list
 
 settings = get_settings()
 
@@ -59,4 +61,8 @@ def client(test_app, test_session) -> TestClient:
     test_app.dependency_overrides[get_session] = _test_db
     fm.config.SUPPRESS_SEND = 1
 
+    # 每個測試都會重建資料表，id 會重複使用，避免取得上一個測試快取的使用者與撤銷的 token
+    user_cache.clear()
+    revocation_list.clear()
+
     return TestClient(app=test_app)
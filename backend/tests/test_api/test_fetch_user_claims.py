@@ -0,0 +1,69 @@
+from pytest_mock import MockFixture
+
+from app import security
+from app.models.user import User
+from app.services import auth_serv
+from app.token_codec import token_codec
+
+
+def _get_access_token(user: User) -> str:
+
+    payload = auth_serv._generate_token_payload(user, "at")
+
+    return auth_serv._generate_token(payload).token
+
+
+def test_fetch_user_from_token_claims(client, mocker: MockFixture) -> None:
+
+    mocker.patch("app.services.auth_serv.settings.JWT_PROFILE_CLAIMS", True)
+    mock_get = mocker.patch("app.crud.crud_user.user_crud.get")
+
+    user = User(id=1, email="test@test.com", name="user1")
+
+    header = {"Authorization": f"Bearer {_get_access_token(user)}"}
+
+    response = client.get("/users/me", headers=header)
+
+    assert response.status_code == 200
+    assert response.json() == {"id": 1, "email": "test@test.com", "name": "user1"}
+    mock_get.assert_not_called()
+
+
+def test_fetch_user_without_token_claims(client, test_session, mocker: MockFixture) -> None:
+
+    mocker.patch("app.services.auth_serv.settings.JWT_PROFILE_CLAIMS", False)
+
+    user = User(email="test@test.com", name="user1", password="test")
+    test_session.add(user)
+    test_session.commit()
+    test_session.refresh(user)
+
+    header = {"Authorization": f"Bearer {_get_access_token(user)}"}
+
+    response = client.get("/users/me", headers=header)
+
+    assert response.status_code == 200
+    assert response.json() == {"id": user.id, "email": "test@test.com", "name": "user1"}
+
+
+def test_fetch_user_with_legacy_claims(client, test_session) -> None:
+
+    user = User(email="test@test.com", name="user1", password="test")
+    test_session.add(user)
+    test_session.commit()
+
+    # 遷移前以 base85 編碼 `sub`、`p` 的 token
+    payload = auth_serv._generate_token_payload(user, "at")
+    token = token_codec.encode(
+        {
+            "sub": security.str_encode(str(user.id)),
+            "t": payload.t,
+            "p": security.str_encode("at"),
+            "exp": payload.exp,
+        }
+    )
+
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json()["email"] == "test@test.com"
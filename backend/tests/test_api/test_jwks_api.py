@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import jwt
+from pytest_mock import MockFixture
+
+from app.config.settings import get_settings
+from app.jwt_keys import KeyRing, generate_private_key, load_pem_key
+from app.models.user import User
+from app.security import hash_string
+from app.token_codec import TokenCodec
+
+
+def test_jwks_for_hs256(client) -> None:
+
+    response = client.get("/.well-known/jwks.json")
+
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}
+
+
+def test_login_with_eddsa_and_verify_with_jwks(client, test_session, mocker: MockFixture) -> None:
+
+    keyring = KeyRing([load_pem_key(generate_private_key("EdDSA"))])
+
+    token_codec = TokenCodec.from_settings(get_settings(), keyring)
+
+    mocker.patch("app.deps.token_codec", token_codec)
+    mocker.patch("app.services.auth_serv.token_codec", token_codec)
+    mocker.patch("app.routes.base.keyring", keyring)
+
+    user = User(
+        email="test@test.com",
+        name="user1",
+        password=hash_string("test"),
+        is_active=True,
+        verified_at=datetime.now(),
+    )
+    test_session.add(user)
+    test_session.commit()
+
+    response = client.post("/auth/login", data={"username": "test@test.com", "password": "test"})
+    at = response.json()["access_token"]["token"]
+
+    assert jwt.get_unverified_header(at) == {
+        "alg": "EdDSA",
+        "kid": keyring.active.kid,
+        "typ": "JWT",
+    }
+    assert client.get("/users/me", headers={"Authorization": f"Bearer {at}"}).status_code == 200
+
+    response = client.get("/.well-known/jwks.json")
+    etag = response.headers["ETag"]
+
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+
+    # 其他服務只需要公鑰就可以驗證 token
+    jwk = jwt.PyJWKSet.from_dict(response.json())[keyring.active.kid]
+    payload = jwt.decode(at, jwk.key, algorithms=[jwk.algorithm_name])
+
+    assert payload["t"]
+
+    response = client.get("/.well-known/jwks.json", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
@@ -0,0 +1,65 @@
+from pytest_mock import MockFixture
+
+from app.models.user import User
+from app.services import auth_serv
+
+
+def _get_access_token(user: User) -> str:
+
+    payload = auth_serv._generate_token_payload(user, "at")
+
+    return auth_serv._generate_token(payload).token
+
+
+def _add_users(test_session, count: int) -> User:
+
+    users = [
+        User(email=f"user{i}@test.com", name=f"user{i}", password="test") for i in range(count)
+    ]
+    test_session.add_all(users)
+    test_session.commit()
+
+    return users[0]
+
+
+def test_list_users(client, test_session, mocker: MockFixture) -> None:
+
+    mocker.patch("app.deps.settings.ADMIN_EMAILS_LIST", ["user0@test.com"])
+    admin = _add_users(test_session, 5)
+
+    header = {"Authorization": f"Bearer {_get_access_token(admin)}"}
+
+    response = client.get("/users", params={"limit": 3}, headers=header)
+
+    assert response.status_code == 200
+    assert [user["email"] for user in response.json()["items"]] == [
+        "user0@test.com",
+        "user1@test.com",
+        "user2@test.com",
+    ]
+
+    cursor = response.json()["next_cursor"]
+    response = client.get("/users", params={"limit": 3, "cursor": cursor}, headers=header)
+
+    assert response.status_code == 200
+    assert [user["email"] for user in response.json()["items"]] == [
+        "user3@test.com",
+        "user4@test.com",
+    ]
+    assert response.json()["next_cursor"] is None
+
+    response = client.get("/users", params={"cursor": "invalid"}, headers=header)
+
+    assert response.status_code == 400
+
+
+def test_list_users_not_admin(client, test_session, mocker: MockFixture) -> None:
+
+    mocker.patch("app.deps.settings.ADMIN_EMAILS_LIST", [])
+    user = _add_users(test_session, 1)
+
+    header = {"Authorization": f"Bearer {_get_access_token(user)}"}
+
+    response = client.get("/users", headers=header)
+
+    assert response.status_code == 403
@@ -0,0 +1,68 @@
+from app import metrics
+
+
+def test_metrics_endpoint(client, mocker) -> None:
+
+    mocker.patch("app.routes.metrics.settings.METRICS_ENABLED", True)
+    mocker.patch("app.routes.metrics.settings.METRICS_TOKEN", "")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE http_requests_total counter" in response.text
+    assert "# TYPE db_pool_checkout_seconds histogram" in response.text
+    assert "# TYPE password_hash_seconds histogram" in response.text
+    assert "# TYPE email_queue_depth gauge" in response.text
+
+
+def test_metrics_endpoint_disabled(client, mocker) -> None:
+
+    mocker.patch("app.routes.metrics.settings.METRICS_ENABLED", False)
+
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_endpoint_token(client, mocker) -> None:
+
+    mocker.patch("app.routes.metrics.settings.METRICS_ENABLED", True)
+    mocker.patch("app.routes.metrics.settings.METRICS_TOKEN", "secret")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+
+    assert response.status_code == 200
+    assert "# TYPE http_requests_total counter" in response.text
+
+
+def test_metrics_middleware_route_label(client) -> None:
+
+    requests = metrics.HTTP_REQUESTS_TOTAL.labels("GET", "/", "200")
+    count = requests.get()
+
+    client.get("/")
+
+    assert requests.get() == count + 1
+    assert metrics.HTTP_REQUEST_DURATION_SECONDS.labels("GET", "/").snapshot()["count"] >= 1
+
+
+def test_metrics_middleware_unmatched_route(client) -> None:
+
+    requests = metrics.HTTP_REQUESTS_TOTAL.labels("GET", "unmatched", "404")
+    count = requests.get()
+
+    client.get("/not-found/123")
+
+    assert requests.get() == count + 1
+
+
+def test_metrics_middleware_unknown_method(client) -> None:
+
+    requests = metrics.HTTP_REQUESTS_TOTAL.labels("other", "unmatched", "404")
+    count = requests.get()
+
+    client.request("FOO", "/not-found")
+
+    assert requests.get() == count + 1
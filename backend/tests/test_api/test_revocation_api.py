@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from app.models.revoked_token import RevokedToken
+from app.models.user import User
+from app.security import hash_string
+
+
+def _add_user(test_session) -> None:
+
+    user = User(
+        email="test@test.com",
+        name="user1",
+        password=hash_string("test"),
+        is_active=True,
+        verified_at=datetime.now(),
+    )
+    test_session.add(user)
+    test_session.commit()
+
+
+def test_logout_revokes_access_token(client, test_session) -> None:
+
+    _add_user(test_session)
+
+    response = client.post("/auth/login", data={"username": "test@test.com", "password": "test"})
+    at = response.json()["access_token"]["token"]
+    rt = response.json()["refresh_token"]["token"]
+
+    headers = {"Authorization": f"Bearer {at}"}
+
+    assert client.get("/users/me", headers=headers).status_code == 200
+
+    response = client.get("/auth/logout", headers={**headers, "refresh-token": rt})
+
+    assert response.status_code == 200
+    assert test_session.query(RevokedToken).count() == 1
+
+    response = client.get("/users/me", headers=headers)
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token revoked."
+
+    # 重新登入取得的 token 不受影響
+    response = client.post("/auth/login", data={"username": "test@test.com", "password": "test"})
+    at = response.json()["access_token"]["token"]
+
+    assert client.get("/users/me", headers={"Authorization": f"Bearer {at}"}).status_code == 200
+
+
+def test_logout_with_invalid_refresh_token_revokes_access_token(client, test_session) -> None:
+
+    _add_user(test_session)
+
+    response = client.post("/auth/login", data={"username": "test@test.com", "password": "test"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']['token']}"}
+
+    response = client.get("/auth/logout", headers={**headers, "refresh-token": "invalid"})
+
+    assert response.status_code == 401
+    assert test_session.query(RevokedToken).count() == 1
+    assert client.get("/users/me", headers=headers).status_code == 401
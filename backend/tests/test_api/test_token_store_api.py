@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from pytest_mock import MockFixture
+
+from app.models.user import User
+from app.security import hash_string
+from app.token_store import KeyValueTokenStore, MemoryKeyValue
+
+
+def test_refresh_and_logout_with_key_value_store(client, test_session, mocker: MockFixture) -> None:
+
+    store = KeyValueTokenStore(MemoryKeyValue())
+    mocker.patch("app.services.auth_serv.token_store", store)
+
+    user = User(
+        email="test@test.com",
+        name="user1",
+        password=hash_string("test"),
+        is_active=True,
+        verified_at=datetime.now(),
+    )
+    test_session.add(user)
+    test_session.commit()
+
+    response = client.post("/auth/login", data={"username": "test@test.com", "password": "test"})
+    old_rt = response.json()["refresh_token"]["token"]
+
+    assert response.status_code == 200
+    assert len(store.client) == 1
+
+    response = client.post("/auth/token/refresh", headers={"refresh-token": old_rt})
+    at = response.json()["access_token"]["token"]
+    rt = response.json()["refresh_token"]["token"]
+
+    assert response.status_code == 200
+
+    response = client.post("/auth/token/refresh", headers={"refresh-token": old_rt})
+
+    assert response.status_code == 400
+
+    response = client.get(
+        "/auth/logout", headers={"Authorization": f"Bearer {at}", "refresh-token": rt}
+    )
+
+    assert response.status_code == 200
+    assert len(store.client) == 0
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from pytest_mock import MockFixture
+
+from app.cache import TTLCache, UserSnapshot
+from app.models.user import User
+
+
+def test_cache_get_and_set() -> None:
+
+    cache = TTLCache(max_size=10, ttl=60)
+
+    assert cache.get(1) is None
+
+    cache.set(1, "user1")
+
+    assert cache.get(1) == "user1"
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_cache_expired(mocker: MockFixture) -> None:
+
+    cache = TTLCache(max_size=10, ttl=60)
+
+    monotonic = mocker.patch("app.cache.time.monotonic", return_value=100)
+    cache.set(1, "user1")
+
+    monotonic.return_value = 161
+
+    assert cache.get(1) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_evict_least_recently_used() -> None:
+
+    cache = TTLCache(max_size=2, ttl=60)
+
+    cache.set(1, "user1")
+    cache.set(2, "user2")
+    cache.get(1)
+    cache.set(3, "user3")
+
+    assert cache.get(1) == "user1"
+    assert cache.get(2) is None
+    assert cache.get(3) == "user3"
+
+
+def test_cache_invalidate() -> None:
+
+    cache = TTLCache(max_size=10, ttl=60)
+
+    cache.set(1, "user1")
+    cache.invalidate(1)
+
+    assert cache.get(1) is None
+
+
+def test_user_snapshot_from_user() -> None:
+
+    verified_at = datetime.now()
+    user = User(
+        id=1,
+        email="test@test.com",
+        name="test",
+        password="test",
+        is_active=True,
+        verified_at=verified_at,
+    )
+
+    snapshot = UserSnapshot.from_user(user)
+
+    assert snapshot == UserSnapshot(
+        id=1, email="test@test.com", name="test", is_active=True, verified_at=verified_at
+    )
@@ -0,0 +1,59 @@
+import pytest
+from pytest_mock import MockFixture
+from sqlalchemy.orm import Session
+
+from app.crud.async_crud_user import async_user_crud
+from app.schemas import db_schemas
+
+
+@pytest.mark.asyncio
+async def test_async_user_create_and_get_by_email(
+    async_sqlite_session, get_random_user_obj
+) -> None:
+
+    obj_in = db_schemas.user.UserDBCreate(
+        email=get_random_user_obj.email,
+        name=get_random_user_obj.name,
+        password=get_random_user_obj.raw_password,
+    )
+
+    user = await async_user_crud.create(async_sqlite_session, obj_in=obj_in)
+
+    result = await async_user_crud.get_by_email(async_sqlite_session, email=obj_in.email)
+
+    assert result.id == user.id
+    assert result.name == obj_in.name
+
+
+@pytest.mark.asyncio
+async def test_async_user_update(async_sqlite_session, get_random_user_obj) -> None:
+
+    obj_in = db_schemas.user.UserDBCreate(
+        email=get_random_user_obj.email,
+        name=get_random_user_obj.name,
+        password=get_random_user_obj.raw_password,
+    )
+
+    user = await async_user_crud.create(async_sqlite_session, obj_in=obj_in)
+
+    await async_user_crud.update(
+        async_sqlite_session,
+        db_obj=user,
+        obj_in=db_schemas.user.UserDBUpdate(is_active=True),
+    )
+
+    result = await async_user_crud.get(async_sqlite_session, user.id)
+
+    assert result.is_active is True
+
+
+@pytest.mark.asyncio
+async def test_async_user_crud_with_sync_session(mocker: MockFixture) -> None:
+
+    session = mocker.Mock(spec=Session)
+    mock_get_by_email = mocker.patch("app.crud.crud_user.user_crud.get_by_email", return_value=None)
+
+    result = await async_user_crud.get_by_email(session, email="test@test.com")
+
+    assert result is None
+    mock_get_by_email.assert_called_once_with(session, email="test@test.com")
@@ -1,12 +1,13 @@
 from typing import Optional
 
+import pytest
 from pydantic import BaseModel
 from pytest_mock import MockFixture
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import Session
 
 from app.config.database import Base
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, commit
 
 
 class MockModel(Base):
@@ -125,3 +126,214 @@ def test_remove(mocker: MockFixture) -> None:
     db.get.assert_called_once_with(model, 1)
     db.delete.assert_called_once_with(obj)
     db.commit.assert_called_once()
+
+
+def test_update_calls_on_change(mocker: MockFixture) -> None:
+
+    db = mocker.Mock(spec=Session)
+    on_change = mocker.Mock()
+
+    crud = CRUDBase(MockModel, on_change=on_change)
+
+    db_obj = MockModel(id=1, username="test")
+
+    crud.update(db, db_obj=db_obj, obj_in={"username": "test_update"})
+
+    on_change.assert_called_once_with(1)
+
+
+def test_remove_calls_on_change(mocker: MockFixture) -> None:
+
+    db = mocker.Mock(spec=Session)
+    on_change = mocker.Mock()
+
+    crud = CRUDBase(MockModel, on_change=on_change)
+
+    db.get.return_value = MockModel(id=1)
+
+    crud.remove(db, id=1)
+
+    on_change.assert_called_once_with(1)
+
+
+def test_create_without_commit(mocker: MockFixture) -> None:
+
+    class MockCreateScheam(BaseModel):
+        id: int
+
+    db = mocker.Mock(spec=Session)
+    crud = CRUDBase(MockModel)
+
+    result = crud.create(db, obj_in=MockCreateScheam(id=1), commit=False)
+
+    db.add.assert_called_once_with(result)
+    db.commit.assert_not_called()
+    db.refresh.assert_not_called()
+
+
+def test_update_without_commit_defers_on_change(mocker: MockFixture) -> None:
+
+    db = mocker.Mock(spec=Session)
+    db.info = {}
+    on_change = mocker.Mock()
+
+    crud = CRUDBase(MockModel, on_change=on_change)
+
+    db_obj = MockModel(id=1, username="test")
+
+    crud.update(db, db_obj=db_obj, obj_in={"username": "test_update"}, commit=False)
+
+    db.commit.assert_not_called()
+    db.refresh.assert_not_called()
+    on_change.assert_not_called()
+
+    commit(db)
+
+    db.commit.assert_called_once()
+    on_change.assert_called_once_with(1)
+    assert db.info == {}
+
+
+def test_create_many(sqlite_session: Session) -> None:
+
+    crud = CRUDBase(MockModel)
+
+    result = crud.create_many(sqlite_session, objs_in=[{"username": f"user{i}"} for i in range(3)])
+
+    assert [obj.username for obj in result] == ["user0", "user1", "user2"]
+    assert all(obj.id is not None for obj in result)
+    assert len(crud.get_multi(sqlite_session)) == 3
+
+
+def test_create_many_without_returning(sqlite_session: Session, mocker: MockFixture) -> None:
+
+    mocker.patch("app.crud.base._supports_returning", return_value=False)
+
+    crud = CRUDBase(MockModel)
+
+    result = crud.create_many(
+        sqlite_session, objs_in=[{"username": "user0"}, {"username": "user1"}]
+    )
+
+    assert [obj.id for obj in result] == [1, 2]
+
+
+def test_create_many_mysql(mocker: MockFixture) -> None:
+
+    mocker.patch("app.crud.base._supports_returning", return_value=False)
+
+    db = mocker.Mock(spec=Session)
+    db.get_bind.return_value.dialect.name = "mysql"
+    db.execute.side_effect = [
+        mocker.Mock(**{"one.return_value": (1, 2)}),
+        mocker.Mock(lastrowid=11),
+    ]
+    db.scalars.return_value = [MockModel(id=11), MockModel(id=13)]
+
+    crud = CRUDBase(MockModel)
+
+    result = crud.create_many(db, objs_in=[{"username": "user0"}, {"username": "user1"}])
+
+    assert [obj.id for obj in result] == [11, 13]
+
+    # 一個多列 INSERT，而不是每筆一個
+    stmt = db.execute.call_args_list[1].args[0]
+    assert len(stmt._multi_values[0]) == 2
+    assert db.scalars.call_args.args[0].compile().params == {"id_1": [11, 13]}
+    db.add_all.assert_not_called()
+    db.commit.assert_called_once()
+
+
+def test_create_many_mysql_interleaved(mocker: MockFixture) -> None:
+
+    mocker.patch("app.crud.base._supports_returning", return_value=False)
+
+    db = mocker.Mock(spec=Session)
+    db.get_bind.return_value.dialect.name = "mysql"
+    db.execute.return_value = mocker.Mock(**{"one.return_value": (2, 1)})
+
+    crud = CRUDBase(MockModel)
+
+    result = crud.create_many(db, objs_in=[{"username": "user0"}, {"username": "user1"}])
+
+    # lock mode 2 的 id 可能不連續，改由 session 逐筆寫入
+    assert [obj.username for obj in result] == ["user0", "user1"]
+    db.execute.assert_called_once()
+    db.add_all.assert_called_once_with(result)
+    db.flush.assert_called_once()
+
+
+def test_create_many_mysql_missing_rows(mocker: MockFixture) -> None:
+
+    mocker.patch("app.crud.base._supports_returning", return_value=False)
+
+    db = mocker.Mock(spec=Session)
+    db.get_bind.return_value.dialect.name = "mysql"
+    db.execute.side_effect = [
+        mocker.Mock(**{"one.return_value": (1, 1)}),
+        mocker.Mock(lastrowid=11),
+    ]
+    db.scalars.return_value = [MockModel(id=11)]
+
+    crud = CRUDBase(MockModel)
+
+    with pytest.raises(RuntimeError):
+        crud.create_many(db, objs_in=[{"username": "user0"}, {"username": "user1"}])
+
+    db.commit.assert_not_called()
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_update_many(sqlite_session: Session, mocker: MockFixture, returning: bool) -> None:
+
+    mocker.patch("app.crud.base._supports_returning", return_value=returning)
+    on_change = mocker.Mock()
+
+    crud = CRUDBase(MockModel, on_change=on_change)
+    objs = crud.create_many(sqlite_session, objs_in=[{"username": f"user{i}"} for i in range(4)])
+
+    count = crud.update_many(
+        sqlite_session, obj_in={"username": "updated"}, ids=[objs[0].id, objs[1].id]
+    )
+
+    assert count == 2
+    assert sorted(call.args[0] for call in on_change.call_args_list) == [objs[0].id, objs[1].id]
+
+    count = crud.update_many(
+        sqlite_session, obj_in={"username": "user"}, where=[MockModel.username != "updated"]
+    )
+
+    assert count == 2
+    assert sorted(obj.username for obj in crud.get_multi(sqlite_session)) == [
+        "updated",
+        "updated",
+        "user",
+        "user",
+    ]
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_remove_many(sqlite_session: Session, mocker: MockFixture, returning: bool) -> None:
+
+    mocker.patch("app.crud.base._supports_returning", return_value=returning)
+    on_change = mocker.Mock()
+
+    crud = CRUDBase(MockModel, on_change=on_change)
+    objs = crud.create_many(sqlite_session, objs_in=[{"username": f"user{i}"} for i in range(4)])
+
+    assert crud.remove_many(sqlite_session, ids=[objs[0].id]) == 1
+    assert crud.remove_many(sqlite_session, where=[MockModel.username.in_(["user1", "user2"])]) == 2
+
+    assert [obj.id for obj in crud.get_multi(sqlite_session)] == [objs[3].id]
+    assert on_change.call_count == 3
+
+
+def test_bulk_requires_criteria(sqlite_session: Session) -> None:
+
+    crud = CRUDBase(MockModel)
+
+    with pytest.raises(ValueError):
+        crud.update_many(sqlite_session, obj_in={"username": "test"})
+
+    with pytest.raises(ValueError):
+        crud.remove_many(sqlite_session)
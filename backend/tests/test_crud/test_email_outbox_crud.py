@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from app.crud.crud_email_outbox import email_outbox_crud
+from app.models.email_outbox import EmailOutbox, utc_now
+from app.schemas import db_schemas
+
+
+def _add_jobs(session, count: int) -> None:
+
+    for i in range(count):
+        obj_in = db_schemas.email_outbox.EmailOutboxDBCreate(
+            recipients=[f"user{i}@test.com"],
+            subject="test",
+            template_name="users/password-reset.html",
+            template_body={"app_name": "test", "name": f"user{i}"},
+        )
+
+        email_outbox_crud.create(session, obj_in=obj_in, commit=False)
+
+    session.commit()
+
+
+def test_claim_batch(sqlite_session) -> None:
+
+    _add_jobs(sqlite_session, 3)
+
+    jobs = email_outbox_crud.claim_batch(sqlite_session, batch_size=2, lease_seconds=60)
+
+    assert [job.recipients for job in jobs] == [["user0@test.com"], ["user1@test.com"]]
+    assert all(job.available_at > utc_now() for job in jobs)
+
+    # 已取出的資料在 lease 時間內不會再被取出
+    jobs = email_outbox_crud.claim_batch(sqlite_session, batch_size=2, lease_seconds=60)
+
+    assert [job.recipients for job in jobs] == [["user2@test.com"]]
+    assert email_outbox_crud.claim_batch(sqlite_session, batch_size=2, lease_seconds=60) == []
+
+
+def test_mark_sent(sqlite_session) -> None:
+
+    _add_jobs(sqlite_session, 1)
+
+    job = email_outbox_crud.claim_batch(sqlite_session, batch_size=1, lease_seconds=60)[0]
+
+    email_outbox_crud.mark_sent(sqlite_session, job=job)
+
+    result = sqlite_session.get(EmailOutbox, job.id)
+
+    assert result.status == "sent"
+    assert result.attempts == 1
+    assert result.sent_at is not None
+
+
+def test_mark_failed(sqlite_session) -> None:
+
+    _add_jobs(sqlite_session, 1)
+
+    job = email_outbox_crud.claim_batch(sqlite_session, batch_size=1, lease_seconds=60)[0]
+
+    email_outbox_crud.mark_failed(
+        sqlite_session, job=job, error="error", max_attempts=2, retry_backoff=30
+    )
+
+    assert job.status == "pending"
+    assert job.attempts == 1
+    assert job.last_error == "error"
+    assert job.available_at > utc_now() + timedelta(seconds=20)
+
+    email_outbox_crud.mark_failed(
+        sqlite_session, job=job, error="error", max_attempts=2, retry_backoff=30
+    )
+
+    assert job.status == "failed"
+    assert job.attempts == 2
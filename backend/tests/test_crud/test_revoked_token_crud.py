@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from app.crud.crud_revoked_token import revoked_token_crud
+from app.models.revoked_token import RevokedToken
+from app.security import hash_token_key
+
+
+def _revoke(session, token_key: str, expires_at: datetime) -> None:
+
+    revoked_token_crud.revoke(session, token_hash=hash_token_key(token_key), expires_at=expires_at)
+
+
+def test_revoke_is_idempotent(sqlite_session) -> None:
+
+    expires_at = datetime.utcnow() + timedelta(minutes=3)
+
+    _revoke(sqlite_session, "at", expires_at)
+    _revoke(sqlite_session, "at", expires_at)
+
+    assert sqlite_session.query(RevokedToken).count() == 1
+    assert revoked_token_crud.get_by_hash(sqlite_session, token_hash=hash_token_key("at"))
+    assert not revoked_token_crud.get_by_hash(sqlite_session, token_hash=hash_token_key("x"))
+
+
+def test_get_created_since_and_active(sqlite_session) -> None:
+
+    now = datetime.utcnow()
+
+    _revoke(sqlite_session, "expired", now - timedelta(minutes=1))
+
+    for i in range(3):
+        _revoke(sqlite_session, f"at_{i}", now + timedelta(minutes=3))
+
+    # 較小的 id 可能有較晚的 create_at
+    created = datetime(2024, 1, 1)
+    sqlite_session.get(RevokedToken, 1).create_at = created + timedelta(seconds=1)
+
+    for row_id in (2, 3, 4):
+        sqlite_session.get(RevokedToken, row_id).create_at = created
+
+    sqlite_session.commit()
+
+    rows = revoked_token_crud.get_created_since(sqlite_session, since=None, last_id=1, limit=2)
+
+    assert rows == [
+        (2, hash_token_key("at_0"), created),
+        (3, hash_token_key("at_1"), created),
+    ]
+
+    rows = revoked_token_crud.get_created_since(
+        sqlite_session, since=created + timedelta(seconds=1), limit=3
+    )
+
+    assert [row_id for row_id, _, _ in rows] == [1]
+
+    rows = revoked_token_crud.get_created_since(sqlite_session, since=created, last_id=2, limit=3)
+
+    assert [row_id for row_id, _, _ in rows] == [3, 4]
+
+    active = revoked_token_crud.get_active(sqlite_session)
+
+    assert sorted(row_id for row_id, _, _ in active) == [2, 3, 4]
+
+
+def test_delete_expired_batch(sqlite_session) -> None:
+
+    now = datetime.utcnow()
+
+    for i in range(3):
+        _revoke(sqlite_session, f"expired_{i}", now - timedelta(minutes=1))
+
+    _revoke(sqlite_session, "at", now + timedelta(minutes=3))
+
+    assert revoked_token_crud.delete_expired_batch(sqlite_session, batch_size=2) == 2
+    assert revoked_token_crud.delete_expired_batch(sqlite_session, batch_size=2) == 1
+    assert revoked_token_crud.delete_expired_batch(sqlite_session, batch_size=2) == 0
+
+    assert [row.token_hash for row in sqlite_session.query(RevokedToken)] == [hash_token_key("at")]
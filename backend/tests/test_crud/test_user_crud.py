@@ -1,6 +1,12 @@
+from datetime import datetime
+
+import pytest
+
+from app.crud.base import encode_cursor
 from app.crud.crud_user import user_crud
+from app.models.user import User
 from app.security import hash_string
-from tests.utils import DBDataAdder
+from tests.utils import DBDataAdder, query_plans
 
 
 def test_user_get_by_email(sqlite_session, get_random_user_obj) -> None:
@@ -31,3 +37,60 @@ def test_user_get_by_email_with_not_exist_email(sqlite_session, get_random_user_
     result = user_crud.get_by_email(sqlite_session, email="not_exist_email")
 
     assert result is None
+
+
+@pytest.mark.parametrize("order_by", [("id",), ("create_at", "id")])
+def test_user_get_page(sqlite_session, order_by) -> None:
+
+    # 部分使用者的 create_at 相同，確認分頁不會遺漏或重複
+    sqlite_session.add_all(
+        [
+            User(
+                email=f"user{i}@test.com",
+                name=f"user{i}",
+                password="test",
+                create_at=datetime(2024, 1, 1, 12, 0, i // 3),
+            )
+            for i in range(10)
+        ]
+    )
+    sqlite_session.commit()
+
+    ids, cursor = [], None
+
+    while True:
+        page = user_crud.get_page(sqlite_session, limit=4, cursor=cursor, order_by=order_by)
+        ids.extend(user.id for user in page.items)
+
+        if page.next_cursor is None:
+            break
+
+        cursor = page.next_cursor
+
+    assert ids == sorted(ids)
+    assert len(ids) == len(set(ids)) == 10
+
+
+def test_user_get_page_invalid_cursor(sqlite_session) -> None:
+
+    cursor = encode_cursor(("id",), [1])
+
+    with pytest.raises(ValueError):
+        user_crud.get_page(sqlite_session, cursor=cursor, order_by=("create_at", "id"))
+
+    with pytest.raises(ValueError):
+        user_crud.get_page(sqlite_session, cursor="not a cursor")
+
+
+def test_user_get_page_by_create_at_uses_index(sqlite_session) -> None:
+
+    cursor = encode_cursor(("create_at", "id"), [datetime(2024, 1, 1), 1])
+
+    plans = query_plans(
+        sqlite_session,
+        lambda: user_crud.get_page(sqlite_session, cursor=cursor, order_by=("create_at", "id")),
+    )
+
+    assert len(plans) == 1
+    assert "USING INDEX ix_users_create_at_id" in plans[0]
+    assert "TEMP B-TREE" not in plans[0]
@@ -1,9 +1,14 @@
+import hashlib
 from datetime import datetime, timedelta, timezone
 
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
 from app.crud.crud_user import user_token_crud
 from app.models.user import UserToken
 from app.security import hash_string
-from tests.utils import DBDataAdder
+from tests.utils import DBDataAdder, query_plans
 
 
 def test_user_token_get_by_key(sqlite_session, get_random_user_obj) -> None:
@@ -48,63 +53,74 @@ def test_user_token_get_by_key_with_expired_token(sqlite_session, get_random_use
     assert result.id == token.id
 
 
-def test_user_token_clear_up_expired_tokens(sqlite_session, get_random_user_obj) -> None:
+def test_user_token_delete_expired_batch(sqlite_session, get_random_user_obj) -> None:
 
     db_adder = DBDataAdder(sqlite_session)
 
     user = db_adder.add_user(
-        email=get_random_user_obj.email,
-        name=get_random_user_obj.name,
-        password=hash_string(get_random_user_obj.raw_password),
+        email=get_random_user_obj.email, name=get_random_user_obj.name, password="test"
     )
 
-    token = db_adder.add_user_token(
-        user_id=user.id,
-        token_key="expired_token_key",
-        expires_at=datetime.now(timezone.utc) - timedelta(minutes=1),
+    now = datetime.now(timezone.utc)
+
+    expired_tokens = [
+        db_adder.add_user_token(
+            user_id=user.id,
+            token_key=f"expired_token_key_{i}",
+            expires_at=now - timedelta(minutes=10 - i),
+        )
+        for i in range(3)
+    ]
+
+    valid_token = db_adder.add_user_token(
+        user_id=user.id, token_key="valid_token_key", expires_at=now + timedelta(minutes=1)
     )
 
-    user_token_crud.clear_up_expired_tokens(sqlite_session, user_id=user.id)
+    deleted = user_token_crud.delete_expired_batch(sqlite_session, batch_size=2)
+
+    assert deleted == 2
+    # 依照 expires_at 順序，最早過期的先刪除
+    assert sqlite_session.get(UserToken, expired_tokens[0].id) is None
+    assert sqlite_session.get(UserToken, expired_tokens[1].id) is None
+    assert sqlite_session.get(UserToken, expired_tokens[2].id) is not None
+
+    assert user_token_crud.delete_expired_batch(sqlite_session, batch_size=2) == 1
+    assert user_token_crud.delete_expired_batch(sqlite_session, batch_size=2) == 0
+    assert sqlite_session.get(UserToken, valid_token.id) is not None
 
-    result = sqlite_session.get(UserToken, token.id)
 
-    assert result is None
+def test_user_token_get_by_key_uses_unique_index(sqlite_session) -> None:
+
+    plans = query_plans(
+        sqlite_session, lambda: user_token_crud.get_by_key(sqlite_session, token_key="key")
+    )
 
+    assert plans == ["SEARCH user_tokens USING INDEX ix_user_tokens_token_hash (token_hash=?)"]
 
-def test_user_token_clear_up_expired_tokens_with_multiple_users(
-    sqlite_session, get_random_user_obj
-) -> None:
+
+def test_user_token_key_is_unique(sqlite_session) -> None:
 
     db_adder = DBDataAdder(sqlite_session)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=1)
 
-    user = db_adder.add_user(
-        email=get_random_user_obj.email,
-        name=get_random_user_obj.name,
-        password=hash_string(get_random_user_obj.raw_password),
-    )
+    user = db_adder.add_user(email="test@test.com", name="user1", password="test")
+    db_adder.add_user_token(user_id=user.id, token_key="token_key", expires_at=expires_at)
 
-    user2 = db_adder.add_user(
-        email="2" + get_random_user_obj.email,
-        name="2" + get_random_user_obj.name,
-        password=hash_string(get_random_user_obj.raw_password),
-    )
+    with pytest.raises(IntegrityError):
+        db_adder.add_user_token(user_id=user.id, token_key="token_key", expires_at=expires_at)
 
-    token = db_adder.add_user_token(
-        user_id=user.id,
-        token_key="expired_token_key",
-        expires_at=datetime.now(timezone.utc) - timedelta(minutes=1),
-    )
 
-    token2 = db_adder.add_user_token(
-        user_id=user2.id,
-        token_key="expired_token_key",
-        expires_at=datetime.now(timezone.utc) - timedelta(minutes=1),
-    )
+def test_user_token_stores_key_digest(sqlite_session) -> None:
 
-    user_token_crud.clear_up_expired_tokens(sqlite_session, user_id=user.id)
+    db_adder = DBDataAdder(sqlite_session)
 
-    result = sqlite_session.get(UserToken, token.id)
-    result2 = sqlite_session.get(UserToken, token2.id)
+    user = db_adder.add_user(email="test@test.com", name="user1", password="test")
+    token = db_adder.add_user_token(
+        user_id=user.id,
+        token_key="token_key",
+        expires_at=datetime.now(timezone.utc) + timedelta(minutes=1),
+    )
 
-    assert result is None
-    assert result2 is not None
+    assert token.token_hash == hashlib.sha256(b"token_key").digest()
+    assert user_token_crud.get_by_key(sqlite_session, token_key="token_key").id == token.id
+    assert user_token_crud.get_by_key(sqlite_session, token_key="other_key") is None
@@ -0,0 +1,28 @@
+from sqlalchemy import create_engine
+
+from app import metrics
+from app.config.database import InstrumentedQueuePool, register_pool_metrics
+
+
+def test_pool_metrics(tmp_path) -> None:
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=2,
+        max_overflow=1,
+    )
+    register_pool_metrics(engine.pool, "test", max_overflow=1)
+
+    checkouts = metrics.DB_POOL_CHECKOUT_SECONDS.labels("sync").snapshot()["count"]
+
+    with engine.connect():
+        output = metrics.REGISTRY.render()
+
+        assert 'db_pool_size{engine="test"} 3.0' in output
+        assert 'db_pool_checked_out{engine="test"} 1.0' in output
+
+    assert metrics.DB_POOL_CHECKOUT_SECONDS.labels("sync").snapshot()["count"] == checkouts + 1
+    assert 'db_pool_checked_out{engine="test"} 0.0' in metrics.REGISTRY.render()
+
+    engine.dispose()
@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base
+from app.config.replica import ReplicaSet, RoutingSession, use_primary
+from app.models.user import User, UserToken
+from app.security import hash_token_key
+from app.services import auth_serv
+
+
+def _create_db(path: Path, name: str) -> None:
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    with sessionmaker(bind=engine)() as session:
+        session.add(User(id=1, email="test@test.com", name=name, password="test"))
+        session.commit()
+
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def db_paths(tmp_path: Path):
+
+    # 以兩個 SQLite 檔案模擬 primary 和 replica，資料不同，用來確認查詢送到哪個資料庫
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+
+    _create_db(primary, "primary")
+    _create_db(replica, "replica")
+
+    return primary, replica
+
+
+@pytest.fixture(scope="function")
+def engines(db_paths):
+
+    primary = create_engine(f"sqlite:///{db_paths[0]}")
+    replica = create_engine(f"sqlite:///{db_paths[1]}")
+
+    yield primary, replica
+
+    primary.dispose()
+    replica.dispose()
+
+
+def _session_factory(primary, replicas):
+
+    return sessionmaker(bind=primary, class_=RoutingSession, autoflush=False, replicas=replicas)
+
+
+def test_read_from_replica(engines) -> None:
+
+    primary, replica = engines
+    replicas = ReplicaSet([replica], max_lag=1, check_interval=60, lag_probe=lambda conn: 0)
+
+    with _session_factory(primary, replicas)() as session:
+        assert session.get(User, 1).name == "replica"
+        assert session.get_bind(clause=select(User).with_for_update()) is primary
+
+
+def test_read_your_writes(engines) -> None:
+
+    primary, replica = engines
+    replicas = ReplicaSet([replica], max_lag=1, check_interval=60, lag_probe=lambda conn: 0)
+
+    with _session_factory(primary, replicas)() as session:
+        session.add(User(email="user2@test.com", name="user2", password="test"))
+        session.commit()
+
+        assert session.scalars(select(User.name).order_by(User.id)).all() == ["primary", "user2"]
+
+    with _session_factory(primary, replicas)() as session:
+        use_primary(session)
+
+        assert session.get(User, 1).name == "primary"
+
+
+@pytest.mark.parametrize("lag", [5, None])
+def test_fallback_to_primary(engines, lag) -> None:
+
+    primary, replica = engines
+    replicas = ReplicaSet([replica], max_lag=1, check_interval=60, lag_probe=lambda conn: lag)
+
+    with _session_factory(primary, replicas)() as session:
+        assert session.get(User, 1).name == "primary"
+
+
+def test_lag_check_interval(engines, mocker) -> None:
+
+    primary, replica = engines
+    probe = mocker.Mock(side_effect=[0, RuntimeError("connection lost")])
+
+    replicas = ReplicaSet([replica], max_lag=1, check_interval=60, lag_probe=probe)
+
+    assert replicas.choose() is replica
+    assert replicas.choose() is replica
+    assert probe.call_count == 1
+
+    replicas.check_interval = 0
+
+    assert replicas.choose() is None
+    assert replicas.status() == [{"url": str(replica.url), "lag": None}]
+
+
+def test_lag_check_does_not_wait(engines) -> None:
+
+    primary, replica = engines
+    probe = lambda conn: 0  # noqa: E731
+    replicas = ReplicaSet([replica, replica], max_lag=1, check_interval=0, lag_probe=probe)
+
+    assert replicas.lag(0) == 0
+
+    # 其他呼叫端正在檢查時使用上次的結果，尚未檢查過的 replica 視為無法使用，不等待 lock
+    with replicas._lock:
+        assert replicas.lag(0) == 0
+        assert replicas.lag(1) is None
+
+
+def test_round_robin(engines, db_paths) -> None:
+
+    primary, replica = engines
+    other = create_engine(f"sqlite:///{db_paths[1]}")
+
+    replicas = ReplicaSet([replica, other], max_lag=1, check_interval=60, lag_probe=lambda c: 0)
+
+    assert {replicas.choose() for _ in range(4)} == {replica, other}
+
+    other.dispose()
+
+
+@pytest.mark.asyncio
+async def test_async_read_from_replica(db_paths) -> None:
+
+    primary = create_async_engine(f"sqlite+aiosqlite:///{db_paths[0]}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{db_paths[1]}")
+
+    replicas = ReplicaSet(
+        [replica.sync_engine], max_lag=1, check_interval=60, lag_probe=lambda conn: 0
+    )
+    SessionTest = async_sessionmaker(
+        bind=primary, sync_session_class=RoutingSession, replicas=replicas
+    )
+
+    async with SessionTest() as session:
+        assert (await session.get(User, 1)).name == "replica"
+
+        (await session.get(User, 1)).name = "updated"
+        await session.commit()
+
+        assert (await session.scalars(select(User.name))).one() == "updated"
+
+    await primary.dispose()
+    await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_reads_primary(db_paths) -> None:
+
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=3)
+
+    # replica 落後：primary 上的 refresh token 已經被輪替，replica 上仍是舊的
+    for path, token_key in zip(db_paths, ("rotated", "old")):
+        engine = create_engine(f"sqlite:///{path}")
+
+        with sessionmaker(bind=engine)() as session:
+            session.add(
+                UserToken(
+                    user_id=1,
+                    token_hash=hash_token_key(token_key),
+                    expires_at=expires_at,
+                    purpose="rt",
+                )
+            )
+            session.commit()
+
+        engine.dispose()
+
+    primary = create_async_engine(f"sqlite+aiosqlite:///{db_paths[0]}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{db_paths[1]}")
+
+    replicas = ReplicaSet(
+        [replica.sync_engine], max_lag=1, check_interval=60, lag_probe=lambda conn: 0
+    )
+    SessionTest = async_sessionmaker(
+        bind=primary, sync_session_class=RoutingSession, replicas=replicas
+    )
+
+    payload = auth_serv._generate_token_payload(User(id=1), "rt")
+    payload.t = "old"
+    old_token = auth_serv._generate_token(payload).token
+
+    async with SessionTest() as session:
+        with pytest.raises(HTTPException):
+            await auth_serv.refresh_token(old_token, session)
+
+    payload.t = "rotated"
+    rotated_token = auth_serv._generate_token(payload).token
+
+    async with SessionTest() as session:
+        assert (await auth_serv.refresh_token(rotated_token, session)).refresh_token.token
+
+    await primary.dispose()
+    await replica.dispose()
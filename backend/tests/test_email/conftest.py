@@ -0,0 +1,72 @@
+import socket
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+from fastapi_mail import ConnectionConfig
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class RecordingHandler:
+    """記錄收到的 email，`fail_times` 大於 0 時會先回傳暫時性錯誤"""
+
+    def __init__(self) -> None:
+
+        self.messages: List[bytes] = []
+        self.peers = set()
+        self.fail_times = 0
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            return "451 Temporary failure"
+
+        self.peers.add(session.peer)
+        self.messages.append(envelope.content)
+
+        return "250 OK"
+
+
+def _get_free_port() -> int:
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="function")
+def smtp_handler() -> Generator[RecordingHandler, None, None]:
+
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(
+        handler, hostname="127.0.0.1", port=_get_free_port()
+    )
+    controller.start()
+
+    handler.port = controller.port
+
+    try:
+        yield handler
+
+    finally:
+        controller.stop()
+
+
+@pytest.fixture(scope="function")
+def smtp_config(smtp_handler) -> ConnectionConfig:
+
+    return ConnectionConfig(
+        MAIL_USERNAME="",
+        MAIL_PASSWORD="",
+        MAIL_PORT=smtp_handler.port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        MAIL_FROM="noreply@test.com",
+        MAIL_FROM_NAME="User System",
+        TEMPLATE_FOLDER=Path(__file__).parents[2] / "app" / "templates",
+        USE_CREDENTIALS=False,
+        VALIDATE_CERTS=False,
+    )
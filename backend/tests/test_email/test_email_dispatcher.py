@@ -0,0 +1,131 @@
+import pytest
+from fastapi import BackgroundTasks
+from fastapi_mail import MessageSchema, MessageType
+from pytest_mock import MockFixture
+
+from app.email_dispatcher import EmailDispatcher, EmailJob, SMTPConnection
+from app.services import email_serv
+
+
+def _message(i: int) -> MessageSchema:
+
+    return MessageSchema(
+        subject=f"test {i}",
+        recipients=[f"user{i}@test.com"],
+        template_body={"app_name": "test", "name": f"user{i}"},
+        subtype=MessageType.html,
+    )
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_reuses_connections(smtp_config, smtp_handler) -> None:
+
+    dispatcher = EmailDispatcher(smtp_config, connections=2, batch_size=5)
+    dispatcher.start()
+
+    for i in range(20):
+        assert dispatcher.submit(_message(i), template_name="users/password-reset.html")
+
+    await dispatcher.join()
+    await dispatcher.stop()
+
+    assert len(smtp_handler.messages) == 20
+    assert len(smtp_handler.peers) <= 2
+    assert b"user7" in b"".join(smtp_handler.messages)
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_retry(smtp_config, smtp_handler) -> None:
+
+    smtp_handler.fail_times = 2
+
+    dispatcher = EmailDispatcher(smtp_config, connections=1, max_retries=3, retry_backoff=0.01)
+    dispatcher.start()
+
+    dispatcher.submit(_message(1), template_name="users/password-reset.html")
+
+    await dispatcher.join()
+    await dispatcher.stop()
+
+    assert len(smtp_handler.messages) == 1
+    assert len(dispatcher.dead_letter) == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_dead_letter(smtp_config, smtp_handler) -> None:
+
+    smtp_handler.fail_times = 10
+
+    dispatcher = EmailDispatcher(smtp_config, connections=1, max_retries=2, retry_backoff=0.01)
+    dispatcher.start()
+
+    dispatcher.submit(_message(1), template_name="users/password-reset.html")
+
+    await dispatcher.join()
+    await dispatcher.stop()
+
+    assert smtp_handler.messages == []
+    assert len(dispatcher.dead_letter) == 1
+
+    dead_letter = dispatcher.dead_letter.items()[0]
+
+    assert dead_letter.job.attempts == 3
+    assert dead_letter.job.message.recipients == ["user1@test.com"]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_not_running(smtp_config) -> None:
+
+    dispatcher = EmailDispatcher(smtp_config)
+
+    assert dispatcher.submit(_message(1)) is False
+
+
+@pytest.mark.asyncio
+async def test_send_email_with_dispatcher(smtp_config, smtp_handler, mocker: MockFixture) -> None:
+
+    dispatcher = EmailDispatcher(smtp_config, connections=1)
+    mocker.patch("app.services.email_serv.email_dispatcher", dispatcher)
+
+    background_tasks = BackgroundTasks()
+
+    dispatcher.start()
+
+    await email_serv.send_email(
+        recipients=["test@test.com"],
+        subject="test",
+        context={"app_name": "test", "name": "test"},
+        template_name="users/password-reset.html",
+        background_tasks=background_tasks,
+    )
+
+    await dispatcher.join()
+    await dispatcher.stop()
+
+    assert background_tasks.tasks == []
+    assert len(smtp_handler.messages) == 1
+
+
+def test_build_message(smtp_config) -> None:
+
+    message = MessageSchema(
+        subject="test",
+        recipients=["user@test.com"],
+        cc=["cc@test.com"],
+        template_body={"app_name": "test", "name": "使用者"},
+        subtype=MessageType.html,
+        headers={"X-Test": "1"},
+    )
+
+    email = SMTPConnection(smtp_config).build_message(
+        EmailJob(message=message, template_name="users/password-reset.html")
+    )
+
+    assert email["From"] == "User System <noreply@test.com>"
+    assert email["To"] == "user@test.com"
+    assert email["Cc"] == "cc@test.com"
+    assert email["Subject"] == "test"
+    assert email["X-Test"] == "1"
+    assert email["Message-ID"]
+    assert email.get_content_type() == "text/html"
+    assert "使用者" in email.get_content()
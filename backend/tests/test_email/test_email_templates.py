@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+from jinja2 import Environment, FileSystemLoader
+
+from app.email_templates import EmailTemplates
+
+TEMPLATE_FOLDER = Path(__file__).parents[2] / "app" / "templates"
+
+CONTEXT = {
+    "app_name": "User System",
+    "name": "<user1>",
+    "activate_url": "http://127.0.0.1/verify?token=v1.1.2.abc&email=user1@test.com",
+    "reset_url": "http://127.0.0.1/reset?token=v1.1.2.abc&email=user1@test.com",
+}
+
+
+@pytest.mark.parametrize(
+    "template_name", Environment(loader=FileSystemLoader(TEMPLATE_FOLDER)).list_templates()
+)
+def test_render_same_as_jinja(template_name: str) -> None:
+
+    templates = EmailTemplates(TEMPLATE_FOLDER, static_context={"app_name": "User System"})
+    templates.load()
+
+    expected = (
+        Environment(loader=FileSystemLoader(TEMPLATE_FOLDER))
+        .get_template(template_name)
+        .render(**CONTEXT)
+    )
+
+    assert templates.get(template_name).fragments is not None
+    assert templates.render(template_name, CONTEXT) == expected
+
+
+def test_render_static_context_override() -> None:
+
+    templates = EmailTemplates(TEMPLATE_FOLDER, static_context={"app_name": "User System"})
+
+    result = templates.render(
+        "users/password-reset.html", {"app_name": "Other System", "name": "user1"}
+    )
+
+    assert "Other System" in result
+    assert "User System" not in result
+
+
+def test_render_fallback(tmp_path: Path) -> None:
+
+    (tmp_path / "filter.html").write_text("Hi {{ name | upper }}, {{ app_name }}")
+    (tmp_path / "condition.html").write_text("{% if name %}Hi {{ name }}{% endif %}")
+
+    templates = EmailTemplates(tmp_path, static_context={"app_name": "User System"})
+    templates.load()
+
+    assert templates.get("filter.html").fragments is None
+    assert templates.get("condition.html").fragments is None
+    assert templates.render("filter.html", {"name": "user1"}) == "Hi USER1, User System"
+    assert templates.render("condition.html", {"name": "user1"}) == "Hi user1"
@@ -0,0 +1,134 @@
+from datetime import timedelta
+from typing import Generator
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.crud.crud_email_outbox import email_outbox_crud
+from app.models.email_outbox import EmailOutbox, utc_now
+from app.outbox_sender import OutboxSender
+
+
+@pytest.fixture(scope="function")
+def session_factory() -> Generator[sessionmaker, None, None]:
+
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    SessionTest = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    Base.metadata.create_all(bind=engine)
+
+    with SessionTest() as session:
+        session.add_all(
+            [
+                EmailOutbox(
+                    recipients=[f"user{i}@test.com"],
+                    subject="test",
+                    template_name="users/password-reset.html",
+                    template_body={"app_name": "test", "name": f"user{i}"},
+                )
+                for i in range(3)
+            ]
+        )
+        session.commit()
+
+    yield SessionTest
+
+    Base.metadata.drop_all(bind=engine)
+
+
+def _get_jobs(session_factory) -> list:
+
+    session: Session
+
+    with session_factory() as session:
+        return session.scalars(select(EmailOutbox).order_by(EmailOutbox.id)).all()
+
+
+def _create_sender(smtp_config, session_factory, **kwargs) -> OutboxSender:
+
+    options = {
+        "batch_size": 10,
+        "poll_interval": 1,
+        "lease_seconds": 60,
+        "max_attempts": 3,
+        "retry_backoff": 30,
+    }
+    options.update(kwargs)
+
+    return OutboxSender(smtp_config, session_factory=session_factory, **options)
+
+
+@pytest.mark.asyncio
+async def test_outbox_sender_run_once(smtp_config, smtp_handler, session_factory) -> None:
+
+    sender = _create_sender(smtp_config, session_factory, batch_size=2)
+
+    assert await sender.run_once() == 2
+    assert await sender.run_once() == 1
+    assert await sender.run_once() == 0
+
+    sender.close()
+
+    assert len(smtp_handler.messages) == 3
+    assert len(smtp_handler.peers) == 1
+    assert [job.status for job in _get_jobs(session_factory)] == ["sent", "sent", "sent"]
+
+
+@pytest.mark.asyncio
+async def test_outbox_sender_failure(smtp_config, smtp_handler, session_factory) -> None:
+
+    smtp_handler.fail_times = 1
+
+    sender = _create_sender(smtp_config, session_factory)
+
+    assert await sender.run_once() == 3
+
+    sender.close()
+
+    jobs = _get_jobs(session_factory)
+
+    assert [job.status for job in jobs] == ["pending", "sent", "sent"]
+    assert jobs[0].attempts == 1
+    assert jobs[0].last_error is not None
+    assert len(smtp_handler.messages) == 2
+
+
+@pytest.mark.asyncio
+async def test_outbox_sender_lease_expired(smtp_config, session_factory, mocker) -> None:
+
+    start = utc_now()
+    clock = {"now": start}
+    claimed: list = []
+    sent: list = []
+
+    mocker.patch("app.crud.crud_email_outbox.utc_now", side_effect=lambda: clock["now"])
+    mocker.patch("app.outbox_sender.utc_now", side_effect=lambda: clock["now"])
+
+    async def send(job) -> None:
+
+        if len(sent) == 1:
+            # 寄送第二封時 lease 到期，由另一個 sender 重新取出
+            clock["now"] = start + timedelta(seconds=120)
+
+            with session_factory() as other:
+                jobs = email_outbox_crud.claim_batch(other, batch_size=10, lease_seconds=60)
+                claimed.extend(job.id for job in jobs)
+
+        sent.append(job.message.recipients)
+
+    sender = _create_sender(smtp_config, session_factory, lease_seconds=60)
+    sender._connection = mocker.Mock(send=send)
+
+    assert await sender.run_once() == 3
+
+    jobs = _get_jobs(session_factory)
+
+    # 第一封已經 commit，不會被重新取出；第三封留給另一個 sender
+    assert claimed == [jobs[1].id, jobs[2].id]
+    assert len(sent) == 2
+    assert [job.status for job in jobs] == ["sent", "sent", "pending"]
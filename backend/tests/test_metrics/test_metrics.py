@@ -0,0 +1,56 @@
+import pytest
+
+from app.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_render() -> None:
+
+    registry = Registry()
+    counter = Counter("test_total", "Test counter.", labelnames=("route",), registry=registry)
+
+    counter.labels("/a").inc()
+    counter.labels("/a").inc(2)
+    counter.labels('/"b"').inc()
+
+    output = registry.render()
+
+    assert "# HELP test_total Test counter." in output
+    assert "# TYPE test_total counter" in output
+    assert 'test_total{route="/a"} 3.0' in output
+    assert 'test_total{route="/\\"b\\""} 1.0' in output
+
+
+def test_gauge_set_function() -> None:
+
+    registry = Registry()
+    gauge = Gauge("test_gauge", "Test gauge.", registry=registry)
+
+    gauge.set_function(lambda: 7)
+
+    assert "test_gauge 7.0" in registry.render()
+
+
+def test_histogram_buckets() -> None:
+
+    registry = Registry()
+    histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0), registry=registry)
+
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    output = registry.render()
+
+    assert 'test_seconds_bucket{le="0.1"} 1' in output
+    assert 'test_seconds_bucket{le="1.0"} 2' in output
+    assert 'test_seconds_bucket{le="+Inf"} 3' in output
+    assert "test_seconds_count 3" in output
+    assert "test_seconds_sum 5.55" in output
+
+
+def test_labels_count_mismatch() -> None:
+
+    counter = Counter("test_total", "Test counter.", labelnames=("a", "b"), registry=None)
+
+    with pytest.raises(ValueError):
+        counter.labels("a")
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 
 from app.models.user import User, UserToken
+from app.security import hash_token_key
 
 
 def test_user_and_usertoken_relationship(sqlite_session) -> None:
@@ -17,7 +18,7 @@ def test_user_and_usertoken_relationship(sqlite_session) -> None:
 
     token = UserToken(
         user_id=user.id,
-        token_key="test_token",
+        token_hash=hash_token_key("test_token"),
         expires_at=datetime.now() + timedelta(minutes=1),
         purpose="at",
     )
@@ -47,14 +48,14 @@ def test_user_and_usertoken_one_to_many_realtionship(sqlite_session) -> None:
 
     token1 = UserToken(
         user_id=user.id,
-        token_key="test_token",
+        token_hash=hash_token_key("test_token"),
         expires_at=datetime.now() + timedelta(minutes=1),
         purpose="at",
     )
 
     token2 = UserToken(
         user_id=user.id,
-        token_key="test_token2",
+        token_hash=hash_token_key("test_token2"),
         expires_at=datetime.now() + timedelta(minutes=1),
         purpose="at",
     )
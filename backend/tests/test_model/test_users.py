@@ -6,7 +6,7 @@ from pytest_mock import MockFixture
 from sqlalchemy.exc import IntegrityError
 
 from app.models.user import User, UserToken
-from app.security import hash_string
+from app.security import hash_string, hash_token_key
 
 
 class UserData(BaseModel):
@@ -92,7 +92,7 @@ def test_create_usertoken_with_valid_data(sqlite_session, mocker: MockFixture) -
 
     token = UserToken(
         user_id=user_id,
-        token_key="valid_key",
+        token_hash=hash_token_key("valid_key"),
         expires_at=datetime.now() + timedelta(minutes=1),
         purpose="at",
     )
@@ -105,5 +105,5 @@ def test_create_usertoken_with_valid_data(sqlite_session, mocker: MockFixture) -
 
     assert fetched_token is not None
     assert fetched_token.user_id == user_id
-    assert fetched_token.token_key == "valid_key"
+    assert fetched_token.token_hash == hash_token_key("valid_key")
     assert fetched_token.purpose == "at"
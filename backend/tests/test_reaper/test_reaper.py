@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.models.revoked_token import RevokedToken
+from app.models.user import User, UserToken
+from app.reaper import TokenReaper
+from app.security import hash_token_key
+
+
+@pytest.fixture(scope="function")
+def session_factory():
+
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    SessionTest = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    Base.metadata.create_all(bind=engine)
+
+    with SessionTest() as session:
+        user = User(email="test@test.com", name="user1", password="test")
+        session.add(user)
+        session.commit()
+
+        now = datetime.now(timezone.utc)
+
+        session.add_all(
+            [
+                UserToken(
+                    user_id=user.id,
+                    token_hash=hash_token_key(f"expired_{i}"),
+                    expires_at=now - timedelta(minutes=1),
+                    purpose="rt",
+                )
+                for i in range(5)
+            ]
+            + [
+                UserToken(
+                    user_id=user.id,
+                    token_hash=hash_token_key("valid"),
+                    expires_at=now + timedelta(minutes=1),
+                    purpose="rt",
+                )
+            ]
+        )
+        session.commit()
+
+    yield SessionTest
+
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.mark.asyncio
+async def test_reaper_run_once(session_factory) -> None:
+
+    reaper = TokenReaper(interval=60, batch_size=2, session_factory=session_factory)
+
+    assert await reaper.run_once() == 5
+
+    with session_factory() as session:
+        token_hashes = session.scalars(select(UserToken.token_hash)).all()
+
+    assert token_hashes == [hash_token_key("valid")]
+
+
+@pytest.mark.asyncio
+async def test_reaper_start_and_stop(session_factory) -> None:
+
+    reaper = TokenReaper(interval=60, batch_size=100, session_factory=session_factory)
+
+    reaper.start()
+    await asyncio.sleep(0.1)
+    await reaper.stop()
+
+    with session_factory() as session:
+        count = session.scalar(select(func.count()).select_from(UserToken))
+
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_reaper_revoked_tokens(session_factory) -> None:
+
+    now = datetime.now(timezone.utc)
+
+    with session_factory() as session:
+        session.add_all(
+            [
+                RevokedToken(token_hash=hash_token_key("expired"), expires_at=now - timedelta(1)),
+                RevokedToken(token_hash=hash_token_key("valid"), expires_at=now + timedelta(1)),
+            ]
+        )
+        session.commit()
+
+    # 使用 key-value token store 時只清理撤銷的 access token
+    reaper = TokenReaper(
+        interval=60, batch_size=100, session_factory=session_factory, user_tokens=False
+    )
+
+    assert await reaper.run_once() == 1
+
+    with session_factory() as session:
+        assert session.scalar(select(func.count()).select_from(UserToken)) == 6
+        assert session.scalars(select(RevokedToken.token_hash)).all() == [hash_token_key("valid")]
@@ -0,0 +1,189 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pytest_mock import MockFixture
+from sqlalchemy import select
+
+from app.crud.async_base import commit
+from app.crud.async_crud_revoked_token import async_revoked_token_crud
+from app.models.revoked_token import RevokedToken
+from app.revocation import BloomFilter, RevocationList
+from app.security import hash_token_key
+
+
+def _revocation_list(**kwargs) -> RevocationList:
+
+    options = dict(capacity=100, error_rate=0.01, refresh_interval=1, rebuild_interval=300)
+    options.update(kwargs)
+
+    return RevocationList(**options)
+
+
+def test_bloom_filter() -> None:
+
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+    added = [hash_token_key(f"revoked_{i}") for i in range(1000)]
+
+    for digest in added:
+        bloom_filter.add(digest)
+
+    # 不會有 false negative
+    assert all(digest in bloom_filter for digest in added)
+    assert len(bloom_filter) == 1000
+
+    false_positives = sum(hash_token_key(f"valid_{i}") in bloom_filter for i in range(10000))
+
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_revoke_and_check(async_sqlite_session) -> None:
+
+    revocation_list = _revocation_list()
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=3)
+
+    assert not await revocation_list.is_revoked(async_sqlite_session, token_key="at")
+
+    for _ in range(2):
+        await revocation_list.revoke(async_sqlite_session, token_key="at", expires_at=expires_at)
+        await commit(async_sqlite_session)
+
+    rows = (await async_sqlite_session.scalars(select(RevokedToken))).all()
+
+    assert [row.token_hash for row in rows] == [hash_token_key("at")]
+    assert await revocation_list.is_revoked(async_sqlite_session, token_key="at")
+    assert not await revocation_list.is_revoked(async_sqlite_session, token_key="other")
+
+
+@pytest.mark.asyncio
+async def test_filter_miss_skips_db(async_sqlite_session, mocker: MockFixture) -> None:
+
+    revocation_list = _revocation_list()
+    await revocation_list.rebuild(async_sqlite_session)
+
+    get_by_hash = mocker.patch(
+        "app.revocation.async_revoked_token_crud.get_by_hash", return_value=None
+    )
+
+    assert not await revocation_list.is_revoked(async_sqlite_session, token_key="at")
+
+    # Bloom filter 命中時才查詢資料庫，誤判時仍回傳 `False`
+    mocker.patch.object(BloomFilter, "__contains__", return_value=True)
+    revocation_list._filter.add(hash_token_key("other"))
+
+    assert not await revocation_list.is_revoked(async_sqlite_session, token_key="at")
+    get_by_hash.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_refresh_from_other_worker(async_sqlite_session) -> None:
+
+    worker_a = _revocation_list()
+    worker_b = _revocation_list(batch_size=2)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=3)
+
+    await worker_b.rebuild(async_sqlite_session)
+
+    for i in range(5):
+        await worker_a.revoke(async_sqlite_session, token_key=f"at_{i}", expires_at=expires_at)
+
+    await commit(async_sqlite_session)
+
+    assert not await worker_b.is_revoked(async_sqlite_session, token_key="at_0")
+
+    assert await worker_b.refresh(async_sqlite_session) == 5
+    assert worker_b.synced_at is not None
+    assert await worker_b.is_revoked(async_sqlite_session, token_key="at_4")
+
+    # 只加入新增的資料，重新讀取的資料不會重複加入
+    await worker_a.revoke(async_sqlite_session, token_key="at_5", expires_at=expires_at)
+    await commit(async_sqlite_session)
+
+    assert await worker_b.refresh(async_sqlite_session) == 1
+    assert await worker_b.is_revoked(async_sqlite_session, token_key="at_5")
+
+
+@pytest.mark.asyncio
+async def test_cold_start_checks_db(async_sqlite_session, mocker: MockFixture) -> None:
+
+    worker_a = _revocation_list()
+    worker_b = _revocation_list(session_factory=lambda: async_sqlite_session)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=3)
+
+    await worker_a.revoke(async_sqlite_session, token_key="at", expires_at=expires_at)
+    await commit(async_sqlite_session)
+
+    # 剛啟動、尚未載入時 Bloom filter 是空的，仍然要查詢資料庫
+    assert not worker_b.loaded
+    assert await worker_b.is_revoked(async_sqlite_session, token_key="at")
+    assert not await worker_b.is_revoked(async_sqlite_session, token_key="other")
+
+    mocker.patch("app.revocation.close_session")
+
+    assert await worker_b.load() == 1
+    assert worker_b.loaded
+
+    get_by_hash = mocker.spy(async_revoked_token_crud, "get_by_hash")
+
+    assert await worker_b.is_revoked(async_sqlite_session, token_key="at")
+    assert not await worker_b.is_revoked(async_sqlite_session, token_key="other")
+    get_by_hash.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_rebuild_drops_expired_tokens(async_sqlite_session) -> None:
+
+    revocation_list = _revocation_list(capacity=2)
+    now = datetime.now(timezone.utc)
+
+    await revocation_list.revoke(
+        async_sqlite_session, token_key="expired", expires_at=now - timedelta(minutes=1)
+    )
+
+    for i in range(3):
+        await revocation_list.revoke(
+            async_sqlite_session, token_key=f"at_{i}", expires_at=now + timedelta(minutes=3)
+        )
+
+    await commit(async_sqlite_session)
+
+    assert len(revocation_list) == 4
+    assert revocation_list.capacity == 4
+
+    assert await revocation_list.rebuild(async_sqlite_session) == 3
+    assert len(revocation_list) == 3
+    assert revocation_list.capacity == 6
+    assert revocation_list.synced_at is not None
+
+
+@pytest.mark.asyncio
+async def test_refresh_reads_rows_committed_out_of_order(async_sqlite_session) -> None:
+
+    revocation_list = _revocation_list(sync_margin=60)
+    expires_at = datetime.utcnow() + timedelta(minutes=3)
+    created = datetime(2024, 1, 1, 12)
+
+    async_sqlite_session.add(
+        RevokedToken(
+            id=2, token_hash=hash_token_key("at_2"), expires_at=expires_at, create_at=created
+        )
+    )
+    await commit(async_sqlite_session)
+
+    assert await revocation_list.refresh(async_sqlite_session) == 1
+    assert revocation_list.synced_at == created
+
+    # 較早開始的 transaction 較晚才 commit，id 比已經讀到的小
+    async_sqlite_session.add(
+        RevokedToken(
+            id=1,
+            token_hash=hash_token_key("at_1"),
+            expires_at=expires_at,
+            create_at=created - timedelta(seconds=5),
+        )
+    )
+    await commit(async_sqlite_session)
+
+    assert await revocation_list.refresh(async_sqlite_session) == 1
+    assert await revocation_list.is_revoked(async_sqlite_session, token_key="at_1")
+    assert revocation_list.synced_at == created
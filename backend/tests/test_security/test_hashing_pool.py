@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.security import HashingPool, hash_string, verify_hashed_string
+
+
+@pytest.mark.asyncio
+async def test_hashing_pool_run() -> None:
+
+    pool = HashingPool(executor="thread", max_workers=2, max_queue=2)
+
+    hashed = await pool.run(hash_string, "test")
+
+    assert await pool.run(verify_hashed_string, "test", hashed) is True
+    assert pool.stats()["completed"] == 2
+    assert pool.stats()["in_flight"] == 0
+
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hashing_pool_reject_when_saturated() -> None:
+
+    pool = HashingPool(executor="thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    tasks = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+
+    assert pool.queue_depth == 1
+
+    with pytest.raises(HTTPException) as e:
+        await pool.run(release.wait)
+
+    assert e.value.status_code == 503
+    assert pool.stats()["rejected"] == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert pool.stats()["in_flight"] == 0
+
+    pool.shutdown()
+
+
+def test_hashing_pool_with_invalid_executor() -> None:
+
+    with pytest.raises(ValueError) as e:
+        HashingPool(executor="invalid", max_workers=1, max_queue=1)
+
+    assert e.value.args[0] == "Invalid executor type."
+
+
+@pytest.mark.asyncio
+async def test_hashing_pool_process_executor_warm_start() -> None:
+
+    pool = HashingPool(executor="process", max_workers=2, max_queue=2)
+    pool.start()
+
+    hashed = await pool.run(hash_string, "test")
+
+    assert await pool.run(verify_hashed_string, "test", hashed) is True
+
+    latency = pool.latency()
+
+    assert latency["hash_string"]["count"] == 1
+    assert latency["verify_hashed_string"]["count"] == 1
+
+    pool.shutdown()
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+
+from app import jwt_keys
+from app.jwt_keys import KeyRing, generate_private_key, load_keyring, load_pem_key
+from app.security import generate_token, get_token_payload
+from app.token_codec import TokenCodec
+
+SECRET = "ae0359c0c2eb9ced85498375ef480cbd5b0eb30f"
+
+
+def _payload() -> dict:
+
+    return {"sub": "1", "exp": datetime.now(timezone.utc) + timedelta(minutes=3)}
+
+
+def _sign(key: jwt_keys.JWTKey) -> str:
+
+    return generate_token(_payload(), key.signing_key, key.algorithm, kid=key.kid)
+
+
+@pytest.mark.parametrize("algorithm, kty", [("EdDSA", "OKP"), ("ES256", "EC")])
+def test_load_pem_key(algorithm: str, kty: str) -> None:
+
+    pem = generate_private_key(algorithm)
+    key = load_pem_key(pem)
+
+    assert key.algorithm == algorithm
+    assert key.jwk["kty"] == kty
+    assert key.jwk["kid"] == key.kid
+    assert "d" not in key.jwk
+
+    # kid 為公鑰的 thumbprint，只有公鑰時也相同
+    public_pem = key.verifying_key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    public_key = load_pem_key(public_pem)
+
+    assert public_key.kid == key.kid
+    assert public_key.signing_key is None
+
+
+def test_keyring_rotation() -> None:
+
+    old_key = load_pem_key(generate_private_key("ES256"))
+    new_key = load_pem_key(generate_private_key("EdDSA"))
+
+    old_token = _sign(old_key)
+
+    # 新的 key 開始簽署後，舊的 key 仍可以驗證
+    keyring = KeyRing([new_key, old_key])
+
+    assert get_token_payload(old_token, TokenCodec(keyring))["sub"] == "1"
+    assert get_token_payload(_sign(new_key), TokenCodec(keyring))["sub"] == "1"
+    assert [key["kid"] for key in keyring.jwks()["keys"]] == [new_key.kid, old_key.kid]
+
+    # 移除舊的 key 後，舊的 token 就無法使用
+    keyring = KeyRing([new_key])
+
+    assert get_token_payload(old_token, TokenCodec(keyring)) == {"error": "token invalid"}
+
+
+def test_keyring_rejects_wrong_key() -> None:
+
+    key = load_pem_key(generate_private_key("EdDSA"))
+    other_key = load_pem_key(generate_private_key("EdDSA"))
+    keyring = KeyRing([key])
+
+    # header 的 kid 與簽署的 key 不同
+    token = generate_token(_payload(), other_key.signing_key, "EdDSA", kid=key.kid)
+
+    assert get_token_payload(token, TokenCodec(keyring)) == {"error": "token invalid"}
+
+    # 以 HS256 偽造的 token
+    token = generate_token(_payload(), SECRET, "HS256", kid=key.kid)
+
+    assert get_token_payload(token, TokenCodec(keyring)) == {"error": "token invalid"}
+
+
+def test_keyring_requires_signing_key() -> None:
+
+    key = load_pem_key(generate_private_key("EdDSA"))
+    public_key = load_pem_key(
+        key.verifying_key.public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+
+    with pytest.raises(ValueError):
+        KeyRing([public_key, key])
+
+
+def test_load_keyring(tmp_path) -> None:
+
+    keyring = load_keyring("HS256", SECRET, [])
+
+    assert keyring.active.kid is None
+    assert keyring.jwks() == {"keys": []}
+    assert get_token_payload(_sign(keyring.active), TokenCodec(keyring))["sub"] == "1"
+
+    with pytest.raises(RuntimeError):
+        load_keyring("EdDSA", SECRET, [])
+
+    path = tmp_path / "key.pem"
+
+    assert jwt_keys.main(["generate", "--algorithm", "ES256", str(path)]) == 0
+    assert jwt_keys.main(["generate", str(path)]) == 1
+
+    assert load_keyring("ES256", SECRET, [path]).active.algorithm == "ES256"
+
+    with pytest.raises(RuntimeError):
+        load_keyring("EdDSA", SECRET, [path])
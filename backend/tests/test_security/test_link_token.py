@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app import link_token
+from app.models.user import User
+from app.security import hash_string
+
+PURPOSE = "verify-account"
+
+
+def _get_user() -> User:
+
+    return User(
+        id=1,
+        email="test@test.com",
+        name="test",
+        password=hash_string("test"),
+        create_at=datetime(2024, 1, 1, 12, 0, 0),
+    )
+
+
+@pytest.mark.asyncio
+async def test_verify_link_token() -> None:
+
+    user = _get_user()
+
+    token = link_token.generate_link_token(user, PURPOSE)
+
+    assert token.startswith("v1.1.")
+    assert await link_token.verify_link_token(user, PURPOSE, token) is True
+
+
+@pytest.mark.asyncio
+async def test_verify_link_token_with_other_purpose() -> None:
+
+    user = _get_user()
+
+    token = link_token.generate_link_token(user, PURPOSE)
+
+    assert await link_token.verify_link_token(user, "password-reset", token) is False
+
+
+@pytest.mark.asyncio
+async def test_verify_link_token_with_other_user() -> None:
+
+    user = _get_user()
+    other_user = _get_user()
+    other_user.id = 2
+
+    token = link_token.generate_link_token(user, PURPOSE)
+
+    assert await link_token.verify_link_token(other_user, PURPOSE, token) is False
+
+
+@pytest.mark.asyncio
+async def test_verify_link_token_expired() -> None:
+
+    user = _get_user()
+
+    token = link_token.generate_link_token(user, PURPOSE, expires_minutes=-1)
+
+    assert await link_token.verify_link_token(user, PURPOSE, token) is False
+
+
+@pytest.mark.asyncio
+async def test_verify_link_token_after_user_updated() -> None:
+
+    user = _get_user()
+
+    token = link_token.generate_link_token(user, PURPOSE)
+
+    user.updated_at = datetime(2024, 1, 2, 12, 0, 0)
+
+    assert await link_token.verify_link_token(user, PURPOSE, token) is False
+
+
+@pytest.mark.asyncio
+async def test_verify_link_token_tampered() -> None:
+
+    user = _get_user()
+
+    token = link_token.generate_link_token(user, PURPOSE)
+    version, user_id, expires, signature = token.split(".")
+    tampered = f"{version}.{user_id}.{int(expires) + 60}.{signature}"
+
+    assert await link_token.verify_link_token(user, PURPOSE, tampered) is False
+    assert await link_token.verify_link_token(user, PURPOSE, "invalid token") is False
+
+
+@pytest.mark.asyncio
+async def test_verify_legacy_link_token(mocker: MockerFixture) -> None:
+
+    user = _get_user()
+
+    mocker.patch("app.link_token.legacy_until", datetime.now(timezone.utc) + timedelta(minutes=10))
+    mock_verify = mocker.patch("app.security.verify_hashed_string_async", return_value=True)
+
+    token = hash_string(user.get_context_string(PURPOSE))
+
+    assert await link_token.verify_link_token(user, PURPOSE, token) is True
+    mock_verify.assert_called_once_with(user.get_context_string(PURPOSE), token)
+
+
+@pytest.mark.asyncio
+async def test_verify_legacy_link_token_after_rollover(mocker: MockerFixture) -> None:
+
+    user = _get_user()
+
+    mocker.patch(
+        "app.link_token.legacy_until", link_token.parse_legacy_until(True, "2024-01-01T00:00:00")
+    )
+    mock_verify = mocker.patch("app.security.verify_hashed_string_async", return_value=True)
+
+    token = hash_string(user.get_context_string(PURPOSE))
+
+    assert await link_token.verify_link_token(user, PURPOSE, token) is False
+    mock_verify.assert_not_called()
+
+
+def test_parse_legacy_until() -> None:
+
+    assert link_token.parse_legacy_until(False, "2024-01-01T00:00:00") is None
+    assert link_token.parse_legacy_until(True, "2024-01-01T00:00:00") == datetime(
+        2024, 1, 1, tzinfo=timezone.utc
+    )
+
+    with pytest.raises(RuntimeError):
+        link_token.parse_legacy_until(True, "")
@@ -0,0 +1,148 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+
+from app.jwt_keys import KeyRing, generate_private_key, load_keyring, load_pem_key
+from app.token_codec import TokenCodec
+
+SECRET = "ae0359c0c2eb9ced85498375ef480cbd5b0eb30f"
+
+
+def _keyring(algorithm: str) -> KeyRing:
+
+    if algorithm == "HS256":
+        return load_keyring("HS256", SECRET, [])
+
+    return KeyRing([load_pem_key(generate_private_key(algorithm))])
+
+
+def _payload(**claims) -> dict:
+
+    payload = {
+        "sub": "1",
+        "t": "token_key",
+        "p": "at",
+        "exp": datetime.now(timezone.utc) + timedelta(minutes=3),
+    }
+    payload.update(claims)
+
+    return payload
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "EdDSA", "ES256"])
+def test_compatible_with_pyjwt(algorithm: str) -> None:
+
+    keyring = _keyring(algorithm)
+    key = keyring.active
+    codec = TokenCodec(keyring)
+    payload = _payload()
+    headers = {"kid": key.kid} if key.kid else None
+
+    token = codec.encode(payload)
+    pyjwt_token = jwt.encode(payload, key.signing_key, algorithm=algorithm, headers=headers)
+
+    assert jwt.decode(token, key.verifying_key, algorithms=[algorithm])["sub"] == "1"
+    assert codec.decode(pyjwt_token) == jwt.decode(
+        pyjwt_token, key.verifying_key, algorithms=[algorithm]
+    )
+
+    # HMAC 與 EdDSA 的簽章是固定的，產生的 token 與 PyJWT 完全相同
+    if algorithm != "ES256":
+        assert token == pyjwt_token
+
+
+def test_expired_and_leeway() -> None:
+
+    keyring = _keyring("HS256")
+    token = TokenCodec(keyring).encode(_payload(exp=int(time.time()) - 5))
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        TokenCodec(keyring).decode(token)
+
+    assert TokenCodec(keyring, leeway=30).decode(token)["sub"] == "1"
+
+    token = TokenCodec(keyring).encode(_payload(nbf=int(time.time()) + 60))
+
+    with pytest.raises(jwt.ImmatureSignatureError):
+        TokenCodec(keyring).decode(token)
+
+
+def test_required_claims() -> None:
+
+    keyring = _keyring("HS256")
+    codec = TokenCodec(keyring, required_claims=("sub", "t", "p", "exp"))
+    payload = _payload()
+    del payload["t"]
+
+    with pytest.raises(jwt.MissingRequiredClaimError):
+        codec.decode(codec.encode(payload))
+
+    with pytest.raises(jwt.DecodeError):
+        codec.decode(codec.encode(_payload(exp="tomorrow")))
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "",
+        "a.b",
+        "a.b.c.d",
+        "bm90IGpzb24.e30.c2ln",
+        # alg 為 none 的 token
+        jwt.encode({"sub": "1"}, None, algorithm="none"),
+    ],
+)
+def test_invalid_tokens(token: str) -> None:
+
+    with pytest.raises(jwt.InvalidTokenError):
+        TokenCodec(_keyring("HS256")).decode(token)
+
+
+def test_rejects_other_algorithms_and_keys() -> None:
+
+    keyring = _keyring("EdDSA")
+    codec = TokenCodec(keyring)
+    kid = keyring.active.kid
+
+    # 以 HS256 和公鑰偽造的 token
+    with pytest.raises(jwt.InvalidTokenError):
+        codec.decode(jwt.encode(_payload(), SECRET, algorithm="HS256", headers={"kid": kid}))
+
+    # 其他 key 簽署的 token
+    other_key = load_pem_key(generate_private_key("EdDSA"))
+    token = jwt.encode(_payload(), other_key.signing_key, algorithm="EdDSA", headers={"kid": kid})
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        codec.decode(token)
+
+    token = jwt.encode(
+        _payload(), keyring.active.signing_key, algorithm="EdDSA", headers={"kid": "unknown"}
+    )
+
+    with pytest.raises(jwt.InvalidKeyError):
+        codec.decode(token)
+
+    # 被竄改的 payload
+    header, _, signature = codec.encode(_payload()).split(".")
+    body = jwt.utils.base64url_encode(b'{"sub":"2"}').decode()
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        codec.decode(f"{header}.{body}.{signature}")
+
+
+def test_decode_with_rotated_keys() -> None:
+
+    old_key = load_pem_key(generate_private_key("EdDSA"))
+    new_key = load_pem_key(generate_private_key("EdDSA"))
+
+    old_token = TokenCodec(KeyRing([old_key])).encode(_payload())
+    codec = TokenCodec(KeyRing([new_key, old_key]))
+
+    # 舊 key 簽署的 token 在輪替期間仍然有效
+    assert codec.decode(old_token)["sub"] == "1"
+    assert codec.decode(codec.encode(_payload()))["sub"] == "1"
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        TokenCodec(KeyRing([new_key])).decode(old_token)
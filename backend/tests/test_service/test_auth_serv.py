@@ -3,9 +3,11 @@ from datetime import datetime, timedelta, timezone
 import pytest
 from fastapi import BackgroundTasks, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import TypeAdapter
 from pytest_mock import MockerFixture
 from sqlalchemy.orm import Session
 
+from app import security
 from app.models.user import User
 from app.schemas import request_schemas, response_schemas, utils_schemas
 from app.services import auth_serv, email_serv
@@ -15,6 +17,7 @@ from app.services import auth_serv, email_serv
 async def test_activate_user_account_success(mocker: MockerFixture) -> None:
 
     mock_session = mocker.Mock(spec=Session)
+    mock_session.info = {}
     mock_backgroundtasks = mocker.Mock(spec=BackgroundTasks)
     mock_user = mocker.Mock(spec=User)
 
@@ -22,7 +25,7 @@ async def test_activate_user_account_success(mocker: MockerFixture) -> None:
     mock_user.get_context_string.return_value = "hashed_token"
 
     mocker.patch("app.crud.crud_user.user_crud.get_by_email", return_value=mock_user)
-    mocker.patch("app.security.verify_hashed_string", return_value=True)
+    mocker.patch("app.link_token.verify_link_token", return_value=True)
     mocker.patch(
         "app.services.email_serv.send_account_verifiaction_confirmation_email", return_value=None
     )
@@ -36,6 +39,8 @@ async def test_activate_user_account_success(mocker: MockerFixture) -> None:
     assert mock_user.verified_at is not None
     mock_session.add.assert_called_once_with(mock_user)
     mock_session.commit.assert_called_once()
+    # 驗證連結時讀取 primary 的資料
+    assert mock_session.info == {"routing_use_primary": True}
     email_serv.send_account_verifiaction_confirmation_email.assert_called_once_with(
         mock_user, mock_backgroundtasks
     )
@@ -45,6 +50,7 @@ async def test_activate_user_account_success(mocker: MockerFixture) -> None:
 async def test_activate_user_with_not_exist_user(mocker: MockerFixture) -> None:
 
     mock_session = mocker.Mock(spec=Session)
+    mock_session.info = {}
     mock_backgroundtasks = mocker.Mock(spec=BackgroundTasks)
 
     mocker.patch("app.crud.crud_user.user_crud.get_by_email", return_value=None)
@@ -63,6 +69,7 @@ async def test_activate_user_with_not_exist_user(mocker: MockerFixture) -> None:
 async def test_activate_user_with_invalid_token(mocker: MockerFixture) -> None:
 
     mock_session = mocker.Mock(spec=Session)
+    mock_session.info = {}
     mock_backgroundtasks = mocker.Mock(spec=BackgroundTasks)
     mock_user = mocker.Mock(spec=User)
 
@@ -70,7 +77,7 @@ async def test_activate_user_with_invalid_token(mocker: MockerFixture) -> None:
     mock_user.get_context_string.return_value = "hashed_token"
 
     mocker.patch("app.crud.crud_user.user_crud.get_by_email", return_value=mock_user)
-    mocker.patch("app.security.verify_hashed_string", return_value=False)
+    mocker.patch("app.link_token.verify_link_token", return_value=False)
 
     data = request_schemas.user.UserVerifiyAccountReq(
         email="example@example.com", token="hashed_token"
@@ -86,6 +93,7 @@ async def test_activate_user_with_invalid_token(mocker: MockerFixture) -> None:
 async def test_activate_user_account_exception_handling(mocker: MockerFixture):
 
     session = mocker.Mock(spec=Session)
+    session.info = {}
     backgroundtasks = mocker.Mock(spec=BackgroundTasks)
 
     mock_user = mocker.Mock(spec=User)
@@ -98,7 +106,7 @@ async def test_activate_user_account_exception_handling(mocker: MockerFixture):
         email="test@example.com", token="invalid_token"
     )
 
-    mocker.patch('app.security.verify_hashed_string', side_effect=Exception("mocked exception"))
+    mocker.patch('app.link_token.verify_link_token', side_effect=Exception("mocked exception"))
 
     log_exception = mocker.patch('logging.exception')
 
@@ -119,7 +127,6 @@ def test_generate_payload_for_access_token(get_random_user_obj, mocker: MockerFi
 
     mocker.patch('app.services.auth_serv.settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES', 15)
     mocker.patch('app.security.get_unique_string', return_value='unique_string')
-    mocker.patch('app.security.str_encode', side_effect=lambda x: x)
 
     user = User(
         id=1,
@@ -130,7 +137,7 @@ def test_generate_payload_for_access_token(get_random_user_obj, mocker: MockerFi
 
     payload = auth_serv._generate_token_payload(user, "at")
 
-    assert payload.sub == "1"
+    assert payload.sub == 1
     assert payload.t == "unique_string"
     assert payload.p == "at"
     assert payload.exp.timestamp() - datetime.now(timezone.utc).timestamp() == pytest.approx(
@@ -142,7 +149,6 @@ def test_generate_payload_for_refresh_token(get_random_user_obj, mocker: MockerF
 
     mocker.patch('app.services.auth_serv.settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES', 30)
     mocker.patch('app.security.get_unique_string', return_value='unique_string')
-    mocker.patch('app.security.str_encode', side_effect=lambda x: x)
 
     user = User(
         id=1,
@@ -153,7 +159,7 @@ def test_generate_payload_for_refresh_token(get_random_user_obj, mocker: MockerF
 
     payload = auth_serv._generate_token_payload(user, "rt")
 
-    assert payload.sub == "1"
+    assert payload.sub == 1
     assert payload.t == "unique_string"
     assert payload.p == "rt"
     assert payload.exp.timestamp() - datetime.now(timezone.utc).timestamp() == pytest.approx(
@@ -161,6 +167,26 @@ def test_generate_payload_for_refresh_token(get_random_user_obj, mocker: MockerF
     )
 
 
+def test_generate_payload_with_profile_claims(get_random_user_obj, mocker: MockerFixture) -> None:
+
+    mocker.patch('app.services.auth_serv.settings.JWT_PROFILE_CLAIMS', True)
+
+    user = User(
+        id=1,
+        email=get_random_user_obj.email,
+        name=get_random_user_obj.name,
+        password=get_random_user_obj.raw_password,
+    )
+
+    at_payload = auth_serv._generate_token_payload(user, "at")
+    rt_payload = auth_serv._generate_token_payload(user, "rt")
+
+    assert at_payload.email == user.email
+    assert at_payload.name == user.name
+    assert rt_payload.email is None
+    assert rt_payload.name is None
+
+
 def test_generate_payload_with_invalid_purpose(get_random_user_obj) -> None:
 
     user = User(
@@ -182,7 +208,7 @@ def test_generate_jwt_token(mocker: MockerFixture) -> None:
     mocker.patch('app.services.auth_serv.settings.JWT_ALGORITHM', 'HS256')
 
     exp = datetime.now(tz=timezone.utc) + timedelta(minutes=15)
-    payload = utils_schemas.jwt.JWTPayload(sub="testuser", t="token_key", p="at", exp=exp)
+    payload = utils_schemas.jwt.JWTPayload(sub=1, t="token_key", p="at", exp=exp)
 
     token_response = auth_serv._generate_token(payload)
 
@@ -190,9 +216,77 @@ def test_generate_jwt_token(mocker: MockerFixture) -> None:
     assert token_response.expires_at == exp
 
 
-def test_get_login_token(mocker: MockerFixture, get_random_user_obj) -> None:
+def test_compact_claims() -> None:
+
+    exp = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    payload = utils_schemas.jwt.JWTPayload(sub=42, t="token_key", p="rt", exp=exp)
+    claims = payload.to_claims()
+
+    assert claims == {"v": 2, "sub": "42", "t": "token_key", "p": "r", "exp": 1893456000}
+    assert utils_schemas.jwt.JWTPayload.from_claims(claims) == payload
+
+
+def test_legacy_claims() -> None:
+
+    claims = {
+        "sub": security.str_encode("42"),
+        "t": "token_key",
+        "p": security.str_encode("at"),
+        "exp": 1893456000,
+    }
+
+    payload = utils_schemas.jwt.JWTPayload.from_claims(claims)
+
+    assert payload.sub == 42
+    assert payload.p == "at"
+
+    with pytest.raises(ValueError):
+        utils_schemas.jwt.JWTPayload.from_claims(claims, accept_legacy=False)
+
+
+@pytest.mark.parametrize(
+    "claims",
+    [
+        {"v": 2, "sub": "1", "t": "key", "p": "x", "exp": 1893456000},
+        {"v": 2, "sub": "user", "t": "key", "p": "a", "exp": 1893456000},
+        {"v": 2, "sub": "1", "p": "a", "exp": 1893456000},
+        {"v": 3, "sub": "1", "t": "key", "p": "a", "exp": 1893456000},
+        {"sub": "not base85 ~", "t": "key", "p": "a", "exp": 1893456000},
+        {"v": 2, "sub": "1", "t": 1, "p": "a", "exp": 1893456000},
+        {"v": 2, "sub": "1", "t": "key", "p": "a", "exp": "1893456000"},
+        {"v": 2, "sub": "1", "t": "key", "p": "a", "exp": 1893456000, "email": 1},
+    ],
+)
+def test_invalid_claims(claims: dict) -> None:
+
+    with pytest.raises(ValueError):
+        utils_schemas.jwt.JWTPayload.from_claims(claims)
+
+
+@pytest.mark.parametrize(
+    "expires_at",
+    [
+        datetime(2030, 1, 1, 8, 30, 15, 123456, tzinfo=timezone.utc),
+        datetime(2030, 1, 1, 8, 30, 15, tzinfo=timezone(timedelta(hours=8))),
+        datetime(2030, 1, 1, 8, 30, 15),
+    ],
+)
+def test_render_token_resp(expires_at: datetime) -> None:
+
+    resp = response_schemas.auth.JWTokenResp(
+        access_token=response_schemas.auth.JWToken(token="a.b.c", expires_at=expires_at),
+        refresh_token=response_schemas.auth.JWToken(token="d.e-_.f", expires_at=expires_at),
+    )
+
+    assert resp.render() == TypeAdapter(response_schemas.auth.JWTokenResp).dump_json(resp)
+
+
+@pytest.mark.asyncio
+async def test_get_login_token(mocker: MockerFixture, get_random_user_obj) -> None:
 
     session = mocker.Mock(spec=Session)
+    session.info = {}
+    session.info = {}
     user = User(
         id=1,
         email=get_random_user_obj.email,
@@ -203,7 +297,7 @@ def test_get_login_token(mocker: MockerFixture, get_random_user_obj) -> None:
     )
 
     mocker.patch("app.crud.crud_user.user_crud.get_by_email", return_value=user)
-    mocker.patch("app.security.verify_hashed_string", return_value=True)
+    mocker.patch("app.security.verify_hashed_string_async", return_value=True)
     mocker.patch(
         "app.services.auth_serv._generate_token_payload",
         return_value=utils_schemas.jwt.JWTPayload(sub="1", t="token", p="at", exp=datetime.now()),
@@ -212,13 +306,15 @@ def test_get_login_token(mocker: MockerFixture, get_random_user_obj) -> None:
         "app.services.auth_serv._generate_token",
         return_value=response_schemas.auth.JWToken(token="token", expires_at=datetime.now()),
     )
-    mocker.patch("app.crud.crud_user.user_token_crud.create")
+    mock_create = mocker.patch("app.crud.crud_user.user_token_crud.create")
 
     data = OAuth2PasswordRequestForm(
         username=get_random_user_obj.email, password=get_random_user_obj.raw_password
     )
 
-    response = auth_serv.get_login_token(data=data, session=session)
+    response = await auth_serv.get_login_token(data=data, session=session)
 
     assert response.access_token.token == "token"
     assert response.refresh_token.token == "token"
+    assert mock_create.call_args.kwargs["commit"] is False
+    session.commit.assert_called_once()
@@ -3,6 +3,7 @@ from fastapi import BackgroundTasks
 from fastapi_mail import MessageSchema, MessageType
 from pytest_mock import MockFixture
 
+from app import metrics
 from app.config.email import fm
 from app.services import email_serv
 
@@ -14,10 +15,11 @@ async def test_send_email(mocker: MockFixture) -> None:
 
     recipients = ["test@test.com"]
     subject = "test"
-    context = "test"
-    template_name = "test"
+    context = {"app_name": "test", "name": "user1"}
+    template_name = "users/password-reset.html"
 
     mock_send_message = mocker.patch.object(fm, "send_message", return_value=None)
+    queue_depth = metrics.EMAIL_QUEUE_DEPTH.get()
 
     await email_serv.send_email(
         recipients=recipients,
@@ -29,10 +31,17 @@ async def test_send_email(mocker: MockFixture) -> None:
 
     assert len(mock_background_tasks.tasks) == 1
     task = mock_background_tasks.tasks[0]
-    assert task.func == mock_send_message
-    assert task.args == (
-        MessageSchema(
-            subject=subject, recipients=recipients, template_body=context, subtype=MessageType.html
-        ),
+    message = MessageSchema(
+        subject=subject, recipients=recipients, template_body=context, subtype=MessageType.html
     )
+    assert task.func == email_serv._send_message
+    assert task.args == (message,)
     assert task.kwargs == {"template_name": template_name}
+    assert metrics.EMAIL_QUEUE_DEPTH.get() == queue_depth + 1
+
+    await task()
+
+    sent_message = mock_send_message.call_args.args[0]
+    assert sent_message.recipients == recipients
+    assert "user1" in sent_message.template_body
+    assert metrics.EMAIL_QUEUE_DEPTH.get() == queue_depth
@@ -0,0 +1,54 @@
+import pytest
+from fastapi import BackgroundTasks
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.models.email_outbox import EmailOutbox
+from app.models.user import User
+from app.schemas import request_schemas
+from app.services import user_serv
+
+
+@pytest.fixture(scope="function")
+def sqlite_session():
+
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    SessionTest = sessionmaker(bind=engine, autoflush=False)
+
+    Base.metadata.create_all(bind=engine)
+
+    with SessionTest() as session:
+        yield session
+
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.mark.asyncio
+async def test_create_user_account_writes_outbox(sqlite_session, mocker: MockerFixture) -> None:
+
+    mocker.patch("app.services.user_serv.settings.EMAIL_OUTBOX_ENABLED", True)
+    mocker.patch("app.security.hash_string_async", return_value="hashed_password")
+    mock_notify = mocker.patch("app.services.user_serv.outbox_sender.notify")
+    mock_commit = mocker.spy(sqlite_session, "commit")
+
+    background_tasks = BackgroundTasks()
+    data = request_schemas.user.UserCreateAccountReq(
+        email="test@test.com", name="user1", password="password"
+    )
+
+    user = await user_serv.create_user_account(data, sqlite_session, background_tasks)
+
+    job = sqlite_session.scalars(select(EmailOutbox)).one()
+
+    assert sqlite_session.get(User, user.id).email == "test@test.com"
+    assert job.recipients == ["test@test.com"]
+    assert job.template_name == "users/account-verification.html"
+    assert "activate_url" in job.template_body
+    assert background_tasks.tasks == []
+    mock_commit.assert_called_once()
+    mock_notify.assert_called_once()
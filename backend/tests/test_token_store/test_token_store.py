@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pytest_mock import MockFixture
+from sqlalchemy import select
+
+from app.crud.async_base import commit
+from app.models.user import User, UserToken
+from app.security import hash_token_key
+from app.token_store import (
+    KeyValueTokenStore,
+    MemoryKeyValue,
+    SQLTokenStore,
+    StoredToken,
+    create_token_store,
+)
+
+
+@pytest.mark.asyncio
+async def test_memory_key_value_expiry(mocker: MockFixture) -> None:
+
+    now = mocker.patch("app.token_store.time.monotonic", return_value=100.0)
+    client = MemoryKeyValue(sweep_every=2)
+
+    await client.set("a", "1", px=1000)
+    await client.set("b", "2")
+
+    assert await client.get("a") == "1"
+
+    now.return_value = 101.0
+
+    assert await client.get("a") is None
+    assert await client.get("b") == "2"
+    assert await client.delete("a", "b") == 1
+
+    # 定期清除沒有再被存取的 key
+    await client.set("c", "3", px=1000)
+    now.return_value = 102.0
+    await client.set("d", "4")
+
+    assert len(client) == 1
+
+
+@pytest.mark.asyncio
+async def test_key_value_token_store() -> None:
+
+    client = MemoryKeyValue()
+    store = KeyValueTokenStore(client)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    await store.add(None, user_id=1, token_key="old", expires_at=expires_at)
+
+    token = await store.get(None, token_key="old")
+
+    assert token.user_id == 1
+    assert abs(token.expires_at - expires_at) < timedelta(seconds=1)
+    assert await client.get("rt:" + hash_token_key("old").hex()) is not None
+
+    assert await store.replace(None, token, token_key="new", expires_at=expires_at) is True
+    # 同一個 refresh token 只能使用一次
+    assert await store.replace(None, token, token_key="other", expires_at=expires_at) is False
+    assert await store.get(None, token_key="old") is None
+
+    new_token = await store.get(None, token_key="new")
+    await store.remove(None, new_token)
+
+    assert await store.get(None, token_key="new") is None
+
+    await store.add(
+        None,
+        user_id=1,
+        token_key="expired",
+        expires_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+    )
+
+    assert len(client) == 0
+
+
+@pytest.mark.asyncio
+async def test_sql_token_store(async_sqlite_session) -> None:
+
+    user = User(email="test@test.com", name="user1", password="test")
+    async_sqlite_session.add(user)
+    await async_sqlite_session.commit()
+
+    store = SQLTokenStore()
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    await store.add(async_sqlite_session, user_id=user.id, token_key="old", expires_at=expires_at)
+    await commit(async_sqlite_session)
+
+    token = await store.get(async_sqlite_session, token_key="old")
+
+    assert token.user_id == user.id
+
+    await store.replace(async_sqlite_session, token, token_key="new", expires_at=expires_at)
+    await commit(async_sqlite_session)
+
+    assert await store.get(async_sqlite_session, token_key="old") is None
+
+    await store.remove(async_sqlite_session, await store.get(async_sqlite_session, token_key="new"))
+    await commit(async_sqlite_session)
+
+    assert (await async_sqlite_session.scalars(select(UserToken))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_sql_token_store_replace_once(async_sqlite_session) -> None:
+
+    user = User(email="test@test.com", name="user1", password="test")
+    async_sqlite_session.add(user)
+    await async_sqlite_session.commit()
+
+    store = SQLTokenStore()
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    await store.add(async_sqlite_session, user_id=user.id, token_key="old", expires_at=expires_at)
+    await commit(async_sqlite_session)
+
+    token = await store.get(async_sqlite_session, token_key="old")
+    # 另一個請求在取代之前讀到的同一個 token
+    stale = StoredToken(
+        user_id=token.user_id,
+        expires_at=token.expires_at,
+        ref=UserToken(id=token.ref.id, token_hash=token.ref.token_hash),
+    )
+
+    assert await store.replace(async_sqlite_session, token, token_key="a", expires_at=expires_at)
+    await commit(async_sqlite_session)
+
+    assert not await store.replace(
+        async_sqlite_session, stale, token_key="b", expires_at=expires_at
+    )
+    assert await store.get(async_sqlite_session, token_key="a") is not None
+    assert await store.get(async_sqlite_session, token_key="b") is None
+
+
+def test_create_token_store() -> None:
+
+    assert isinstance(create_token_store("sql"), SQLTokenStore)
+    assert isinstance(create_token_store("memory"), KeyValueTokenStore)
+
+    with pytest.raises(ValueError):
+        create_token_store("unknown")
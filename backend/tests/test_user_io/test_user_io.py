@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.models.user import User
+from app.security import hash_string, verify_hashed_string
+from app.user_io import export_users, import_users, read_rows
+
+PASSWORD_HASH = hash_string("test")
+
+
+@pytest.fixture(scope="function")
+def session():
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    SessionTest = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    Base.metadata.create_all(bind=engine)
+
+    with SessionTest() as session:
+        session.add(User(email="exists@test.com", name="exists", password=PASSWORD_HASH))
+        session.commit()
+
+        yield session
+
+
+def test_import_users(session) -> None:
+
+    lines = [
+        {"email": "user1@test.com", "name": "user1", "password": "password1", "is_active": True},
+        {"email": "user2@test.com", "name": "user2", "password_hash": PASSWORD_HASH},
+        {"email": "user2@test.com", "name": "duplicate", "password_hash": PASSWORD_HASH},
+        {"email": "exists@test.com", "name": "exists", "password_hash": PASSWORD_HASH},
+        {"email": "user3@test.com", "name": "user3", "password_hash": "plain"},
+        {"email": "user4@test.com", "name": "user4"},
+    ]
+    file = io.StringIO("\n".join(json.dumps(line) for line in lines))
+
+    result = import_users(session, read_rows(file, "jsonl"), batch_size=2)
+
+    assert result.inserted == 2
+    assert result.skipped == 2
+    assert [line for line, _ in result.errors] == [5, 6]
+
+    users = {user.email: user for user in session.scalars(select(User)).all()}
+
+    assert set(users) == {"exists@test.com", "user1@test.com", "user2@test.com"}
+    assert users["user1@test.com"].is_active is True
+    assert verify_hashed_string("password1", users["user1@test.com"].password)
+    assert users["user2@test.com"].password == PASSWORD_HASH
+    assert users["user2@test.com"].is_active is False
+
+
+def test_import_users_process_pool(session) -> None:
+
+    file = io.StringIO(
+        "email,name,password,is_active,verified_at\n"
+        "user1@test.com,user1,password1,true,2024-01-01T12:00:00\n"
+        "user2@test.com,user2,password2,false,\n"
+    )
+
+    result = import_users(session, read_rows(file, "csv"), workers=1)
+
+    assert result.inserted == 2
+    assert not result.errors
+
+    user = session.scalars(select(User).where(User.email == "user1@test.com")).one()
+
+    assert verify_hashed_string("password1", user.password)
+    assert user.verified_at.year == 2024
+
+
+def test_import_users_invalid_json(session) -> None:
+
+    file = io.StringIO(
+        json.dumps({"email": "user1@test.com", "name": "user1", "password_hash": PASSWORD_HASH})
+        + '\n{"email": "broken@test.com",\n[1, 2]\n'
+        + json.dumps({"email": "user2@test.com", "name": "user2", "password_hash": PASSWORD_HASH})
+    )
+
+    result = import_users(session, read_rows(file, "jsonl"))
+
+    assert result.inserted == 2
+    assert [line for line, _ in result.errors] == [2, 3]
+    assert result.errors[0][1].startswith("Invalid JSON")
+
+
+def test_import_users_concurrent_duplicate(session, mocker) -> None:
+
+    # 模擬檢查之後才由其他匯入寫入的 email
+    mocker.patch.object(session, "scalars", return_value=mocker.Mock(all=list))
+
+    lines = [
+        {"email": "exists@test.com", "name": "exists", "password_hash": PASSWORD_HASH},
+        {"email": "user1@test.com", "name": "user1", "password_hash": PASSWORD_HASH},
+    ]
+    file = io.StringIO("\n".join(json.dumps(line) for line in lines))
+
+    result = import_users(session, read_rows(file, "jsonl"))
+
+    mocker.stopall()
+
+    assert result.inserted == 1
+    assert result.skipped == 1
+    assert not result.errors
+    assert session.scalars(select(User.email).order_by(User.email)).all() == [
+        "exists@test.com",
+        "user1@test.com",
+    ]
+
+
+@pytest.mark.parametrize("format", ["csv", "jsonl"])
+def test_export_users(session, format: str) -> None:
+
+    session.add_all(
+        [User(email=f"user{i}@test.com", name=f"user{i}", password=PASSWORD_HASH) for i in range(5)]
+    )
+    session.commit()
+
+    file = io.StringIO()
+
+    count = export_users(session, file, format, batch_size=2, include_password=True)
+
+    file.seek(0)
+    rows = list(read_rows(file, format))
+
+    assert count == len(rows) == 6
+    assert rows[0]["email"] == "exists@test.com"
+    assert rows[0]["password_hash"] == PASSWORD_HASH
+
+    if format == "csv":
+        assert list(csv.reader(io.StringIO(file.getvalue())))[0][0] == "id"
+
+
+def test_export_import_roundtrip(session) -> None:
+
+    file = io.StringIO()
+    export_users(session, file, "jsonl", include_password=True)
+
+    session.execute(User.__table__.delete())
+    session.commit()
+
+    file.seek(0)
+    result = import_users(session, read_rows(file, "jsonl"))
+
+    assert result.inserted == 1
+    assert session.scalars(select(User.password)).one() == PASSWORD_HASH
@@ -1,10 +1,14 @@
 import random
 import string
 from datetime import datetime
+from typing import Any, Callable, List
 
 from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
 from app.models.user import User, UserToken
+from app.security import hash_token_key
 
 
 class RandomUser(BaseModel):
@@ -67,7 +71,7 @@ class DBDataAdder:
 
         user_token = UserToken(
             user_id=user_id,
-            token_key=token_key,
+            token_hash=hash_token_key(token_key),
             expires_at=expires_at,
             purpose=purpose,
         )
@@ -80,3 +84,31 @@ class DBDataAdder:
 
 
 random_user_gen = RandomUserGen()
+
+
+def query_plans(session: Session, func: Callable[[], Any]) -> List[str]:
+    """執行 `func` 並回傳其中每個 SQL 的 `EXPLAIN QUERY PLAN`"""
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append((statement, parameters))
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+    try:
+        func()
+
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    connection = session.connection()
+
+    return [
+        " ".join(
+            row[-1]
+            for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        )
+        for statement, parameters in statements
+    ]